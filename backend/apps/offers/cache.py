@@ -0,0 +1,128 @@
+# cache.py
+import hashlib
+import time
+
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.cache import get_cache
+
+# Responses and facets, on the version of the offer data
+offer_cache = get_cache("offers")
+
+
+def bump_offer_version(**kwargs):
+    """
+    Invalidate every cached offer response and facet count, in every
+    process (usable as a receiver).
+    """
+    offer_cache.invalidate()
+
+
+def owner_key(user_id):
+    return f"offers:owner:{user_id}"
+
+
+def forget_owner_responses(*user_ids):
+    """
+    Invalidate the cached responses embedding these users as offer
+    owners, in every process, and keep the rest. Call it once the change
+    is committed: it stores the time of the change for each owner.
+    """
+    now = time.time_ns()
+    offer_cache.shared.set_many({owner_key(pk): now for pk in user_ids},
+                                offer_cache.timeout)
+
+
+def owners_changed(user_ids, since):
+    """
+    Whether any of these owners changed after `since` (time.time_ns()),
+    or the time of its last change is no longer known.
+    """
+    if not user_ids:
+        return False
+    keys = [owner_key(pk) for pk in user_ids]
+    changes = offer_cache.shared.get_many(keys)
+    return len(changes) < len(keys) or \
+        any(changed > since for changed in changes.values())
+
+
+def canonical_params(request):
+    """Query parameters in a canonical order, blank ones dropped."""
+    params = sorted(
+        (name, sorted(value for value in values if value))
+        for name, values in request.query_params.lists()
+    )
+    return [(name, values) for name, values in params if values]
+
+
+def response_key(request):
+    """
+    Cache key of a GET request: path and query parameters, plus scheme and
+    host, which appear in the pagination links and image URLs, and the
+    negotiated format, part of the ETag.
+    """
+    canonical = repr((
+        request.scheme, request.get_host(), request.path,
+        request.accepted_renderer.format, canonical_params(request),
+    ))
+    digest = hashlib.sha1(canonical.encode()).hexdigest()
+    return f"response:{digest}"
+
+
+def cached_facets(request, build):
+    """
+    Facet counts for the filters of a request, from the cache or `build()`.
+    They do not depend on the user, so every request shares them. The day
+    is part of the key, the date ranges move with it.
+    """
+    canonical = repr((timezone.localdate().isoformat(),
+                      canonical_params(request)))
+    digest = hashlib.sha1(canonical.encode()).hexdigest()
+    return offer_cache.get_or_set(f"facets:{digest}", build)
+
+
+def cached_response(view, request, owners, *args, **kwargs):
+    """
+    Return the cached data of an anonymous GET request, or call the view
+    and cache its data if the response is a 200.
+
+    Only the serialized data and its ETag are stored, the renderer is
+    still chosen per request. `owners()` are the ids of the users the
+    view embedded: a change to one of them (see forget_owner_responses)
+    makes the entry stale, without touching the responses of others.
+    """
+    if request.method != "GET" or request.user.is_authenticated:
+        return view(request, *args, **kwargs)
+
+    key = response_key(request)
+    # Pinned before the view runs: a write bumping the version (or
+    # changing an owner) while it renders leaves the response uncached
+    started = time.time_ns()
+    version = offer_cache.version()
+    cached = offer_cache.get(key, version=version)
+    if cached is not None:
+        data, etag, owner_ids, stored_at = cached
+        if not owners_changed(owner_ids, stored_at):
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = Response(data)
+            if etag:
+                response["ETag"] = etag
+            response["X-Cache"] = "HIT"
+            return response
+
+    response = view(request, *args, **kwargs)
+    if response.status_code == status.HTTP_200_OK:
+        owner_ids = sorted(owners())
+        # Owners never changed (or forgotten by the cache) count as
+        # changed at 0, so losing their entry later makes this one stale
+        for pk in owner_ids:
+            offer_cache.shared.add(owner_key(pk), 0, offer_cache.timeout)
+        if not owners_changed(owner_ids, started):
+            offer_cache.set(key, (response.data, response.get("ETag"),
+                                  owner_ids, started), version=version)
+    response["X-Cache"] = "MISS"
+    return response
@@ -0,0 +1,75 @@
+from datetime import timedelta
+
+from django.db.models import Count, Q
+from django.utils import timezone
+
+# (min, max] duration buckets in hours, the first one includes its minimum
+DURATION_BUCKETS = [(0.25, 0.5), (0.5, 1), (1, 2), (2, 4)]
+# Offers published in the last N days
+PUBLISHED_WITHIN_DAYS = [7, 30, 365]
+TOP_LOCATIONS = 10
+
+
+def duration_filter(index, low, high):
+    lower = Q(duration__gte=timedelta(hours=low)) if index == 0 \
+        else Q(duration__gt=timedelta(hours=low))
+    return lower & Q(duration__lte=timedelta(hours=high))
+
+
+def offer_facets(queryset):
+    """
+    Counts of the offers in a queryset for each value of the list filters.
+
+    Computed in one query: rows are grouped by location and every other
+    facet is a conditional count within the group, added up here.
+    """
+    today = timezone.localdate()
+    since = {days: today - timedelta(days=days)
+             for days in PUBLISHED_WITHIN_DAYS}
+    rows = queryset.order_by().values("location").annotate(
+        total=Count("pk"),
+        online=Count("pk", filter=Q(is_online=True)),
+        **{
+            f"duration_{index}": Count(
+                "pk", filter=duration_filter(index, low, high)
+            )
+            for index, (low, high) in enumerate(DURATION_BUCKETS)
+        },
+        **{
+            f"published_{days}": Count(
+                "pk", filter=Q(publish_date__gte=date)
+            )
+            for days, date in since.items()
+        },
+    )
+
+    totals = {}
+    locations = []
+    for row in rows:
+        for key, value in row.items():
+            if key != "location":
+                totals[key] = totals.get(key, 0) + value
+        if row["location"]:
+            locations.append((row["location"], row["total"]))
+    locations.sort(key=lambda item: (-item[1], item[0]))
+
+    total = totals.get("total", 0)
+    online = totals.get("online", 0)
+    return {
+        "total": total,
+        "is_online": {"online": online, "in_person": total - online},
+        "duration": [
+            {"min_hours": low, "max_hours": high,
+             "count": totals.get(f"duration_{index}", 0)}
+            for index, (low, high) in enumerate(DURATION_BUCKETS)
+        ],
+        "locations": [
+            {"location": location, "count": count}
+            for location, count in locations[:TOP_LOCATIONS]
+        ],
+        "publish_date": [
+            {"days": days, "from_date": date.isoformat(),
+             "count": totals.get(f"published_{days}", 0)}
+            for days, date in since.items()
+        ],
+    }
@@ -0,0 +1,108 @@
+import posixpath
+from collections import Counter
+from datetime import timedelta
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from core.images import image_fields
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the uploaded files (images and their variants) that no row "
+        "references any more."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace", type=int, default=60,
+            help="Minutes a new file is kept before it may be collected, "
+                 "its row may not be committed yet.",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=500,
+            help="Rows read per query and files deleted per batch.",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Only report what would be deleted.",
+        )
+
+    def handle(self, *args, **options):
+        references = self.count_references(options["batch_size"])
+        self.stdout.write(
+            f"{len(references)} files referenced "
+            f"({sum(references.values())} references)."
+        )
+
+        cutoff = timezone.now() - timedelta(minutes=options["grace"])
+        garbage = []
+        deleted = freed = 0
+        for name in self.stored_files():
+            if name in references:
+                continue
+            if default_storage.get_modified_time(name) > cutoff:
+                continue
+            garbage.append(name)
+            if len(garbage) >= options["batch_size"]:
+                count, size = self.delete(garbage, options["dry_run"])
+                deleted, freed = deleted + count, freed + size
+                garbage = []
+        count, size = self.delete(garbage, options["dry_run"])
+        deleted, freed = deleted + count, freed + size
+
+        verb = "would be deleted" if options["dry_run"] else "deleted"
+        self.stdout.write(self.style.SUCCESS(
+            f"{deleted} unreferenced files {verb} "
+            f"({freed / 2 ** 20:.1f} MiB)."
+        ))
+
+    def count_references(self, batch_size):
+        """
+        {file name: rows using it} over every tracked image column and its
+        variants, plus the field defaults. Rows are read in pk batches.
+        """
+        references = Counter()
+        for model, field_name, variants_field in image_fields:
+            references[model._meta.get_field(field_name).default] += 1
+            last = 0
+            while True:
+                rows = list(
+                    model.objects.filter(pk__gt=last).order_by("pk")
+                    .values_list("pk", field_name, variants_field)
+                    [:batch_size]
+                )
+                if not rows:
+                    break
+                for _, name, variants in rows:
+                    if name:
+                        references[name] += 1
+                    for key, variant in (variants or {}).items():
+                        if key != "source":
+                            references[variant] += 1
+                last = rows[-1][0]
+        return references
+
+    def stored_files(self):
+        """Every file under the upload directories of the tracked fields."""
+        pending = sorted({
+            model._meta.get_field(field_name).upload_to
+            for model, field_name, _ in image_fields
+        })
+        while pending:
+            directory = pending.pop()
+            if not default_storage.exists(directory):
+                continue
+            subdirectories, files = default_storage.listdir(directory)
+            pending += [posixpath.join(directory, name)
+                        for name in subdirectories]
+            for name in files:
+                yield posixpath.join(directory, name)
+
+    def delete(self, names, dry_run):
+        size = 0
+        for name in names:
+            size += default_storage.size(name)
+            if not dry_run:
+                default_storage.delete(name)
+        return len(names), size
@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand
+from core.images import (
+    image_fields,
+    is_default,
+    process_image,
+    variants_are_current,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the resized WebP variants of offer images and profile "
+        "pictures uploaded before the pipeline, or that failed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model", choices=[model._meta.db_table
+                                for model, _, _ in image_fields],
+            action="append",
+            help="Only this model (can be repeated).",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=500,
+            help="Rows read per query.",
+        )
+        parser.add_argument(
+            "--force", action="store_true",
+            help="Regenerate variants that already exist.",
+        )
+
+    def handle(self, *args, **options):
+        for model, field_name, variants_field in image_fields:
+            label = model._meta.db_table
+            if options["model"] and label not in options["model"]:
+                continue
+            processed = 0
+            for instance in self.instances(model, field_name, variants_field,
+                                           options["batch_size"]):
+                field_file = getattr(instance, field_name)
+                if is_default(field_file):
+                    continue
+                if options["force"]:
+                    model.objects.filter(pk=instance.pk).update(
+                        **{variants_field: {}}
+                    )
+                elif variants_are_current(
+                    field_file, getattr(instance, variants_field)
+                ):
+                    continue
+                try:
+                    process_image(model, instance.pk, field_name,
+                                  variants_field)
+                except Exception as error:
+                    self.stderr.write(f"{label} #{instance.pk}: {error}")
+                    continue
+                processed += 1
+            self.stdout.write(self.style.SUCCESS(
+                f"{processed} {label} images processed."
+            ))
+
+    def instances(self, model, field_name, variants_field, batch_size):
+        last = 0
+        while True:
+            batch = list(
+                model.objects.filter(pk__gt=last).order_by("pk")
+                .only(field_name, variants_field)[:batch_size]
+            )
+            if not batch:
+                return
+            yield from batch
+            last = batch[-1].pk
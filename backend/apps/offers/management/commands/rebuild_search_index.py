@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from apps.offers.models import Offer, OfferSearchTerm
+from apps.offers.search import weighted_terms
+
+
+class Command(BaseCommand):
+    help = "Rebuild the offer search index in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=1000,
+            help="Number of offers indexed per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        last_id = 0
+        indexed = 0
+
+        while True:
+            batch = list(
+                Offer.objects.filter(id__gt=last_id)
+                .order_by("id")
+                .values("id", "title", "description")[:batch_size]
+            )
+            if not batch:
+                break
+
+            ids = [row["id"] for row in batch]
+            with transaction.atomic():
+                OfferSearchTerm.objects.filter(offer_id__in=ids).delete()
+                OfferSearchTerm.objects.bulk_create(
+                    OfferSearchTerm(offer_id=row["id"], term=term,
+                                    weight=weight)
+                    for row in batch
+                    for term, weight in weighted_terms(
+                        row["title"], row["description"]
+                    ).items()
+                )
+
+            last_id = ids[-1]
+            indexed += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"{indexed} offers indexed."))
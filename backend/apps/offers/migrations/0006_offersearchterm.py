@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from apps.offers.search import weighted_terms
+
+
+def index_existing_offers(apps, schema_editor):
+    Offer = apps.get_model("offers", "Offer")
+    OfferSearchTerm = apps.get_model("offers", "OfferSearchTerm")
+    for offer in Offer.objects.only("id", "title", "description").iterator():
+        OfferSearchTerm.objects.bulk_create(
+            OfferSearchTerm(offer_id=offer.id, term=term, weight=weight)
+            for term, weight in weighted_terms(
+                offer.title, offer.description
+            ).items()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('offers', '0005_alter_offer_image'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OfferSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=50)),
+                ('weight', models.PositiveIntegerField(default=1)),
+                ('offer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='offers.offer')),
+            ],
+            options={
+                'db_table': 'offer_search_terms',
+                'indexes': [models.Index(fields=['term', 'offer'], name='offer_search_term_idx')],
+            },
+        ),
+        migrations.RunPython(index_existing_offers,
+                             migrations.RunPython.noop),
+    ]
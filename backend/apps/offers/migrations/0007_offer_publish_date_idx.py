@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('offers', '0006_offersearchterm'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='offer',
+            index=models.Index(fields=['publish_date', 'id'], name='offer_publish_date_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('offers', '0007_offer_publish_date_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='offer',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Última modificación'),
+        ),
+    ]
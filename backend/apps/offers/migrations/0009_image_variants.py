@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('offers', '0008_offer_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='offer',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -13,11 +13,43 @@ class Offer(AbstractService):
         verbose_name="Imagen",
         default="offers/default.webp"
     )
+    # {"source": image name, "thumbnail": file name, ...}, see core.images
+    image_variants = models.JSONField(default=dict, blank=True,
+                                      editable=False)
 
     class Meta:
         db_table = "offers"
         verbose_name = "Oferta"
         verbose_name_plural = "Ofertas"
+        indexes = [
+            # Keyset pagination seeks on (publish_date, id)
+            models.Index(fields=["publish_date", "id"],
+                         name="offer_publish_date_idx"),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.user.email}"
+
+
+class OfferSearchTerm(models.Model):
+    """
+    Inverted index entry: a folded term appearing in an offer's title or
+    description, with its relevance weight.
+    """
+    offer = models.ForeignKey(
+        Offer,
+        on_delete=models.CASCADE,
+        related_name="search_terms",
+    )
+    term = models.CharField(max_length=50)
+    weight = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        db_table = "offer_search_terms"
+        indexes = [
+            models.Index(fields=["term", "offer"],
+                         name="offer_search_term_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.term} ({self.offer_id})"
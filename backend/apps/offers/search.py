@@ -0,0 +1,106 @@
+import re
+import unicodedata
+from collections import Counter
+
+from django.db.models import OuterRef, Q, Subquery, Sum
+
+TOKEN_RE = re.compile(r"\w+")
+MAX_TERM_LENGTH = 50
+MAX_QUERY_TERMS = 8
+# Shorter query terms only match whole terms: as prefixes they would
+# range-scan a large share of the index
+MIN_PREFIX_LENGTH = 3
+
+# Relevance weight of each occurrence depending on the field it comes from
+TITLE_WEIGHT = 3
+DESCRIPTION_WEIGHT = 1
+
+
+def fold(text):
+    """
+    Lowercase the text and strip accents so "Diseño" and "diseno" match.
+    """
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(
+        char for char in decomposed if not unicodedata.combining(char)
+    ).casefold()
+
+
+def tokenize(text):
+    """Split a text into folded search terms."""
+    return [token[:MAX_TERM_LENGTH] for token in TOKEN_RE.findall(fold(text))]
+
+
+def weighted_terms(title, description):
+    """
+    Return a {term: weight} mapping for an offer, title terms weigh more
+    than description terms.
+    """
+    weights = Counter()
+    for term in tokenize(title):
+        weights[term] += TITLE_WEIGHT
+    for term in tokenize(description):
+        weights[term] += DESCRIPTION_WEIGHT
+    return weights
+
+
+def index_offer(offer):
+    """
+    Rebuild the inverted index entries of a single offer.
+    """
+    from .models import OfferSearchTerm
+
+    OfferSearchTerm.objects.filter(offer=offer).delete()
+    OfferSearchTerm.objects.bulk_create(
+        OfferSearchTerm(offer=offer, term=term, weight=weight)
+        for term, weight in weighted_terms(
+            offer.title, offer.description
+        ).items()
+    )
+
+
+def prefix_match(term):
+    """
+    Prefix lookup written as a range so every backend can resolve it with
+    an index range scan (SQLite never uses indexes for case-insensitive
+    LIKE).
+    """
+    return Q(term__gte=term, term__lt=term + chr(0x10FFFF))
+
+
+def term_match(term):
+    """Prefix match, or exact match for terms under MIN_PREFIX_LENGTH."""
+    if len(term) < MIN_PREFIX_LENGTH:
+        return Q(term=term)
+    return prefix_match(term)
+
+
+def search_offers(queryset, query):
+    """
+    Filter offers matching every term of the query (prefix match over the
+    inverted index, see term_match) and order them by relevance.
+    """
+    from .models import OfferSearchTerm
+
+    terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+    if not terms:
+        return queryset.none()
+
+    any_term = Q()
+    for term in terms:
+        queryset = queryset.filter(
+            pk__in=OfferSearchTerm.objects.filter(
+                term_match(term)
+            ).values("offer_id")
+        )
+        any_term |= term_match(term)
+
+    rank = (
+        OfferSearchTerm.objects.filter(any_term, offer=OuterRef("pk"))
+        .values("offer")
+        .annotate(total=Sum("weight"))
+        .values("total")
+    )
+    return queryset.annotate(search_rank=Subquery(rank)).order_by(
+        "-search_rank", "-publish_date", "-id"
+    )
@@ -1,16 +1,20 @@
 from rest_framework import serializers
 from .models import Offer
 from apps.users.serializers import UserSerializer
+from core.images import variant_urls
+from core.memo import MemoizedSerializerMixin
 from datetime import timedelta
 
 
-class OfferSerializer(serializers.ModelSerializer):
+class OfferSerializer(MemoizedSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for the Offer model.
     """
     image = serializers.ImageField(required=False, allow_null=True)
     user = UserSerializer(read_only=True)
     duration_minutes = serializers.SerializerMethodField()
+    # Resized WebP URLs, the original until they are generated
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Offer
@@ -24,9 +28,19 @@ class OfferSerializer(serializers.ModelSerializer):
             "location",
             "publish_date",
             "image",
+            "image_variants",
             "user",
         ]
         read_only_fields = ["id", "publish_date", "user", "is_active"]
+        # Columns read by the method fields, see core.fieldsets
+        source_columns = {
+            "duration_minutes": ["duration"],
+            "image_variants": ["image", "image_variants"],
+        }
+
+    def get_image_variants(self, obj):
+        return variant_urls(obj.image, obj.image_variants,
+                            self.context.get("request"))
 
     def get_duration_minutes(self, obj):
         if obj.duration:
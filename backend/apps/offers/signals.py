@@ -0,0 +1,47 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from apps.users.models import User
+from core.images import track_image_field, variants_ready
+from .cache import bump_offer_version, forget_owner_responses
+from .models import Offer
+from .search import index_offer
+
+INDEXED_FIELDS = {"title", "description"}
+
+
+@receiver(post_save, sender=Offer)
+def update_search_index(sender, instance, update_fields=None, **kwargs):
+    """
+    Keep the inverted index in sync with the offer text. Index entries are
+    removed by the cascade when the offer is deleted.
+    """
+    if update_fields and not INDEXED_FIELDS & set(update_fields):
+        return
+    index_offer(instance)
+
+
+@receiver(post_save, sender=Offer)
+@receiver(post_delete, sender=Offer)
+def invalidate_offer_cache(sender, **kwargs):
+    bump_offer_version()
+
+
+@receiver(post_save, sender=User)
+def invalidate_owner_profiles(sender, instance, created, **kwargs):
+    """Offers embed their owner's profile, new users have no offers."""
+    if not created:
+        transaction.on_commit(lambda: forget_owner_responses(instance.pk))
+
+
+track_image_field(Offer, "image", "image_variants")
+
+
+@receiver(variants_ready, sender=Offer)
+def invalidate_variant_urls(sender, **kwargs):
+    bump_offer_version()
+
+
+@receiver(variants_ready, sender=User)
+def invalidate_owner_picture_urls(sender, pk, **kwargs):
+    forget_owner_responses(pk)
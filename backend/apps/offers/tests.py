@@ -1,15 +1,44 @@
+import json
+import os
 import pytest
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO, StringIO
+from PIL import Image
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 from datetime import date, timedelta
 from apps.users.models import User
-from apps.offers.models import Offer
+from apps.offers.models import Offer, OfferSearchTerm
+from apps.offers.serializers import OfferSerializer
+from apps.offers.cache import bump_offer_version
+from apps.offers.views import OfferViewSet
+from core.cache import DEFAULT_POLICY, TieredCache, namespaces
+from core.compiled import CompiledListMixin
+from core.conditional import ConditionalGetMixin
+from core.middleware import RequestCoalescingMiddleware
+from core.middleware import stats as middleware_stats
 
 
 @pytest.mark.django_db
 class TestOfferEndpoints:
 
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        # Cached responses would outlive the rolled back rows
+        cache.clear()
+        for tiered in namespaces.values():
+            tiered.clear_local()
+
     @pytest.fixture
     def api_client(self):
         return APIClient()
@@ -165,42 +194,43 @@ class TestOfferEndpoints:
         response = api_client.get(url)
 
         assert response.status_code == status.HTTP_200_OK
-        assert any(o["id"] == offer.id for o in response.data)
+        assert any(o["id"] == offer.id for o in response.data["results"])
 
     def test_filter_offers_by_user(self, api_client, offer, user):
         url = reverse("offer-list") + f"?user={user.id}"
         response = api_client.get(url)
 
         assert response.status_code == status.HTTP_200_OK
-        assert all(o["user"]["email"] == user.email for o in response.data)
+        assert all(o["user"]["email"] == user.email
+                   for o in response.data["results"])
 
     def test_filter_offers_by_location(self, api_client, offer):
         url = reverse("offer-list") + "?location=Triana"
         response = api_client.get(url)
 
         assert response.status_code == status.HTTP_200_OK
-        assert all("Triana" in o["location"] for o in response.data)
+        assert all("Triana" in o["location"] for o in response.data["results"])
 
     def test_filter_offers_by_is_online(self, api_client, offer):
         url = reverse("offer-list") + "?is_online=true"
         response = api_client.get(url)
 
         assert response.status_code == status.HTTP_200_OK
-        assert all(o["is_online"] for o in response.data)
+        assert all(o["is_online"] for o in response.data["results"])
 
     def test_filter_offers_by_min_max_duration(self, api_client, offer):
         url = reverse("offer-list") + "?min_duration=0.5&max_duration=2"
         response = api_client.get(url)
 
         assert response.status_code == status.HTTP_200_OK
-        assert any(o["id"] == offer.id for o in response.data)
+        assert any(o["id"] == offer.id for o in response.data["results"])
 
     def test_filter_offers_invalid_min_duration(self, api_client, offer):
         url = reverse("offer-list") + "?min_duration=abc"
         response = api_client.get(url)
 
         assert response.status_code == status.HTTP_200_OK
-        assert any(o["id"] == offer.id for o in response.data)
+        assert any(o["id"] == offer.id for o in response.data["results"])
 
     def test_filter_offers_by_date_range(self, api_client, offer):
         today = date.today().isoformat()
@@ -209,14 +239,14 @@ class TestOfferEndpoints:
         response = api_client.get(url)
 
         assert response.status_code == status.HTTP_200_OK
-        assert any(o["id"] == offer.id for o in response.data)
+        assert any(o["id"] == offer.id for o in response.data["results"])
 
     def test_filter_offers_by_search(self, api_client, offer):
         url = reverse("offer-list") + "?q=Test"
         response = api_client.get(url)
 
         assert response.status_code == status.HTTP_200_OK
-        assert any("Test" in o["title"] for o in response.data)
+        assert any("Test" in o["title"] for o in response.data["results"])
 
     def test_filter_offers_by_injection_like_query(self, api_client, offer):
         """
@@ -226,3 +256,876 @@ class TestOfferEndpoints:
         response = api_client.get(url)
 
         assert response.status_code == status.HTTP_200_OK
+
+    # ------------------------
+    #  OFFER SEARCH
+    # ------------------------
+
+    def test_search_ignores_accents_and_case(self, api_client, user):
+        offer = Offer.objects.create(
+            title="Diseño gráfico",
+            description="Logotipos y carteles",
+            duration=timedelta(hours=2),
+            user=user
+        )
+        url = reverse("offer-list") + "?q=DISENO grafi"
+        response = api_client.get(url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [o["id"] for o in response.data["results"]] == [offer.id]
+
+    def test_search_ranks_title_matches_first(self, api_client, user):
+        in_description = Offer.objects.create(
+            title="Clases particulares",
+            description="Repaso de inglés",
+            duration=timedelta(hours=1),
+            user=user
+        )
+        in_title = Offer.objects.create(
+            title="Clases de inglés",
+            description="Todos los niveles",
+            duration=timedelta(hours=1),
+            user=user
+        )
+        url = reverse("offer-list") + "?q=ingles"
+        response = api_client.get(url)
+
+        assert [o["id"] for o in response.data["results"]] == [
+            in_title.id, in_description.id
+        ]
+
+    def test_search_requires_every_term(self, api_client, offer):
+        url = reverse("offer-list") + "?q=Test missing"
+        response = api_client.get(url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["results"] == []
+
+    def test_search_short_terms_match_whole_terms(self, api_client, user):
+        offer = Offer.objects.create(
+            title="Yoga al aire libre",
+            description="En el parque",
+            duration=timedelta(hours=1),
+            user=user
+        )
+        url = reverse("offer-list")
+
+        short = api_client.get(url, {"q": "al"})
+        prefix = api_client.get(url, {"q": "yo"})
+
+        assert [o["id"] for o in short.data["results"]] == [offer.id]
+        assert prefix.data["results"] == []
+
+    def test_search_index_follows_offer_updates(self, api_client, offer):
+        offer.title = "Jardinería"
+        offer.save()
+
+        old = api_client.get(reverse("offer-list") + "?q=Test")
+        new = api_client.get(reverse("offer-list") + "?q=jardineria")
+
+        assert old.data["results"] == []
+        assert [o["id"] for o in new.data["results"]] == [offer.id]
+
+    def test_search_index_removed_with_offer(self, offer):
+        assert OfferSearchTerm.objects.filter(offer=offer).exists()
+        offer.delete()
+        assert not OfferSearchTerm.objects.exists()
+
+    def test_rebuild_search_index_command(self, offer):
+        OfferSearchTerm.objects.all().delete()
+        call_command("rebuild_search_index", stdout=StringIO())
+
+        terms = set(OfferSearchTerm.objects.values_list("term", flat=True))
+        assert {"test", "offer", "description"} <= terms
+
+    # ------------------------
+    #  SPARSE FIELDSETS
+    # ------------------------
+
+    def test_sparse_fieldset(self, api_client, offer):
+        url = reverse("offer-list")
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get(url, {
+                "fields": "id,title,duration_minutes,user.full_name"
+            })
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["results"] == [{
+            "id": offer.id, "title": "Test Offer", "duration_minutes": 60,
+            "user": {"full_name": "Test User"},
+        }]
+        rows_query = queries.captured_queries[-1]["sql"]
+        assert "description" not in rows_query
+        assert "phone_number" not in rows_query
+
+    def test_sparse_fieldset_nested_as_id_unless_expanded(self, api_client,
+                                                          offer):
+        url = reverse("offer-detail", kwargs={"pk": offer.pk})
+
+        response = api_client.get(url, {"fields": "title,user"})
+        assert response.data == {"title": "Test Offer",
+                                 "user": offer.user.id}
+
+        response = api_client.get(url, {"fields": "title",
+                                        "expand": "user"})
+        assert set(response.data) == {"title", "user"}
+        assert response.data["user"]["email"] == offer.user.email
+
+        # Without `fields` the full representation is kept
+        response = api_client.get(url)
+        assert "description" in response.data
+
+    def test_sparse_fieldset_changes_etag(self, api_client, offer):
+        url = reverse("offer-list")
+        full = api_client.get(url)["ETag"]
+        sparse = api_client.get(url, {"fields": "id"})["ETag"]
+        assert full != sparse
+
+    # ------------------------
+    #  OFFER PAGINATION
+    # ------------------------
+
+    @pytest.fixture
+    def many_offers(self, user):
+        return [
+            Offer.objects.create(
+                title=f"Offer {i}",
+                description="Paginated offer",
+                duration=timedelta(hours=1),
+                is_online=i % 2 == 0,
+                user=user
+            )
+            for i in range(5)
+        ]
+
+    def test_pagination_walks_every_offer_once(self, api_client, many_offers):
+        url = reverse("offer-list") + "?page_size=2"
+        seen = []
+        while url:
+            response = api_client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            seen += [o["id"] for o in response.data["results"]]
+            url = response.data["next"]
+
+        # Same publish date, so the id breaks the tie (newest first)
+        assert seen == sorted((o.id for o in many_offers), reverse=True)
+
+    def test_pagination_previous_link(self, api_client, many_offers):
+        first = api_client.get(reverse("offer-list") + "?page_size=2")
+        second = api_client.get(first.data["next"])
+        back = api_client.get(second.data["previous"])
+
+        assert first.data["previous"] is None
+        assert back.data["results"] == first.data["results"]
+        assert back.data["previous"] is None
+
+    def test_pagination_keeps_filters(self, api_client, many_offers):
+        url = reverse("offer-list") + "?is_online=true&page_size=1"
+        seen = []
+        while url:
+            response = api_client.get(url)
+            seen += [o["id"] for o in response.data["results"]]
+            url = response.data["next"]
+
+        assert seen == sorted(
+            (o.id for o in many_offers if o.is_online), reverse=True
+        )
+
+    def test_pagination_with_search_ranking(self, api_client, many_offers):
+        url = reverse("offer-list") + "?q=offer&page_size=2"
+        seen = []
+        while url:
+            response = api_client.get(url)
+            seen += [o["id"] for o in response.data["results"]]
+            url = response.data["next"]
+
+        assert sorted(seen) == sorted(o.id for o in many_offers)
+
+    @pytest.mark.parametrize("cursor", ["abc", "eyJwIjogWzFdLCAiciI6IDB9",
+                                        "eyJwIjogWyJ4IiwgMV0sICJyIjogMH0"])
+    def test_pagination_invalid_cursor(self, api_client, offer, cursor):
+        url = reverse("offer-list") + f"?cursor={cursor}"
+        response = api_client.get(url)
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_list_query_count_is_constant(self, api_client, offer):
+        url = reverse("offer-list")
+        with CaptureQueriesContext(connection) as single:
+            api_client.get(url)
+
+        for i in range(5):
+            owner = User.objects.create_user(
+                email=f"owner{i}@example.com", password="password"
+            )
+            Offer.objects.create(title=f"Offer {i}", description="Other",
+                                 duration=timedelta(hours=1), user=owner)
+        with CaptureQueriesContext(connection) as many:
+            response = api_client.get(url)
+
+        assert len(response.data["results"]) == 6
+        assert len(many) == len(single)
+
+    def test_stream_every_offer(self, api_client, user, many_offers,
+                                monkeypatch):
+        monkeypatch.setattr(OfferViewSet, "stream_chunk_size", 2)
+        user.is_staff = True
+        user.save()
+        api_client.force_authenticate(user=user)
+
+        response = api_client.get(reverse("offer-list"), {"stream": "true"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.streaming
+        streamed = json.loads(b"".join(response.streaming_content))
+        paginated = api_client.get(reverse("offer-list"),
+                                   {"page_size": 10}).json()["results"]
+        assert streamed == paginated
+        assert len(streamed) == 5
+
+    def test_stream_requires_staff(self, api_client, user, many_offers):
+        api_client.force_authenticate(user=user)
+        response = api_client.get(reverse("offer-list"), {"stream": "true"})
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    # ------------------------
+    #  OFFER RESPONSE CACHE
+    # ------------------------
+
+    def test_anonymous_list_is_cached(self, api_client, offer):
+        url = reverse("offer-list")
+        response = api_client.get(url, {"is_online": "true", "page_size": 5})
+        assert response["X-Cache"] == "MISS"
+
+        # Same parameters in another order, no query at all
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get(url + "?page_size=5&is_online=true")
+
+        assert response["X-Cache"] == "HIT"
+        assert len(queries) == 0
+        assert response.data["results"][0]["id"] == offer.id
+
+    def test_offer_changes_invalidate_cache(self, api_client, offer):
+        url = reverse("offer-detail", kwargs={"pk": offer.pk})
+        api_client.get(url)
+
+        offer.title = "Renamed"
+        offer.save()
+        response = api_client.get(url)
+
+        assert response["X-Cache"] == "MISS"
+        assert response.data["title"] == "Renamed"
+
+        offer.delete()
+        assert api_client.get(url).status_code == status.HTTP_404_NOT_FOUND
+
+    def test_owner_changes_invalidate_cache(
+            self, api_client, user, offer, django_capture_on_commit_callbacks
+    ):
+        url = reverse("offer-detail", kwargs={"pk": offer.pk})
+        api_client.get(url)
+
+        user.first_name = "Renamed"
+        with django_capture_on_commit_callbacks(execute=True):
+            user.save()
+        assert api_client.get(url).data["user"]["first_name"] == "Renamed"
+
+        # Balance updates skip post_save, the ledger forgets the owners
+        other = User.objects.create_user(email="other@example.com",
+                                         password="password")
+        client = APIClient()
+        client.force_authenticate(user=other)
+        with django_capture_on_commit_callbacks(execute=True):
+            client.post(reverse("transaction-list"), {
+                "receiver_id": user.id, "title": "Gracias",
+                "duration": "01:00:00",
+            }, format="json")
+
+        response = api_client.get(url)
+        assert response["X-Cache"] == "MISS"
+        assert response.data["user"]["time_received"] == "01:00:00"
+
+    def test_other_users_changes_keep_cache(
+            self, api_client, offer, django_capture_on_commit_callbacks
+    ):
+        url = reverse("offer-list")
+        api_client.get(url)
+
+        sender = User.objects.create_user(email="sender@example.com",
+                                          password="password")
+        receiver = User.objects.create_user(email="receiver@example.com",
+                                            password="password")
+        client = APIClient()
+        client.force_authenticate(user=sender)
+        with django_capture_on_commit_callbacks(execute=True):
+            client.post(reverse("transaction-list"), {
+                "receiver_id": receiver.id, "title": "Gracias",
+                "duration": "01:00:00",
+            }, format="json")
+            receiver.first_name = "Renamed"
+            receiver.save()
+
+        assert api_client.get(url)["X-Cache"] == "HIT"
+
+    def test_write_during_render_not_cached_as_current(
+            self, api_client, offer, monkeypatch
+    ):
+        retrieve = ConditionalGetMixin.retrieve
+
+        def racing_retrieve(view, request, *args, **kwargs):
+            response = retrieve(view, request, *args, **kwargs)
+            # Another request saves the offer after this one read it
+            Offer.objects.filter(pk=offer.pk).update(title="New")
+            bump_offer_version()
+            return response
+
+        monkeypatch.setattr(ConditionalGetMixin, "retrieve", racing_retrieve)
+        url = reverse("offer-detail", kwargs={"pk": offer.pk})
+        assert api_client.get(url).data["title"] == "Test Offer"
+        monkeypatch.setattr(ConditionalGetMixin, "retrieve", retrieve)
+
+        response = api_client.get(url)
+        assert response["X-Cache"] == "MISS"
+        assert response.data["title"] == "New"
+
+    def test_authenticated_requests_skip_cache(self, api_client, user,
+                                               offer):
+        api_client.force_authenticate(user=user)
+        response = api_client.get(reverse("offer-list"))
+        assert "X-Cache" not in response
+
+    def test_tiered_cache_levels(self):
+        tiered = TieredCache("test", **{**DEFAULT_POLICY,
+                                        "version_ttl": 0.2})
+        tiered.set("key", {"value": 1})
+
+        assert tiered.get("key") == {"value": 1}  # from the shared cache
+        assert tiered.get("key") is tiered.get("key")  # then the local one
+        assert tiered.get_many(["key", "other"]) == {"key": {"value": 1}}
+        assert tiered.stats["shared_hits"] == 1
+        assert tiered.stats["local_hits"] == 3
+        assert tiered.stats["misses"] == 1
+        assert tiered.hit_rate() == 0.8
+
+        # Another process bumping the version reaches the local copies
+        # once this process's copy of the version expires
+        TieredCache("test", **DEFAULT_POLICY).invalidate()
+        assert tiered.get("key") == {"value": 1}
+        time.sleep(0.2)
+        assert tiered.get("key") is None
+
+        # Its own bump at once
+        tiered.set("key", {"value": 2})
+        assert tiered.get("key") == {"value": 2}
+        tiered.invalidate()
+        assert tiered.get("key") is None
+
+    def test_tiered_cache_single_flight(self):
+        tiered = TieredCache("test", **DEFAULT_POLICY)
+        builds = []
+
+        def build():
+            builds.append(1)
+            time.sleep(0.1)
+            return "built"
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(
+                lambda _: tiered.get_or_set("key", build), range(8)
+            ))
+
+        assert results == ["built"] * 8
+        assert len(builds) == 1
+        assert tiered.stats["waits"] == 7
+
+    def test_tiered_cache_lock_released_by_holder_only(self):
+        tiered = TieredCache("test", **{**DEFAULT_POLICY,
+                                        "lock_timeout": 0.1})
+        # Held by another process building the key for longer
+        lock_key = f"{tiered.make_key('key', tiered.version())}:lock"
+        cache.add(lock_key, "other", 10)
+
+        assert tiered.get_or_set("key", lambda: "built") == "built"
+        assert cache.get(lock_key) == "other"
+
+    # ------------------------
+    #  OFFER FRAGMENT CACHE
+    # ------------------------
+
+    @pytest.fixture
+    def rendered(self, monkeypatch):
+        """Number of offers serialized by each list request."""
+        counts = []
+        render_rows = CompiledListMixin.render_rows
+
+        def spy(view, rows):
+            counts.append(len(rows))
+            return render_rows(view, rows)
+
+        monkeypatch.setattr(CompiledListMixin, "render_rows", spy)
+        return counts
+
+    def test_list_assembled_from_fragments(self, api_client, user,
+                                           many_offers, rendered):
+        api_client.force_authenticate(user=user)
+        url = reverse("offer-list")
+        first = api_client.get(url)
+        second = api_client.get(url)
+
+        assert rendered == [5]
+        assert second.content == first.content
+        assert second.data["results"][0]["title"] == "Offer 4"
+
+        many_offers[0].title = "Renamed"
+        many_offers[0].save()
+        response = api_client.get(url)
+
+        assert rendered == [5, 1]
+        assert response.data["results"][-1]["title"] == "Renamed"
+
+        # Other formats render every offer
+        api_client.get(url, HTTP_ACCEPT="application/json; indent=2")
+        assert rendered == [5, 1, 5]
+
+    def test_owner_changes_refresh_fragments(
+            self, api_client, user, many_offers, rendered,
+            django_capture_on_commit_callbacks
+    ):
+        url = reverse("offer-list")
+        other = User.objects.create_user(email="other@example.com",
+                                         password="password")
+        api_client.force_authenticate(user=other)
+        api_client.get(url)
+
+        user.first_name = "Renamed"
+        user.save()
+        response = api_client.get(url)
+        assert rendered == [5, 5]
+        assert response.data["results"][0]["user"]["first_name"] == \
+            "Renamed"
+
+        with django_capture_on_commit_callbacks(execute=True):
+            api_client.post(reverse("transaction-list"), {
+                "receiver_id": user.id, "title": "Gracias",
+                "duration": "01:00:00",
+            }, format="json")
+        response = api_client.get(url)
+        assert rendered == [5, 5, 5]
+        assert response.data["results"][0]["user"]["time_received"] == \
+            "01:00:00"
+
+    # ------------------------
+    #  REQUEST COALESCING
+    # ------------------------
+
+    def coalesce(self, requests, get_response):
+        """Responses of requests handled at the same time."""
+        middleware = RequestCoalescingMiddleware(get_response)
+        with ThreadPoolExecutor(max_workers=len(requests)) as executor:
+            return list(executor.map(middleware, requests))
+
+    def test_identical_requests_coalesced(self):
+        calls = []
+
+        def get_response(request):
+            calls.append(request)
+            time.sleep(0.2)
+            return HttpResponse(b'{"results": []}',
+                                content_type="application/json")
+
+        # Same parameters in another order
+        urls = ["/api/offers/?is_online=true&page_size=5",
+                "/api/offers/?page_size=5&is_online=true"]
+        coalesced = middleware_stats["coalesced"]
+        responses = self.coalesce(
+            [RequestFactory().get(urls[n % 2]) for n in range(6)],
+            get_response,
+        )
+
+        assert len(calls) == 1
+        assert middleware_stats["coalesced"] - coalesced == 5
+        assert {response.content for response in responses} == \
+            {b'{"results": []}'}
+        assert all(response["Content-Type"] == "application/json"
+                   for response in responses)
+        assert len({id(response) for response in responses}) == 6
+
+    def test_coalescing_keeps_auth_scopes_apart(self):
+        calls = []
+
+        def get_response(request):
+            calls.append(request)
+            time.sleep(0.1)
+            return HttpResponse(request.META.get("HTTP_AUTHORIZATION", ""))
+
+        factory = RequestFactory()
+        responses = self.coalesce([
+            factory.get("/api/offers/"),
+            factory.get("/api/offers/", HTTP_AUTHORIZATION="Bearer a"),
+            factory.get("/api/offers/", HTTP_AUTHORIZATION="Bearer b"),
+        ], get_response)
+
+        assert len(calls) == 3
+        assert [response.content for response in responses] == \
+            [b"", b"Bearer a", b"Bearer b"]
+
+    def test_coalescing_wait_is_bounded(self, settings):
+        settings.REQUEST_COALESCING_TIMEOUT = 0.05
+        calls = []
+
+        def get_response(request):
+            calls.append(request)
+            time.sleep(0.3)
+            return HttpResponse("slow")
+
+        timeouts = middleware_stats["timeouts"]
+        responses = self.coalesce(
+            [RequestFactory().get("/api/offers/") for _ in range(3)],
+            get_response,
+        )
+
+        assert len(calls) == 3
+        assert middleware_stats["timeouts"] - timeouts == 2
+        assert all(response.content == b"slow" for response in responses)
+
+    # ------------------------
+    #  OFFER FACETS
+    # ------------------------
+
+    @pytest.fixture
+    def faceted_offers(self, user):
+        specs = [
+            (timedelta(minutes=15), True, "Sevilla"),
+            (timedelta(minutes=30), False, "Sevilla"),
+            (timedelta(hours=1), True, "Madrid"),
+            (timedelta(hours=3), False, None),
+        ]
+        offers = [
+            Offer.objects.create(title=f"Offer {i}", description="Facet",
+                                 duration=duration, is_online=is_online,
+                                 location=location, user=user)
+            for i, (duration, is_online, location) in enumerate(specs)
+        ]
+        # Published two months ago
+        Offer.objects.filter(pk=offers[-1].pk).update(
+            publish_date=date.today() - timedelta(days=60)
+        )
+        return offers
+
+    def test_facets_counts(self, api_client, faceted_offers):
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get(reverse("offer-facets"))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(queries) == 1
+        data = response.data
+        assert data["total"] == 4
+        assert data["is_online"] == {"online": 2, "in_person": 2}
+        assert [bucket["count"] for bucket in data["duration"]] == \
+            [2, 1, 0, 1]
+        assert data["locations"] == [
+            {"location": "Sevilla", "count": 2},
+            {"location": "Madrid", "count": 1},
+        ]
+        assert [bucket["count"] for bucket in data["publish_date"]] == \
+            [3, 3, 4]
+
+    def test_facets_honor_list_filters(self, api_client, faceted_offers):
+        response = api_client.get(reverse("offer-facets"),
+                                  {"is_online": "true", "q": "offer"})
+
+        assert response.data["total"] == 2
+        assert response.data["is_online"] == {"online": 2, "in_person": 0}
+        assert [item["location"] for item in response.data["locations"]] \
+            == ["Madrid", "Sevilla"]
+
+    def test_facets_cached_until_offers_change(self, api_client, user,
+                                               faceted_offers):
+        url = reverse("offer-facets")
+        api_client.get(url)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get(url)
+        assert len(queries) == 0
+        assert response.data["total"] == 4
+
+        Offer.objects.create(title="New", description="New offer",
+                             duration=timedelta(hours=2), user=user)
+        assert api_client.get(url).data["total"] == 5
+
+    # ------------------------
+    #  CONDITIONAL REQUESTS
+    # ------------------------
+
+    def test_conditional_get_offer(self, api_client, user, offer):
+        api_client.force_authenticate(user=user)
+        url = reverse("offer-detail", kwargs={"pk": offer.pk})
+        response = api_client.get(url)
+        etag = response["ETag"]
+        assert "Last-Modified" in response
+
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert not response.content
+
+        # The embedded owner changes the representation too
+        user.first_name = "Renamed"
+        user.save()
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response["ETag"] != etag
+
+    def test_conditional_list_from_cache(self, api_client, offer):
+        url = reverse("offer-list")
+        etag = api_client.get(url)["ETag"]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response["X-Cache"] == "HIT"
+        assert len(queries) == 0
+
+        Offer.objects.create(title="New", description="New offer",
+                             duration=timedelta(hours=1), user=offer.user)
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data["results"]) == 2
+
+    # ------------------------
+    #  OFFER IMAGES
+    # ------------------------
+
+    @pytest.fixture
+    def media(self, settings, tmp_path):
+        settings.MEDIA_ROOT = tmp_path
+        settings.IMAGE_WORKERS = 0  # process inline on commit
+        return tmp_path
+
+    def photo(self, size=(2000, 1000)):
+        image = Image.new("RGB", size, "orange")
+        exif = Image.Exif()
+        exif[0x0112] = 6  # orientation: rotate 90°
+        exif[0x010F] = "Camera maker"
+        output = BytesIO()
+        image.save(output, format="JPEG", exif=exif)
+        return SimpleUploadedFile("photo.jpg", output.getvalue(),
+                                  content_type="image/jpeg")
+
+    def test_original_stored_without_metadata(self, user, media):
+        offer = Offer.objects.create(
+            title="Con foto", description="Foto", user=user,
+            duration=timedelta(hours=1), image=self.photo((3000, 1000)),
+        )
+
+        with Image.open(media / offer.image.name) as original:
+            assert original.format == "JPEG"
+            assert not original.getexif()  # no camera, GPS or orientation
+            assert original.size == (853, 2560)  # rotated, then bounded
+
+    def test_image_variants_generated_after_upload(
+            self, api_client, user, media, django_capture_on_commit_callbacks
+    ):
+        api_client.force_authenticate(user=user)
+        with django_capture_on_commit_callbacks(execute=True):
+            response = api_client.post(reverse("offer-list"), {
+                "title": "Con foto", "description": "Foto grande",
+                "duration": "01:00:00", "image": self.photo(),
+            }, format="multipart")
+        assert response.status_code == status.HTTP_201_CREATED
+
+        offer = Offer.objects.get(pk=response.data["id"])
+        assert offer.image_variants["source"] == offer.image.name
+        with Image.open(media / offer.image_variants["thumbnail"]) as thumb:
+            assert thumb.format == "WEBP"
+            assert thumb.size == (160, 320)  # EXIF rotation applied
+            assert not thumb.getexif()
+        with Image.open(media / offer.image_variants["medium"]) as medium:
+            assert max(medium.size) == 960
+
+        data = api_client.get(
+            reverse("offer-detail", kwargs={"pk": offer.pk})
+        ).data
+        assert data["image_variants"]["thumbnail"].endswith(
+            offer.image_variants["thumbnail"]
+        )
+
+    def test_image_variants_fall_back_to_original(self, api_client, user,
+                                                  media):
+        # Without the commit the variants are not generated yet
+        api_client.force_authenticate(user=user)
+        response = api_client.post(reverse("offer-list"), {
+            "title": "Con foto", "description": "Foto grande",
+            "duration": "01:00:00", "image": self.photo(),
+        }, format="multipart")
+
+        variants = response.data["image_variants"]
+        assert variants["thumbnail"] == response.data["image"]
+        assert variants["medium"] == response.data["image"]
+
+    def test_generate_image_variants_command(self, user, media):
+        offer = Offer.objects.create(
+            title="Antigua", description="Subida antes", user=user,
+            duration=timedelta(hours=1), image=self.photo((400, 300)),
+        )
+        assert offer.image_variants == {}
+
+        out = StringIO()
+        call_command("generate_image_variants", "--model", "offers",
+                     stdout=out)
+
+        assert "1 offers images processed" in out.getvalue()
+        offer.refresh_from_db()
+        assert set(offer.image_variants) == {"source", "thumbnail", "medium"}
+
+    def test_identical_images_share_one_file(self, user, media):
+        first = Offer.objects.create(
+            title="Una", description="Foto", user=user,
+            duration=timedelta(hours=1), image=self.photo((400, 300)),
+        )
+        second = Offer.objects.create(
+            title="Otra", description="Misma foto", user=user,
+            duration=timedelta(hours=1), image=self.photo((400, 300)),
+        )
+
+        assert first.image.name == second.image.name
+        assert first.image.name.startswith("offers/")
+        assert first.image.name.endswith(".jpg")
+        assert len([path for path in (media / "offers").rglob("*")
+                    if path.is_file()]) == 1
+
+    def test_collect_media_garbage_command(self, user, media):
+        kept = Offer.objects.create(
+            title="Con foto", description="Se queda", user=user,
+            duration=timedelta(hours=1), image=self.photo((400, 300)),
+        )
+        call_command("generate_image_variants", stdout=StringIO())
+        replaced = Offer.objects.create(
+            title="Otra", description="Cambia de foto", user=user,
+            duration=timedelta(hours=1), image=self.photo((300, 200)),
+        )
+        orphan = replaced.image.name
+        replaced.image = kept.image.name
+        replaced.save()
+
+        out = StringIO()
+        call_command("collect_media_garbage", "--grace", "0", "--dry-run",
+                     stdout=out)
+        assert "1 unreferenced files would be deleted" in out.getvalue()
+        assert (media / orphan).exists()
+
+        call_command("collect_media_garbage", "--grace", "0", stdout=out)
+        assert not (media / orphan).exists()
+        kept.refresh_from_db()
+        assert (media / kept.image.name).exists()
+        for name in ("thumbnail", "medium"):
+            assert (media / kept.image_variants[name]).exists()
+
+        # New files are kept during the grace period
+        recent = Offer.objects.create(
+            title="Nueva", description="Recién subida", user=user,
+            duration=timedelta(hours=1), image=self.photo((200, 100)),
+        )
+        new_file = recent.image.name
+        recent.delete()
+        call_command("collect_media_garbage", stdout=out)
+        assert (media / new_file).exists()
+
+    def test_reused_orphan_survives_garbage_collection(self, user, media):
+        """Uploading the bytes of an old orphan starts its grace again"""
+        orphan = Offer.objects.create(
+            title="Vieja", description="Foto", user=user,
+            duration=timedelta(hours=1), image=self.photo((400, 300)),
+        )
+        path = media / orphan.image.name
+        orphan.delete()
+        os.utime(path, (time.time() - 7200, time.time() - 7200))
+
+        reused = Offer.objects.create(
+            title="Nueva", description="Misma foto", user=user,
+            duration=timedelta(hours=1), image=self.photo((400, 300)),
+        )
+        assert media / reused.image.name == path
+        assert path.stat().st_mtime > time.time() - 60
+
+        # As if the references had been counted before the upload
+        reused.delete()
+        call_command("collect_media_garbage", stdout=StringIO())
+        assert path.exists()
+
+    def test_media_served_with_immutable_caching(self, api_client, user,
+                                                 media):
+        offer = Offer.objects.create(
+            title="Con foto", description="Foto", user=user,
+            duration=timedelta(hours=1), image=self.photo((400, 300)),
+        )
+        url = offer.image.url
+
+        response = api_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == "image/jpeg"
+        assert "immutable" in response["Cache-Control"]
+        body = b"".join(response.streaming_content)
+        assert body == (media / offer.image.name).read_bytes()
+
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        response = api_client.get(url, HTTP_RANGE="bytes=0-9")
+        assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+        assert response["Content-Range"] == f"bytes 0-9/{len(body)}"
+        assert b"".join(response.streaming_content) == body[:10]
+
+        response = api_client.get(url, HTTP_RANGE=f"bytes={len(body)}-")
+        assert response.status_code == \
+            status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+
+    def test_media_handed_to_proxy(self, api_client, user, media, settings):
+        settings.MEDIA_ACCEL = "x-accel-redirect"
+        offer = Offer.objects.create(
+            title="Con foto", description="Foto", user=user,
+            duration=timedelta(hours=1), image=self.photo((400, 300)),
+        )
+
+        response = api_client.get(offer.image.url)
+        assert response.status_code == status.HTTP_200_OK
+        assert response["X-Accel-Redirect"] == \
+            f"/protected-media/{offer.image.name}"
+        assert response.content == b""
+
+    def test_media_rejects_traversal_and_temporary_files(self, api_client,
+                                                         media):
+        (media / "offers").mkdir()
+        (media / "offers" / ".upload-abc").write_bytes(b"partial")
+        (media.parent / "secret.txt").write_text("secret")
+
+        for path in ("offers/.upload-abc", "../secret.txt", "offers"):
+            response = api_client.get(f"/media/{path}")
+            assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_compiled_list_matches_serializer(self, api_client, user,
+                                              offer, media):
+        Offer.objects.create(
+            title="Con foto", description="Foto", user=user,
+            duration=timedelta(minutes=45), image=self.photo((400, 300)),
+        )
+        Offer.objects.create(title="Sin foto", description="Nada",
+                             duration=timedelta(hours=2), image=None,
+                             location=None, user=user)
+        call_command("generate_image_variants", stdout=StringIO())
+
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get(reverse("offer-list"))
+
+        offers = Offer.objects.order_by("-publish_date", "-id")
+        expected = OfferSerializer(
+            offers, many=True, context={"request": response.wsgi_request}
+        ).data
+        assert response.content == JSONRenderer().render(
+            {"next": None, "previous": None, "results": expected}
+        )
+        # values() rows: only the rendered columns are read
+        assert "password" not in queries.captured_queries[-1]["sql"]
+        # The owner of every offer is rendered once
+        owners = {id(row["user"]) for row in response.data["results"]}
+        assert len(owners) == 1
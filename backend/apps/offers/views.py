@@ -1,23 +1,36 @@
 from rest_framework import status, viewsets, permissions
+from rest_framework.decorators import action
 from rest_framework.response import Response
+from core.compiled import CompiledListMixin
+from core.conditional import ConditionalGetMixin, get_path
+from core.fieldsets import SparseFieldsetMixin
+from core.fragments import FragmentCacheMixin
+from core.memo import RenderMemoMixin
+from core.prefetch import SerializerPrefetchMixin
+from core.streaming import StreamingListMixin
 from .models import Offer
 from .serializers import OfferSerializer
-from django.db.models import Q
+from .search import search_offers
+from .cache import cached_facets, cached_response
+from .facets import offer_facets
 from datetime import timedelta
 
 
-class OfferViewSet(viewsets.ModelViewSet):
+class OfferViewSet(StreamingListMixin, SparseFieldsetMixin, FragmentCacheMixin,
+                   CompiledListMixin, RenderMemoMixin, SerializerPrefetchMixin,
+                   ConditionalGetMixin, viewsets.ModelViewSet):
     """
     API endpoint to manage Offers.
     Only authenticated users can create offers.
     Only the owner can update or delete their offer.
     """
-    queryset = Offer.objects.all().order_by("-publish_date")
+    fragment_namespace = "offer_fragments"
+    queryset = Offer.objects.all().order_by("-publish_date", "-id")
     serializer_class = OfferSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     def get_queryset(self):
-        queryset = Offer.objects.all().order_by("-publish_date")
+        queryset = Offer.objects.all().order_by("-publish_date", "-id")
 
         # Query params filters (TODO connect with frontend in a future)
         user_id = self.request.query_params.get("user")
@@ -62,16 +75,50 @@ class OfferViewSet(viewsets.ModelViewSet):
 
         search = self.request.query_params.get("q")
         if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) |
-                Q(description__icontains=search)
-            )
+            # Ranked by relevance instead of publish date
+            queryset = search_offers(queryset, search)
         user_id = self.request.query_params.get("user")
         if user_id:
             queryset = queryset.filter(user_id=user_id)
 
         return queryset
 
+    # Owners of the offers rendered, for the anonymous response cache
+    row_columns = ("user_id",)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.owner_ids = set()
+
+    def render_rows(self, rows):
+        rows = list(rows)
+        self.owner_ids.update(get_path(row, "user_id") for row in rows)
+        return super().render_rows(rows)
+
+    def get_object(self):
+        instance = super().get_object()
+        self.owner_ids.add(instance.user_id)
+        return instance
+
+    def list(self, request, *args, **kwargs):
+        return cached_response(super().list, request,
+                               lambda: self.owner_ids, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return cached_response(super().retrieve, request,
+                               lambda: self.owner_ids, *args, **kwargs)
+
+    @action(detail=False, methods=["get"])
+    def facets(self, request):
+        """
+        Recuento de ofertas por cada valor de los filtros del listado
+        (online, duración, ubicación y fecha de publicación), aplicando
+        los mismos filtros que el listado.
+        """
+        queryset = self.get_queryset()
+        return Response(cached_facets(request,
+                                      lambda: offer_facets(queryset)))
+
     def create(self, request, *args, **kwargs):
 
         serializer = self.get_serializer(data=request.data)
@@ -20,6 +20,8 @@ class AbstractService(models.Model):
                                 verbose_name="Ubicación")
     publish_date = models.DateField(auto_now_add=True,
                                     verbose_name="Fecha de publicación")
+    updated_at = models.DateTimeField(auto_now=True,
+                                      verbose_name="Última modificación")
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -0,0 +1,222 @@
+from collections import defaultdict
+from datetime import timedelta
+from itertools import islice
+from django.db import (IntegrityError, connection,
+                       transaction as db_transaction)
+from django.db.models import Case, F, OuterRef, Subquery, Sum, When
+from django.db.models.functions import Now
+from django.utils import timezone
+from core.authentication import user_cache
+from apps.offers.cache import forget_owner_responses
+from apps.users.models import User
+from .models import DailyBalance, Transaction
+
+
+def apply_transfer(sender_id, receiver_id, duration):
+    """
+    Add `duration` to the sender's time_sent and the receiver's
+    time_received in a single UPDATE.
+
+    The increments are computed by the database (F expressions), so
+    concurrent transfers never overwrite each other, and both rows are
+    locked in primary key order, so transfers in opposite directions
+    cannot deadlock.
+    """
+    User.objects.filter(pk__in=[sender_id, receiver_id]).order_by(
+        "pk"
+    ).update(
+        time_sent=Case(
+            When(pk=sender_id, then=F("time_sent") + duration),
+            default=F("time_sent"),
+        ),
+        time_received=Case(
+            When(pk=receiver_id, then=F("time_received") + duration),
+            default=F("time_received"),
+        ),
+        updated_at=Now(),  # update() skips auto_now
+    )
+
+
+def record_transfer(serializer, sender):
+    """
+    Save a validated TransactionSerializer and update both balances in the
+    same database transaction.
+
+    The balances are updated first: the INSERT checks the foreign keys,
+    which on InnoDB takes shared locks on both users in insert order, and
+    two transfers sharing a user would then deadlock upgrading them. With
+    the UPDATE first the rows are already locked, in primary key order.
+    """
+    data = serializer.validated_data
+    with db_transaction.atomic():
+        apply_transfer(sender.pk, data["receiver"].pk, data["duration"])
+        transfer = serializer.save(sender=sender)
+        update_daily_balances(timezone.localdate(transfer.datetime), {
+            transfer.sender_id: (transfer.duration, timedelta(0)),
+            transfer.receiver_id: (timedelta(0), transfer.duration),
+        })
+        forget_cached_users(transfer.sender_id, transfer.receiver_id)
+        refresh_totals(transfer.sender, transfer.receiver)
+    return transfer
+
+
+def record_transfers(sender, transfers):
+    """
+    Insert a batch of unsaved Transaction instances sent by `sender` and
+    apply the aggregated balance changes, one UPDATE per affected user,
+    all in the same database transaction. The UPDATEs go first, see
+    record_transfer.
+    """
+    deltas = defaultdict(lambda: [timedelta(0), timedelta(0)])
+    for transfer in transfers:
+        transfer.sender = sender
+        deltas[sender.pk][0] += transfer.duration
+        deltas[transfer.receiver_id][1] += transfer.duration
+
+    with db_transaction.atomic():
+        for pk in sorted(deltas):  # same lock order as apply_transfer
+            sent, received = deltas[pk]
+            changes = {"updated_at": Now()}
+            if sent:
+                changes["time_sent"] = F("time_sent") + sent
+            if received:
+                changes["time_received"] = F("time_received") + received
+            User.objects.filter(pk=pk).update(**changes)
+        if connection.features.can_return_rows_from_bulk_insert:
+            created = Transaction.objects.bulk_create(transfers)
+        else:
+            # MySQL does not return the ids of a multi-row INSERT, the
+            # response needs them
+            for transfer in transfers:
+                transfer.save(force_insert=True)
+            created = transfers
+        update_daily_balances(timezone.localdate(created[0].datetime),
+                              deltas)
+        forget_cached_users(*deltas)
+        refresh_totals(sender, *(transfer.receiver for transfer in created))
+    return created
+
+
+def refresh_totals(*users):
+    """
+    Read the totals the UPDATEs left into the instances, in one query, so
+    the response shows them. Adding the durations in memory is not enough:
+    `sender` is request.user, a copy cached by the authentication of this
+    process, which may have missed transfers handled by other workers.
+    """
+    totals = {
+        pk: rest for pk, *rest in User.objects.filter(
+            pk__in={user.pk for user in users}
+        ).values_list("pk", "time_sent", "time_received", "updated_at")
+    }
+    for user in users:
+        user.time_sent, user.time_received, user.updated_at = \
+            totals[user.pk]
+
+
+def update_daily_balances(day, deltas):
+    """
+    Add {user_id: (sent, received)} to the users' rollup rows of `day`.
+    Missing rows start from the balance of the user's previous row and are
+    inserted together.
+
+    Callers hold the user row locks, so no other transfer touches the same
+    rollups until this transaction commits.
+    """
+    existing = set(
+        DailyBalance.objects.filter(user_id__in=deltas, day=day)
+        .values_list("user_id", flat=True)
+    )
+    for pk in sorted(existing):
+        add_to_daily_balance(pk, day, *deltas[pk])
+
+    missing = sorted(set(deltas) - existing)
+    if not missing:
+        return
+    previous = dict(
+        User.objects.filter(pk__in=missing).annotate(
+            previous=Subquery(
+                DailyBalance.objects.filter(user=OuterRef("pk"),
+                                            day__lt=day)
+                .order_by("-day").values("balance")[:1]
+            )
+        ).values_list("pk", "previous")
+    )
+    rows = []
+    for pk in missing:
+        sent, received = deltas[pk]
+        balance = (previous.get(pk) or timedelta(0)) + received - sent
+        rows.append(DailyBalance(user_id=pk, day=day, sent=sent,
+                                 received=received, balance=balance))
+    try:
+        with db_transaction.atomic():
+            DailyBalance.objects.bulk_create(rows)
+    except IntegrityError:
+        # A row appeared since the lookup (the backfill, or a snapshot
+        # older than the locks), fall back to one row at a time
+        for row in rows:
+            if not add_to_daily_balance(row.user_id, day, row.sent,
+                                        row.received):
+                row.save()
+
+
+def add_to_daily_balance(user_id, day, sent, received):
+    """Increment an existing rollup row, return whether there was one."""
+    return DailyBalance.objects.filter(user_id=user_id, day=day).update(
+        sent=F("sent") + sent,
+        received=F("received") + received,
+        balance=F("balance") + (received - sent),
+    )
+
+
+def forget_cached_users(*user_ids):
+    """
+    The balance UPDATEs bypass post_save, drop the cached copies of the
+    users (and the offer responses embedding their totals) once the new
+    totals are committed.
+    """
+    db_transaction.on_commit(lambda: user_cache.forget(*user_ids))
+    db_transaction.on_commit(lambda: forget_owner_responses(*user_ids))
+
+
+def ledger_totals(user_ids):
+    """
+    Return {user_id: (sent, received)} recomputed from the transactions
+    table with one grouped query per side.
+    """
+    totals = {pk: [timedelta(0), timedelta(0)] for pk in user_ids}
+    for side, column in enumerate(("sender_id", "receiver_id")):
+        rows = (
+            Transaction.objects.filter(**{f"{column}__in": user_ids})
+            .order_by()
+            .values(column)
+            .annotate(total=Sum("duration"))
+            .values_list(column, "total")
+        )
+        for pk, total in rows:
+            totals[pk][side] = total
+    return {pk: tuple(values) for pk, values in totals.items()}
+
+
+def chunks(iterable, size):
+    """Split an iterable into lists of at most `size` items."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def user_id_chunks(size):
+    """
+    Yield every user id in primary key order, `size` ids at a time, with a
+    keyset query per chunk instead of a cursor held open.
+    """
+    last = 0
+    while True:
+        ids = list(
+            User.objects.filter(pk__gt=last).order_by("pk")
+            .values_list("pk", flat=True)[:size]
+        )
+        if not ids:
+            return
+        yield ids
+        last = ids[-1]
@@ -0,0 +1,59 @@
+from collections import defaultdict
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import transaction as db_transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from apps.transactions.ledger import user_id_chunks
+from apps.transactions.models import DailyBalance, Transaction
+from apps.users.models import User
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily balance rollups from the transactions table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=500,
+            help="Users rebuilt per database transaction.",
+        )
+
+    def handle(self, *args, **options):
+        rows = 0
+        for chunk in user_id_chunks(options["batch_size"]):
+            rows += self.rebuild(chunk)
+        self.stdout.write(self.style.SUCCESS(f"{rows} daily balances."))
+
+    def rebuild(self, user_ids):
+        """
+        Replace the rollups of a batch of users. The user rows are locked
+        so transfers wait until the batch is rebuilt.
+        """
+        days = defaultdict(lambda: [timedelta(0), timedelta(0)])
+        with db_transaction.atomic():
+            list(User.objects.select_for_update()
+                 .filter(pk__in=user_ids).order_by("pk").values_list("pk"))
+            for side, column in enumerate(("sender_id", "receiver_id")):
+                totals = (
+                    Transaction.objects.filter(**{f"{column}__in": user_ids})
+                    .annotate(day=TruncDate("datetime"))
+                    .order_by()
+                    .values(column, "day")
+                    .annotate(total=Sum("duration"))
+                    .values_list(column, "day", "total")
+                )
+                for pk, day, total in totals:
+                    days[(pk, day)][side] += total
+
+            balances = []
+            running = defaultdict(timedelta)
+            for (pk, day), (sent, received) in sorted(days.items()):
+                running[pk] += received - sent
+                balances.append(DailyBalance(
+                    user_id=pk, day=day, sent=sent, received=received,
+                    balance=running[pk],
+                ))
+
+            DailyBalance.objects.filter(user_id__in=user_ids).delete()
+            DailyBalance.objects.bulk_create(balances, batch_size=1000)
+        return len(balances)
@@ -0,0 +1,72 @@
+from argparse import ArgumentTypeError
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from apps.transactions.export import (
+    EXPORT_CHUNK_SIZE,
+    EXPORT_FORMATS,
+    export_lines,
+    filter_ledger,
+    ledger_rows,
+)
+from apps.transactions.models import Transaction
+
+
+def date_argument(value):
+    day = parse_date(value)
+    if day is None:
+        raise ArgumentTypeError(f"invalid date: {value!r}")
+    return day
+
+
+class Command(BaseCommand):
+    help = "Stream the transaction ledger as CSV or NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format", dest="output", choices=EXPORT_FORMATS,
+            default="csv",
+        )
+        parser.add_argument("--from-date", type=date_argument,
+                            help="First day included (YYYY-MM-DD).")
+        parser.add_argument("--to-date", type=date_argument,
+                            help="Last day included (YYYY-MM-DD).")
+        parser.add_argument(
+            "--user", type=int,
+            help="Only transactions sent or received by this user id.",
+        )
+        parser.add_argument(
+            "--file", help="Write to this path instead of stdout.",
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=EXPORT_CHUNK_SIZE,
+            help="Rows read per query.",
+        )
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive.")
+        transactions = filter_ledger(
+            Transaction.objects.all(),
+            from_date=options["from_date"],
+            to_date=options["to_date"],
+            user_id=options["user"],
+        )
+        lines = export_lines(
+            options["output"],
+            ledger_rows(transactions, chunk_size=options["chunk_size"]),
+        )
+
+        if not options["file"]:
+            for line in lines:
+                self.stdout.write(line, ending="")
+            return
+
+        written = 0
+        with open(options["file"], "w", encoding="utf-8", newline="") as f:
+            for line in lines:
+                f.write(line)
+                written += 1
+        if options["output"] == "csv":
+            written -= 1  # header
+        self.stderr.write(f"{written} transactions written to "
+                          f"{options['file']}.")
@@ -0,0 +1,129 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction as db_transaction
+from django.db.models import Max
+from django.utils import timezone
+from apps.transactions.ledger import (
+    chunks, forget_cached_users, ledger_totals, user_id_chunks,
+)
+from apps.transactions.models import ReconciliationRun, Transaction
+from apps.users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute time_sent/time_received from the transactions table and "
+        "report (or repair) users whose totals drifted. Without --full, "
+        "only the users with transactions created after the last run are "
+        "checked: edits and deletes of older transactions (e.g. in the "
+        "admin) go unnoticed until the next --full run, schedule one "
+        "regularly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repair", action="store_true",
+            help="Overwrite drifted totals with the recomputed values.",
+        )
+        parser.add_argument(
+            "--full", action="store_true",
+            help="Check every user instead of only the users with "
+                 "transactions created after the last run. Needed to "
+                 "catch edited or deleted older transactions.",
+        )
+        parser.add_argument(
+            "--since-id", type=int, default=None,
+            help="Check users with transactions after this id.",
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=1000,
+            help="Users aggregated per query.",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        high_water_mark = (
+            Transaction.objects.aggregate(last=Max("id"))["last"] or 0
+        )
+
+        since = options["since_id"]
+        if since is None and not options["full"]:
+            last_run = ReconciliationRun.objects.order_by("-id").first()
+            since = last_run.last_transaction_id if last_run else None
+
+        if since is None:
+            user_chunks = user_id_chunks(chunk_size)
+        else:
+            user_chunks = chunks(self.touched_user_ids(since, chunk_size),
+                                 chunk_size)
+            self.stdout.write(f"Transactions after #{since} (edits and "
+                              "deletes of older ones need --full).")
+
+        checked = drifted = 0
+        for chunk in user_chunks:
+            checked += len(chunk)
+            mismatched = self.find_mismatches(chunk)
+            drifted += len(mismatched)
+            if mismatched and options["repair"]:
+                self.repair(mismatched)
+
+        ReconciliationRun.objects.create(
+            last_transaction_id=high_water_mark,
+            users_checked=checked,
+            mismatches=drifted,
+            repaired=options["repair"],
+        )
+        action = "repaired" if options["repair"] else "found"
+        self.stdout.write(self.style.SUCCESS(
+            f"{checked} users checked, {drifted} mismatches {action}."
+        ))
+
+    def touched_user_ids(self, since, chunk_size):
+        """Users that sent or received a transaction after `since`."""
+        touched = set()
+        rows = (
+            Transaction.objects.filter(id__gt=since)
+            .values_list("sender_id", "receiver_id")
+            .iterator(chunk_size=chunk_size)
+        )
+        for sender_id, receiver_id in rows:
+            touched.update((sender_id, receiver_id))
+        return sorted(touched)
+
+    def find_mismatches(self, user_ids):
+        """Return the ids of the users whose totals differ from the ledger."""
+        totals = ledger_totals(user_ids)
+        mismatched = []
+        users = User.objects.filter(pk__in=user_ids).values_list(
+            "pk", "email", "time_sent", "time_received"
+        )
+        for pk, email, time_sent, time_received in users:
+            sent, received = totals[pk]
+            if (time_sent, time_received) != (sent, received):
+                mismatched.append(pk)
+                self.stdout.write(
+                    f"{email}: time_sent {time_sent} (ledger {sent}), "
+                    f"time_received {time_received} (ledger {received})"
+                )
+        return mismatched
+
+    def repair(self, user_ids):
+        """
+        Rewrite the totals while holding the user rows, so transfers made
+        meanwhile are either counted in the sums or applied afterwards.
+        """
+        with db_transaction.atomic():
+            users = list(
+                User.objects.select_for_update()
+                .filter(pk__in=user_ids).order_by("pk")
+            )
+            totals = ledger_totals(user_ids)
+            now = timezone.now()
+            for user in users:
+                user.time_sent, user.time_received = totals[user.pk]
+                user.updated_at = now
+            User.objects.bulk_update(
+                users, ["time_sent", "time_received", "updated_at"]
+            )
+            # bulk_update sends no post_save, drop the cached users and
+            # offer responses once the totals are committed
+            forget_cached_users(*user_ids)
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('offers', '0007_offer_publish_date_idx'),
+        ('transactions', '0003_alter_transaction_offer'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transaction',
+            name='receiver',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='received_transactions', to=settings.AUTH_USER_MODEL, verbose_name='Receptor'),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='sender',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='sent_transactions', to=settings.AUTH_USER_MODEL, verbose_name='Emisor'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['sender', 'datetime'], name='transaction_sender_dt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['receiver', 'datetime'], name='transaction_receiver_dt_idx'),
+        ),
+    ]
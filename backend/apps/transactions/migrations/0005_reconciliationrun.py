@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0004_transaction_datetime_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReconciliationRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('last_transaction_id', models.PositiveIntegerField(default=0)),
+                ('users_checked', models.PositiveIntegerField(default=0)),
+                ('mismatches', models.PositiveIntegerField(default=0)),
+                ('repaired', models.BooleanField(default=False)),
+            ],
+            options={
+                'verbose_name': 'Conciliación',
+                'verbose_name_plural': 'Conciliaciones',
+                'db_table': 'ledger_reconciliation_runs',
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:38
+
+import datetime
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0005_reconciliationrun'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Día')),
+                ('sent', models.DurationField(default=datetime.timedelta(0), verbose_name='Tiempo enviado')),
+                ('received', models.DurationField(default=datetime.timedelta(0), verbose_name='Tiempo recibido')),
+                ('balance', models.DurationField(default=datetime.timedelta(0), verbose_name='Balance acumulado')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_balances', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Balance diario',
+                'verbose_name_plural': 'Balances diarios',
+                'db_table': 'daily_balances',
+                'constraints': [models.UniqueConstraint(fields=('user', 'day'), name='unique_daily_balance')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0006_dailybalance'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Última modificación'),
+        ),
+    ]
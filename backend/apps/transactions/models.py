@@ -1,3 +1,4 @@
+from datetime import timedelta
 from django.db import models
 from ..users.models import User
 from ..offers.models import Offer
@@ -45,14 +46,77 @@ class Transaction(models.Model):
         verbose_name="Duración",
         help_text="Duración del servicio en horas y minutos"
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Última modificación",
+    )
 
     class Meta:
         db_table = "transactions"
         verbose_name = "Transacción"
         verbose_name_plural = "Transacciones"
+        indexes = [
+            # my-transactions reads each side with an index range scan
+            models.Index(fields=["sender", "datetime"],
+                         name="transaction_sender_dt_idx"),
+            models.Index(fields=["receiver", "datetime"],
+                         name="transaction_receiver_dt_idx"),
+        ]
 
     def __str__(self):
         return (
             f"Transacción: {self.title} ({self.sender.email} → "
             f"{self.receiver.email})"
         )
+
+
+class ReconciliationRun(models.Model):
+    """
+    Execution of the ledger reconciliation command. The last transaction
+    id checked is the high-water mark of the next incremental run.
+    """
+    started_at = models.DateTimeField(auto_now_add=True)
+    last_transaction_id = models.PositiveIntegerField(default=0)
+    users_checked = models.PositiveIntegerField(default=0)
+    mismatches = models.PositiveIntegerField(default=0)
+    repaired = models.BooleanField(default=False)
+
+    class Meta:
+        db_table = "ledger_reconciliation_runs"
+        verbose_name = "Conciliación"
+        verbose_name_plural = "Conciliaciones"
+
+    def __str__(self):
+        return f"Conciliación {self.started_at:%Y-%m-%d %H:%M}"
+
+
+class DailyBalance(models.Model):
+    """
+    Per-user, per-day rollup of the ledger. `balance` is the running
+    balance (received - sent) at the end of the day.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="daily_balances",
+        verbose_name="Usuario"
+    )
+    day = models.DateField(verbose_name="Día")
+    sent = models.DurationField(default=timedelta(0),
+                                verbose_name="Tiempo enviado")
+    received = models.DurationField(default=timedelta(0),
+                                    verbose_name="Tiempo recibido")
+    balance = models.DurationField(default=timedelta(0),
+                                   verbose_name="Balance acumulado")
+
+    class Meta:
+        db_table = "daily_balances"
+        verbose_name = "Balance diario"
+        verbose_name_plural = "Balances diarios"
+        constraints = [
+            models.UniqueConstraint(fields=["user", "day"],
+                                    name="unique_daily_balance"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.day}: {self.balance}"
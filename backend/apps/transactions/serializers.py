@@ -1,7 +1,7 @@
 from rest_framework import serializers
 from apps.users.serializers import UserSerializer
 from apps.offers.serializers import OfferSerializer
-from .models import Transaction
+from .models import DailyBalance, Transaction
 from datetime import timedelta
 from apps.users.models import User
 from apps.offers.models import Offer
@@ -49,3 +49,23 @@ class TransactionSerializer(serializers.ModelSerializer):
                 "La duración debe estar entre 15 minutos y 4 horas."
             )
         return value
+
+
+class TransactionBulkItemSerializer(TransactionSerializer):
+    """
+    One transfer of a bulk submission. Receiver and offer ids are plain
+    integers, the view resolves all of them with one query each.
+    """
+    receiver_id = serializers.IntegerField(write_only=True)
+    offer_id = serializers.IntegerField(
+        write_only=True, required=False, allow_null=True
+    )
+
+    class Meta(TransactionSerializer.Meta):
+        fields = ["receiver_id", "offer_id", "title", "text", "duration"]
+
+
+class DailyBalanceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DailyBalance
+        fields = ["day", "sent", "received", "balance"]
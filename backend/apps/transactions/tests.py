@@ -1,11 +1,32 @@
+import csv
+import json
+import msgpack
 import pytest
+from io import StringIO
+from unittest.mock import patch
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
-from datetime import timedelta
+import warnings
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
 from apps.users.models import User
 from apps.offers.models import Offer
-from apps.transactions.models import Transaction
+from apps.transactions.models import (
+    DailyBalance, ReconciliationRun, Transaction
+)
+from apps.transactions.serializers import TransactionSerializer
+from apps.transactions.views import TransactionViewSet
+from core.authentication import user_cache
+from core.renderers import FastJSONRenderer
+from apps.users.serializers import UserSerializer
 
 
 @pytest.mark.django_db
@@ -196,7 +217,8 @@ class TestTransactionEndpoints:
         response = api_client.get(url)
         assert response.status_code == status.HTTP_200_OK
         # Ensure the transaction appears in the list
-        assert any(t["id"] == transaction.id for t in response.data)
+        assert any(t["id"] == transaction.id
+                   for t in response.data["results"])
 
     def test_list_my_transactions_receiver(
             self, api_client, sender, receiver, transaction
@@ -205,7 +227,8 @@ class TestTransactionEndpoints:
         url = reverse("transaction-my-transactions")
         response = api_client.get(url)
         assert response.status_code == status.HTTP_200_OK
-        assert any(t["id"] == transaction.id for t in response.data)
+        assert any(t["id"] == transaction.id
+                   for t in response.data["results"])
 
     def test_transactions_ordered_by_datetime(
             self, api_client, sender, receiver, offer
@@ -227,7 +250,7 @@ class TestTransactionEndpoints:
 
         response = api_client.get(reverse("transaction-my-transactions"))
         assert response.status_code == status.HTTP_200_OK
-        results = response.data
+        results = response.data["results"]
         assert results[0]["datetime"] >= results[1]["datetime"]
 
     def test_list_my_transactions_unauthenticated(self, api_client):
@@ -256,3 +279,756 @@ class TestTransactionEndpoints:
         payload = {"title": "Trying to update"}
         response = api_client.patch(url, payload, format="json")
         assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    # ------------------------
+    #  Query counts
+    # ------------------------
+
+    def count_queries(self, api_client, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        return len(queries)
+
+    def create_transactions(self, sender, offer, count):
+        start = Transaction.objects.count()
+        for i in range(start, start + count):
+            receiver = User.objects.create_user(
+                email=f"receiver{i}@example.com", password="password"
+            )
+            Transaction.objects.create(
+                sender=sender, receiver=receiver, offer=offer,
+                title=f"Transaction {i}", duration=timedelta(hours=1)
+            )
+
+    def test_compiled_list_matches_serializer(self, api_client, sender,
+                                              receiver, transaction):
+        Transaction.objects.create(sender=receiver, receiver=sender,
+                                   title="Sin oferta", text=None,
+                                   duration=timedelta(minutes=30))
+        api_client.force_authenticate(user=sender)
+
+        response = api_client.get(reverse("transaction-list"))
+
+        expected = TransactionSerializer(
+            Transaction.objects.order_by("-pk"), many=True,
+            context={"request": response.wsgi_request},
+        ).data
+        assert response.content == JSONRenderer().render(
+            {"next": None, "previous": None, "results": expected}
+        )
+        assert response.data["results"][0]["offer"] is None
+
+    @pytest.mark.parametrize("url_name", [
+        "transaction-my-transactions", "transaction-list"
+    ])
+    def test_list_query_count_is_constant(
+            self, api_client, sender, offer, url_name
+    ):
+        api_client.force_authenticate(user=sender)
+        url = reverse(url_name)
+        self.create_transactions(sender, offer, 1)
+        single = self.count_queries(api_client, url)
+
+        self.create_transactions(sender, offer, 5)
+        assert self.count_queries(api_client, url) == single
+
+    def test_sparse_fieldset_skips_joins(self, api_client, sender,
+                                         transaction):
+        api_client.force_authenticate(user=sender)
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get(
+                reverse("transaction-list"),
+                {"fields": "id,title,sender,receiver.first_name"},
+            )
+
+        assert response.data["results"] == [{
+            "id": transaction.id, "title": "Test Transaction",
+            "sender": sender.id, "receiver": {"first_name": "Receiver"},
+        }]
+        rows_query = queries.captured_queries[-1]["sql"]
+        assert "offers" not in rows_query
+        assert rows_query.count("JOIN") == 1
+
+    # ------------------------
+    #  Renderers
+    # ------------------------
+
+    def test_fast_json_renderer_matches_drf(self, api_client, sender,
+                                            transaction):
+        api_client.force_authenticate(user=sender)
+        response = api_client.get(reverse("transaction-list"))
+        assert isinstance(response.accepted_renderer, FastJSONRenderer)
+
+        data = {
+            "results": response.data["results"],
+            "raw": [timedelta(hours=1, minutes=30), timezone.now(),
+                    date(2025, 1, 2), Decimal("1.50"), None, True],
+            "text": "línea\u2028separada \U0001F600",
+            "lazy": gettext_lazy("Activo"),
+            1: "non-string key",
+        }
+        assert FastJSONRenderer().render(data) == \
+            JSONRenderer().render(data)
+        # Indented output keeps the stdlib encoder
+        assert FastJSONRenderer().render(
+            data, "application/json; indent=4"
+        ) == JSONRenderer().render(data, "application/json; indent=4")
+
+    def test_fast_json_parser(self, api_client, sender, receiver):
+        api_client.force_authenticate(user=sender)
+        url = reverse("transaction-list")
+        payload = {"receiver_id": receiver.id, "title": "Clase de guitarra",
+                   "duration": "01:00:00"}
+
+        response = api_client.generic("POST", url,
+                                      FastJSONRenderer().render(payload),
+                                      content_type="application/json")
+        assert response.status_code == status.HTTP_201_CREATED
+
+        response = api_client.generic("POST", url, b'{"title": ',
+                                      content_type="application/json")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "JSON parse error" in response.data["detail"]
+
+    def test_msgpack_negotiation(self, api_client, sender, receiver,
+                                 transaction):
+        api_client.force_authenticate(user=sender)
+        url = reverse("transaction-detail", args=[transaction.id])
+
+        response = api_client.get(url, HTTP_ACCEPT="application/msgpack")
+
+        assert response["Content-Type"] == "application/msgpack"
+        assert msgpack.unpackb(response.content) == \
+            api_client.get(url).json()
+
+        response = api_client.generic(
+            "POST", reverse("transaction-list"), msgpack.packb({
+                "receiver_id": receiver.id, "title": "Ayuda",
+                "duration": "01:00:00",
+            }), content_type="application/msgpack",
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+
+    # ------------------------
+    #  Ledger consistency
+    # ------------------------
+
+    def test_create_transaction_does_not_lose_updates(
+            self, api_client, sender, receiver
+    ):
+        """
+        Balances changed by another request after the user was loaded must
+        be preserved (the increment is applied by the database).
+        """
+        api_client.force_authenticate(user=sender)
+        User.objects.filter(pk=sender.pk).update(time_sent=timedelta(hours=5))
+        User.objects.filter(pk=receiver.pk).update(
+            time_received=timedelta(hours=2)
+        )
+
+        response = api_client.post(reverse("transaction-list"), {
+            "receiver_id": receiver.id,
+            "title": "Concurrent",
+            "duration": "01:00:00"
+        }, format="json")
+
+        assert response.status_code == status.HTTP_201_CREATED
+        sender.refresh_from_db()
+        receiver.refresh_from_db()
+        assert sender.time_sent == timedelta(hours=6)
+        assert receiver.time_received == timedelta(hours=3)
+
+    def test_balances_locked_before_insert(self, api_client, sender,
+                                           receiver):
+        """The users are updated (locked) before the INSERT checks them"""
+        api_client.force_authenticate(user=sender)
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.post(reverse("transaction-list"), {
+                "receiver_id": receiver.id, "title": "Ayuda",
+                "duration": "01:00:00",
+            }, format="json")
+
+        assert response.status_code == status.HTTP_201_CREATED
+        sql = [query["sql"] for query in queries.captured_queries]
+        update = next(i for i, query in enumerate(sql)
+                      if query.startswith('UPDATE "users"'))
+        insert = next(i for i, query in enumerate(sql)
+                      if query.startswith('INSERT INTO "transactions"'))
+        assert update < insert
+
+    def test_transfer_response_totals_not_from_cached_user(
+            self, api_client, sender, receiver
+    ):
+        """Another worker's transfers are missing from this cached copy"""
+        access = api_client.post(reverse("login"), {
+            "email": sender.email, "password": "strongpassword",
+        }, format="json").data["access"]
+        api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        api_client.get(reverse("transaction-list"))  # caches the sender
+        # Handled by another process: this one's user cache is not cleared
+        User.objects.filter(pk=sender.pk).update(time_sent=timedelta(hours=5))
+
+        response = api_client.post(reverse("transaction-list"), {
+            "receiver_id": receiver.id, "title": "Ayuda",
+            "duration": "01:00:00",
+        }, format="json")
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data["sender"]["time_sent"] == "06:00:00"
+
+    def test_balances_match_ledger_sum(self, api_client, sender, receiver):
+        url = reverse("transaction-list")
+        for user, other, duration in [
+            (sender, receiver, "01:00:00"),
+            (receiver, sender, "00:30:00"),
+            (sender, receiver, "02:15:00"),
+        ]:
+            api_client.force_authenticate(user=user)
+            api_client.post(url, {"receiver_id": other.id, "title": "T",
+                                  "duration": duration}, format="json")
+
+        for user in (sender, receiver):
+            user.refresh_from_db()
+            sent = Transaction.objects.filter(sender=user).aggregate(
+                total=Sum("duration"))["total"]
+            received = Transaction.objects.filter(receiver=user).aggregate(
+                total=Sum("duration"))["total"]
+            assert user.time_sent == sent
+            assert user.time_received == received
+
+    def test_create_transaction_response_shows_new_totals(
+            self, api_client, sender, receiver
+    ):
+        api_client.force_authenticate(user=sender)
+        response = api_client.post(reverse("transaction-list"), {
+            "receiver_id": receiver.id,
+            "title": "Totals",
+            "duration": "01:00:00"
+        }, format="json")
+
+        assert response.data["sender"]["time_sent"] == "01:00:00"
+        assert response.data["receiver"]["time_received"] == "01:00:00"
+
+    # ------------------------
+    #  Bulk creation
+    # ------------------------
+
+    def test_bulk_create_transactions(
+            self, api_client, sender, receiver, offer
+    ):
+        other = User.objects.create_user(
+            email="other@example.com", password="password"
+        )
+        api_client.force_authenticate(user=sender)
+        payload = [
+            {"receiver_id": receiver.id, "offer_id": offer.id,
+             "title": "Volunteer 1", "duration": "01:00:00"},
+            {"receiver_id": other.id, "title": "Volunteer 2",
+             "duration": "00:30:00"},
+            {"receiver_id": receiver.id, "title": "Volunteer 3",
+             "duration": "02:00:00"},
+        ]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.post(reverse("transaction-bulk"), payload,
+                                       format="json")
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert len(response.data) == 3
+        # 2 lookups + 3 balance updates + insert, inside a transaction,
+        # 3 more for the new daily balance rows and 1 for the new totals
+        assert len([q for q in queries if "SAVEPOINT" not in q["sql"]]) <= 10
+        sender.refresh_from_db()
+        receiver.refresh_from_db()
+        other.refresh_from_db()
+        assert sender.time_sent == timedelta(hours=3, minutes=30)
+        assert receiver.time_received == timedelta(hours=3)
+        assert other.time_received == timedelta(minutes=30)
+
+    def test_bulk_create_returns_ids_without_returning_insert(
+            self, api_client, sender, receiver, monkeypatch
+    ):
+        """Backends like MySQL do not return the ids of a bulk INSERT"""
+        monkeypatch.setattr(type(connection.features),
+                            "can_return_rows_from_bulk_insert", False)
+        api_client.force_authenticate(user=sender)
+        payload = [
+            {"receiver_id": receiver.id, "title": f"Volunteer {n}",
+             "duration": "01:00:00"}
+            for n in range(2)
+        ]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.post(reverse("transaction-bulk"), payload,
+                                       format="json")
+
+        assert response.status_code == status.HTTP_201_CREATED
+        ids = [item["id"] for item in response.data]
+        assert None not in ids
+        assert set(ids) == set(
+            Transaction.objects.values_list("id", flat=True)
+        )
+        sql = [query["sql"] for query in queries.captured_queries]
+        update = next(i for i, query in enumerate(sql)
+                      if query.startswith('UPDATE "users"'))
+        insert = next(i for i, query in enumerate(sql)
+                      if query.startswith('INSERT INTO "transactions"'))
+        assert update < insert
+
+    def test_bulk_create_reports_errors_per_item(
+            self, api_client, sender, receiver
+    ):
+        api_client.force_authenticate(user=sender)
+        payload = [
+            {"receiver_id": receiver.id, "title": "Ok",
+             "duration": "01:00:00"},
+            {"receiver_id": 9999, "title": "Unknown receiver",
+             "duration": "01:00:00"},
+            {"receiver_id": sender.id, "title": "To myself",
+             "duration": "01:00:00"},
+        ]
+
+        response = api_client.post(reverse("transaction-bulk"), payload,
+                                   format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        errors = response.data["errors"]
+        assert errors[0] == {}
+        assert "receiver_id" in errors[1]
+        assert "receiver" in errors[2]
+        assert not Transaction.objects.exists()
+        receiver.refresh_from_db()
+        assert receiver.time_received == timedelta(0)
+
+    def test_bulk_create_validates_fields(self, api_client, sender, receiver):
+        api_client.force_authenticate(user=sender)
+        payload = [
+            {"receiver_id": receiver.id, "title": "Too long",
+             "duration": "05:00:00"},
+        ]
+
+        response = api_client.post(reverse("transaction-bulk"), payload,
+                                   format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "duration" in response.data["errors"][0]
+
+    def test_bulk_create_merges_field_and_lookup_errors(
+            self, api_client, sender, receiver
+    ):
+        api_client.force_authenticate(user=sender)
+        payload = [
+            {"receiver_id": receiver.id, "title": "Too long",
+             "duration": "05:00:00"},
+            {"receiver_id": 9999, "title": "Unknown receiver",
+             "duration": "01:00:00"},
+            {"receiver_id": receiver.id, "title": "Unknown offer",
+             "duration": "01:00:00", "offer_id": 9999},
+        ]
+
+        response = api_client.post(reverse("transaction-bulk"), payload,
+                                   format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        errors = response.data["errors"]
+        assert list(errors[0]) == ["duration"]
+        assert list(errors[1]) == ["receiver_id"]
+        assert list(errors[2]) == ["offer_id"]
+        assert not Transaction.objects.exists()
+
+    def test_bulk_create_requires_a_list(self, api_client, sender, receiver):
+        api_client.force_authenticate(user=sender)
+        payload = {"receiver_id": receiver.id, "title": "Not a list",
+                   "duration": "01:00:00"}
+
+        response = api_client.post(reverse("transaction-bulk"), payload,
+                                   format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    # ------------------------
+    #  My transactions pagination & filters
+    # ------------------------
+
+    @pytest.fixture
+    def history(self, sender, receiver):
+        """Alternate sent and received transactions of `sender`."""
+        transactions = []
+        for i in range(7):
+            from_user, to_user = (
+                (sender, receiver) if i % 2 == 0 else (receiver, sender)
+            )
+            transactions.append(Transaction.objects.create(
+                sender=from_user, receiver=to_user,
+                title=f"History {i}", duration=timedelta(hours=1)
+            ))
+        return transactions
+
+    def walk(self, api_client, url):
+        ids, pages = [], 0
+        while url:
+            response = api_client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            ids += [t["id"] for t in response.data["results"]]
+            url = response.data["next"]
+            pages += 1
+        return ids, pages
+
+    def test_my_transactions_paginated(self, api_client, sender, history):
+        api_client.force_authenticate(user=sender)
+        url = reverse("transaction-my-transactions") + "?page_size=3"
+
+        ids, pages = self.walk(api_client, url)
+
+        assert ids == [t.id for t in reversed(history)]
+        assert pages == 3
+
+    def test_my_transactions_renders_each_user_once(
+            self, api_client, sender, history, offer
+    ):
+        Transaction.objects.update(offer=offer)
+        api_client.force_authenticate(user=sender)
+        url = reverse("transaction-my-transactions")
+
+        with patch.object(UserSerializer, "get_balance",
+                          autospec=True,
+                          side_effect=UserSerializer.get_balance) as balance:
+            response = api_client.get(url)
+
+        results = response.data["results"]
+        # sender, receiver and the offer owner: two distinct users
+        assert balance.call_count == 2
+        assert results[0]["offer"] is results[1]["offer"]
+        sides = {id(row[side]) for row in results
+                 for side in ("sender", "receiver")}
+        assert len(sides) == 2
+
+        # Same output as rendering every row on its own
+        rows = Transaction.objects.order_by("-datetime", "-id")
+        expected = TransactionSerializer(
+            rows, many=True, context={"request": response.wsgi_request}
+        ).data
+        assert JSONRenderer().render(results) == \
+            JSONRenderer().render(expected)
+
+    def test_my_transactions_stream(self, api_client, sender, history,
+                                    monkeypatch):
+        monkeypatch.setattr(TransactionViewSet, "stream_chunk_size", 3)
+        api_client.force_authenticate(user=sender)
+        url = reverse("transaction-my-transactions")
+
+        response = api_client.get(url, {"stream": "true"})
+        rows = json.loads(b"".join(response.streaming_content))
+        assert [row["id"] for row in rows] == \
+            [t.id for t in reversed(history)]
+        assert rows == api_client.get(url).json()["results"]
+
+        response = api_client.get(url, {"stream": "true",
+                                        "direction": "received"})
+        rows = json.loads(b"".join(response.streaming_content))
+        assert [row["id"] for row in rows] == \
+            [t.id for t in reversed(history) if t.receiver == sender]
+
+    def test_my_transactions_previous_page(
+            self, api_client, sender, history
+    ):
+        api_client.force_authenticate(user=sender)
+        url = reverse("transaction-my-transactions") + "?page_size=3"
+        first = api_client.get(url)
+        second = api_client.get(first.data["next"])
+        back = api_client.get(second.data["previous"])
+
+        assert back.data["results"] == first.data["results"]
+
+    @pytest.mark.parametrize("direction", ["sent", "received"])
+    def test_my_transactions_direction(
+            self, api_client, sender, history, direction
+    ):
+        api_client.force_authenticate(user=sender)
+        url = (reverse("transaction-my-transactions") +
+               f"?direction={direction}&page_size=2")
+
+        ids, _ = self.walk(api_client, url)
+
+        side = "sender" if direction == "sent" else "receiver"
+        assert ids == [t.id for t in reversed(history)
+                       if getattr(t, side) == sender]
+
+    def test_my_transactions_date_range(self, api_client, sender, history):
+        Transaction.objects.filter(pk=history[0].pk).update(
+            datetime=timezone.now() - timedelta(days=10)
+        )
+        api_client.force_authenticate(user=sender)
+        today = timezone.now().date()
+        url = reverse("transaction-my-transactions")
+
+        recent, _ = self.walk(api_client, url + f"?from_date={today}")
+        old, _ = self.walk(
+            api_client, url + f"?to_date={today - timedelta(days=1)}"
+        )
+
+        assert history[0].id not in recent
+        assert old == [history[0].id]
+
+    def test_my_transactions_days_in_current_time_zone(
+            self, api_client, sender, history, settings
+    ):
+        """23:30 in Madrid on January 1st is still that day, not the 2nd"""
+        settings.TIME_ZONE = "Europe/Madrid"
+        Transaction.objects.filter(pk=history[0].pk).update(
+            datetime=datetime(2025, 1, 1, 22, 30, tzinfo=dt_timezone.utc)
+        )
+        api_client.force_authenticate(user=sender)
+        url = reverse("transaction-my-transactions")
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", RuntimeWarning)
+            first, _ = self.walk(api_client, url + "?from_date=2025-01-01"
+                                 "&to_date=2025-01-01")
+            second, _ = self.walk(api_client, url + "?from_date=2025-01-02"
+                                  "&to_date=2025-01-02")
+
+        assert first == [history[0].id]
+        assert second == []
+
+    def test_my_transactions_conditional_get(
+            self, api_client, sender, receiver, transaction
+    ):
+        api_client.force_authenticate(user=sender)
+        url = reverse("transaction-my-transactions")
+        etag = api_client.get(url)["ETag"]
+
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        # Balance updates bump the embedded users
+        api_client.post(reverse("transaction-list"), {
+            "receiver_id": receiver.id, "title": "Otra",
+            "duration": "00:30:00",
+        }, format="json")
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data["results"]) == 2
+
+    # ------------------------
+    #  Ledger reconciliation
+    # ------------------------
+
+    def reconcile(self, *args):
+        out = StringIO()
+        call_command("reconcile_ledger", *args, stdout=out)
+        return out.getvalue()
+
+    def test_reconcile_reports_drift(self, sender, receiver, transaction):
+        output = self.reconcile("--full")
+
+        assert "sender@example.com" in output
+        assert "receiver@example.com" in output
+        sender.refresh_from_db()
+        assert sender.time_sent == timedelta(0)  # report only
+        run = ReconciliationRun.objects.get()
+        assert run.mismatches == 2
+        assert run.last_transaction_id == transaction.id
+
+    def test_reconcile_repairs_drift(self, sender, receiver, transaction):
+        self.reconcile("--full", "--repair")
+
+        sender.refresh_from_db()
+        receiver.refresh_from_db()
+        assert sender.time_sent == timedelta(hours=1)
+        assert receiver.time_received == timedelta(hours=1)
+        assert "0 mismatches" in self.reconcile("--full")
+
+    def test_reconcile_repair_forgets_cached_users(
+            self, sender, receiver, transaction,
+            django_capture_on_commit_callbacks
+    ):
+        user_cache.set(sender.pk, sender)
+
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            self.reconcile("--full", "--repair")
+
+        assert callbacks
+        assert user_cache.get(sender.pk) is None
+
+    def test_reconcile_incremental_checks_new_rows_only(
+            self, sender, receiver, transaction
+    ):
+        self.reconcile("--full", "--repair")
+        other = User.objects.create_user(
+            email="other@example.com", password="password"
+        )
+        # Drift on a user without new transactions is left for full runs
+        User.objects.filter(pk=receiver.pk).update(
+            time_received=timedelta(0)
+        )
+        new = Transaction.objects.create(
+            sender=sender, receiver=other, title="New",
+            duration=timedelta(minutes=30)
+        )
+
+        output = self.reconcile("--repair")
+
+        assert f"after #{transaction.id}" in output
+        assert "other@example.com" in output
+        assert "receiver@example.com" not in output
+        other.refresh_from_db()
+        assert other.time_received == timedelta(minutes=30)
+        assert ReconciliationRun.objects.latest("id").last_transaction_id \
+            == new.id
+
+    # ------------------------
+    #  Daily balances
+    # ------------------------
+
+    def test_transfers_update_daily_balances(
+            self, api_client, sender, receiver
+    ):
+        api_client.force_authenticate(user=sender)
+        for duration in ("01:00:00", "00:30:00"):
+            api_client.post(reverse("transaction-list"), {
+                "receiver_id": receiver.id, "title": "Pago",
+                "duration": duration,
+            }, format="json")
+        api_client.post(reverse("transaction-bulk"), [
+            {"receiver_id": receiver.id, "title": "Lote",
+             "duration": "00:15:00"},
+        ], format="json")
+
+        today = timezone.localdate()
+        sent = DailyBalance.objects.get(user=sender, day=today)
+        received = DailyBalance.objects.get(user=receiver, day=today)
+        assert sent.sent == timedelta(hours=1, minutes=45)
+        assert sent.balance == -timedelta(hours=1, minutes=45)
+        assert received.received == timedelta(hours=1, minutes=45)
+        assert received.balance == timedelta(hours=1, minutes=45)
+
+    def test_new_day_starts_from_previous_balance(self, sender, receiver):
+        from apps.transactions.ledger import update_daily_balances
+        today = timezone.localdate()
+        DailyBalance.objects.create(
+            user=receiver, day=today - timedelta(days=3),
+            received=timedelta(hours=2), balance=timedelta(hours=2),
+        )
+
+        update_daily_balances(today, {
+            receiver.pk: (timedelta(minutes=30), timedelta(0)),
+        })
+
+        assert DailyBalance.objects.get(user=receiver, day=today).balance \
+            == timedelta(hours=1, minutes=30)
+
+    def test_backfill_balance_history(self, sender, receiver):
+        now = timezone.now()
+        for days_ago, duration in ((2, timedelta(hours=1)),
+                                   (2, timedelta(minutes=30)),
+                                   (0, timedelta(hours=2))):
+            transfer = Transaction.objects.create(
+                sender=sender, receiver=receiver, title="Pago",
+                duration=duration,
+            )
+            Transaction.objects.filter(pk=transfer.pk).update(
+                datetime=now - timedelta(days=days_ago)
+            )
+        DailyBalance.objects.create(user=sender, day=now.date(),
+                                    balance=timedelta(hours=9))
+
+        out = StringIO()
+        call_command("backfill_balance_history", "--batch-size", "1",
+                     stdout=out)
+
+        assert "4 daily balances" in out.getvalue()
+        history = list(
+            DailyBalance.objects.filter(user=sender).order_by("day")
+            .values_list("sent", "balance")
+        )
+        assert history == [
+            (timedelta(hours=1, minutes=30), -timedelta(hours=1, minutes=30)),
+            (timedelta(hours=2), -timedelta(hours=3, minutes=30)),
+        ]
+
+    # ------------------------
+    #  Ledger export
+    # ------------------------
+
+    @pytest.fixture
+    def ledger(self, sender, receiver, offer):
+        now = timezone.now()
+        transfers = []
+        for days_ago, title in ((10, "Antigua"), (1, "=HYPERLINK()"),
+                                (0, "Hoy")):
+            transfer = Transaction.objects.create(
+                sender=sender, receiver=receiver, offer=offer, title=title,
+                duration=timedelta(hours=1, minutes=30),
+            )
+            Transaction.objects.filter(pk=transfer.pk).update(
+                datetime=now - timedelta(days=days_ago)
+            )
+            transfers.append(transfer)
+        return transfers
+
+    def export(self, api_client, **params):
+        response = api_client.get(reverse("transaction-export"), params)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.streaming
+        return b"".join(response.streaming_content).decode()
+
+    def test_export_requires_admin(self, api_client, sender, ledger):
+        api_client.force_authenticate(user=sender)
+        response = api_client.get(reverse("transaction-export"))
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_export_csv(self, api_client, sender, ledger):
+        User.objects.filter(pk=sender.pk).update(is_staff=True)
+        sender.refresh_from_db()
+        api_client.force_authenticate(user=sender)
+
+        rows = list(csv.DictReader(StringIO(self.export(api_client))))
+
+        assert [row["id"] for row in rows] == [str(t.id) for t in ledger]
+        assert rows[0]["sender_email"] == "sender@example.com"
+        assert rows[0]["receiver_email"] == "receiver@example.com"
+        assert rows[0]["offer_title"] == "Test Offer"
+        assert rows[0]["duration"] == "01:30:00"
+        assert rows[1]["title"] == "'=HYPERLINK()"  # not a formula
+
+    def test_export_ndjson_with_filters(
+            self, api_client, sender, receiver, ledger
+    ):
+        User.objects.filter(pk=sender.pk).update(is_staff=True)
+        sender.refresh_from_db()
+        api_client.force_authenticate(user=sender)
+        since = timezone.localdate() - timedelta(days=2)
+
+        content = self.export(api_client, output="ndjson",
+                              from_date=since.isoformat(),
+                              user=receiver.id)
+
+        records = [json.loads(line) for line in content.splitlines()]
+        assert [r["id"] for r in records] == [t.id for t in ledger[1:]]
+        assert records[0]["title"] == "=HYPERLINK()"
+        assert self.export(api_client, output="ndjson", user=0) == ""
+
+    def test_export_rejects_unknown_output(self, api_client, sender):
+        User.objects.filter(pk=sender.pk).update(is_staff=True)
+        sender.refresh_from_db()
+        api_client.force_authenticate(user=sender)
+        response = api_client.get(reverse("transaction-export"),
+                                  {"output": "xml"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_export_ledger_command(self, ledger, tmp_path):
+        out = StringIO()
+        call_command("export_ledger", "--chunk-size", "2", stdout=out)
+        lines = out.getvalue().splitlines()
+        assert len(lines) == 4  # header + 3 transactions
+
+        path = tmp_path / "ledger.ndjson"
+        err = StringIO()
+        call_command("export_ledger", "--format", "ndjson",
+                     "--to-date", timezone.localdate().isoformat(),
+                     "--from-date", "2000-01-01", "--file", str(path),
+                     stderr=err)
+        assert len(path.read_text().splitlines()) == 3
+        assert "3 transactions written" in err.getvalue()
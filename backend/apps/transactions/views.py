@@ -1,10 +1,31 @@
 # views.py
-from rest_framework import viewsets, permissions, status
+import heapq
+from itertools import islice
+from rest_framework import viewsets, permissions, serializers, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from core.compiled import CompiledListMixin
+from core.conditional import ConditionalGetMixin
+from core.fieldsets import SparseFieldsetMixin
+from core.memo import RenderMemoMixin
+from core.prefetch import SerializerPrefetchMixin
+from core.streaming import StreamingListMixin, wants_stream
 from .models import Transaction
-from .serializers import TransactionSerializer
+from .serializers import (
+    TransactionSerializer,
+    TransactionBulkItemSerializer
+)
+from .ledger import record_transfer, record_transfers
+from .export import EXPORT_FORMATS, export_lines, filter_ledger, ledger_rows
+from django.db import connection
 from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from apps.users.models import User
+from apps.offers.models import Offer
+
+MAX_BULK_TRANSFERS = 100
 
 
 class IsAdminOrReadOnly(permissions.BasePermission):
@@ -17,7 +38,10 @@ class IsAdminOrReadOnly(permissions.BasePermission):
         return True
 
 
-class TransactionViewSet(viewsets.ModelViewSet):
+class TransactionViewSet(StreamingListMixin, SparseFieldsetMixin,
+                         CompiledListMixin, RenderMemoMixin,
+                         SerializerPrefetchMixin, ConditionalGetMixin,
+                         viewsets.ModelViewSet):
     queryset = Transaction.objects.all()
     serializer_class = TransactionSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminOrReadOnly]
@@ -33,27 +57,203 @@ class TransactionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        transaction = serializer.save(sender=request.user)
-
-        # Update time totals for sender and receiver
-        transaction.sender.time_sent += transaction.duration
-        transaction.sender.save(update_fields=["time_sent"])
-
-        transaction.receiver.time_received += transaction.duration
-        transaction.receiver.save(update_fields=["time_received"])
+        # Insert and update time totals atomically
+        record_transfer(serializer, request.user)
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED,
                         headers=headers)
 
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk(self, request):
+        """
+        Crea varias transacciones del usuario autenticado de una vez.
+        Si alguna no es válida no se guarda ninguna y se devuelven los
+        errores de cada elemento en su misma posición.
+        """
+        if not isinstance(request.data, list) or not request.data:
+            return Response(
+                {"detail": "Se esperaba una lista de transacciones."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(request.data) > MAX_BULK_TRANSFERS:
+            return Response(
+                {"detail": "No se pueden enviar más de "
+                           f"{MAX_BULK_TRANSFERS} transacciones a la vez."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Each item on its own, so the ones that validate are still checked
+        # against the database and every error is reported at once
+        items = []
+        errors = []
+        for data in request.data:
+            serializer = TransactionBulkItemSerializer(data=data)
+            valid = serializer.is_valid()
+            items.append(serializer.validated_data if valid else None)
+            errors.append(dict(serializer.errors))
+        valid_items = [item for item in items if item is not None]
+
+        # Resolve every receiver and offer with a single query each
+        receivers = User.objects.in_bulk(
+            {item["receiver_id"] for item in valid_items}
+        )
+        offers = Offer.objects.select_related("user").in_bulk(
+            {item["offer_id"] for item in valid_items
+             if item.get("offer_id") is not None}
+        )
+
+        does_not_exist = serializers.PrimaryKeyRelatedField \
+            .default_error_messages["does_not_exist"]
+        transfers = []
+        for item, item_errors in zip(items, errors):
+            if item is None:
+                continue
+            receiver = receivers.get(item["receiver_id"])
+            offer_id = item.get("offer_id")
+            if receiver is None:
+                item_errors["receiver_id"] = [
+                    does_not_exist.format(pk_value=item["receiver_id"])
+                ]
+            elif receiver == request.user:
+                item_errors["receiver"] = \
+                    "No puedes enviarte tiempo a ti mismo."
+            if offer_id is not None and offer_id not in offers:
+                item_errors["offer_id"] = [
+                    does_not_exist.format(pk_value=offer_id)
+                ]
+            transfers.append(Transaction(
+                receiver=receiver,
+                offer=offers.get(offer_id),
+                title=item["title"],
+                text=item.get("text"),
+                duration=item["duration"],
+            ))
+
+        if any(errors):
+            return Response({"errors": errors},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        created = record_transfers(request.user, transfers)
+        data = self.get_serializer(created, many=True).data
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=["get"], url_path="export",
+            permission_classes=[permissions.IsAdminUser])
+    def export(self, request):
+        """
+        Descarga el libro de transacciones completo (solo administradores)
+        como CSV o NDJSON, generado por lotes mientras se envía.
+
+        Parámetros: output=csv|ndjson, from_date, to_date, user (id).
+        """
+        params = request.query_params
+        output = params.get("output", "csv")
+        if output not in EXPORT_FORMATS:
+            raise serializers.ValidationError({
+                "output": "Formato no soportado, usa "
+                          f"{' o '.join(EXPORT_FORMATS)}."
+            })
+        user_id = params.get("user")
+        if user_id is not None:
+            user_id = serializers.IntegerField().run_validation(user_id)
+
+        transactions = filter_ledger(
+            Transaction.objects.all(),
+            from_date=parse_date(params.get("from_date") or ""),
+            to_date=parse_date(params.get("to_date") or ""),
+            user_id=user_id,
+        )
+        content_type = ("text/csv" if output == "csv"
+                        else "application/x-ndjson")
+        response = StreamingHttpResponse(
+            export_lines(output, ledger_rows(transactions)),
+            content_type=f"{content_type}; charset=utf-8",
+        )
+        filename = f"transactions-{timezone.localdate():%Y%m%d}.{output}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
     @action(detail=False, methods=["get"], url_path="my-transactions")
     def my_transactions(self, request):
         """
-        Retorna todas las transacciones donde el usuario es
-        sender o receiver.
+        Retorna, paginadas y de la más reciente a la más antigua, las
+        transacciones donde el usuario es sender o receiver.
+
+        Filtros opcionales: direction=sent|received, from_date, to_date.
+        Con ?stream=true se envían todas, sin paginar, mientras se leen.
         """
         user = request.user
-        transactions = Transaction.objects.filter(
-            Q(sender=user) | Q(receiver=user)
-        ).order_by("-datetime")
-        serializer = self.get_serializer(transactions, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # Days of the current time zone, as the export
+        transactions = filter_ledger(
+            Transaction.objects.all(),
+            from_date=parse_date(request.query_params.get("from_date") or ""),
+            to_date=parse_date(request.query_params.get("to_date") or ""),
+        )
+
+        # One index range scan per side instead of an OR across both keys
+        direction = request.query_params.get("direction")
+        if wants_stream(request):
+            sides = Q()
+            if direction != "received":
+                sides |= Q(sender=user)
+            if direction != "sent":
+                sides |= Q(receiver=user)
+            return self.streaming_response(self.compiled_rows(
+                self.filter_queryset(
+                    transactions.filter(sides).order_by("-datetime", "-id")
+                )
+            ))
+
+        branches = []
+        if direction != "received":
+            branches.append(transactions.filter(sender=user))
+        if direction != "sent":
+            branches.append(transactions.filter(receiver=user))
+
+        paginator = self.paginator
+        paginator.start(request, paginator.keys_for(("-datetime", "-id")))
+        with paginator.cursor_errors():
+            keys = self.merge_keys(paginator, branches)
+        keys = paginator.finish(keys)
+
+        rows = self.filter_queryset(
+            Transaction.objects.filter(id__in=[key.id for key in keys])
+        ).in_bulk()
+        rows = [rows[key.id] for key in keys]
+        return self.conditional_response(
+            self.get_etag(rows, paginator.get_next_link(),
+                          paginator.get_previous_link()),
+            lambda: paginator.get_paginated_response(
+                self.get_serializer(rows, many=True).data
+            ),
+        )
+
+    @staticmethod
+    def merge_keys(paginator, branches):
+        """
+        Return the (datetime, id) keys of the next page across all the
+        branches, already ordered in the direction being read.
+        """
+        limit = paginator.page_size + 1
+        branches = [
+            paginator.seek(branch).values_list("datetime", "id", named=True)
+            for branch in branches
+        ]
+        if len(branches) == 1:
+            return list(branches[0][:limit])
+
+        if connection.features.supports_slicing_ordering_in_compound:
+            # UNION ALL of two LIMITed index scans, in one round trip
+            union = branches[0][:limit].union(
+                *(branch[:limit] for branch in branches[1:]), all=True
+            )
+            keys = union.order_by(*paginator.get_order_by())
+        else:
+            descending = paginator.keys[0][1] != paginator.reverse
+            keys = heapq.merge(*(list(branch[:limit]) for branch in branches),
+                               reverse=descending)
+
+        seen = set()  # a transaction could be both sent and received
+        unique = (key for key in keys
+                  if key.id not in seen and not seen.add(key.id))
+        return list(islice(unique, limit))
@@ -0,0 +1,99 @@
+# blacklist.py
+import time
+from datetime import datetime, timezone as dt_timezone
+from threading import Lock
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from core.authentication import VersionedRefreshToken
+from core.bloom import BloomFilter
+from .models import BlacklistedToken
+
+
+class TokenBlacklist:
+    """
+    Ids (jti) of used refresh tokens.
+
+    BlacklistedToken is the source of truth. In front of it, each process
+    keeps bloom filters of the ids it has seen, so checking a token that
+    was never blacklisted here costs no query. Adding is a plain INSERT on
+    the unique jti, which is also the authoritative check: a token rotated
+    by another process fails there.
+
+    Filters cannot forget, so a new one is started every token lifetime
+    and the one before the previous is dropped: by then all its tokens
+    have expired and are rejected before reaching the blacklist.
+    """
+
+    def __init__(self, capacity, lifetime):
+        self.capacity = capacity
+        self.lifetime = lifetime.total_seconds()
+        self.filters = [BloomFilter(capacity)]
+        self.rotated_at = time.monotonic()
+        self.lock = Lock()
+
+    def current_filters(self):
+        with self.lock:
+            if time.monotonic() - self.rotated_at > self.lifetime:
+                self.filters = [BloomFilter(self.capacity), self.filters[0]]
+                self.rotated_at = time.monotonic()
+            return self.filters
+
+    def remember(self, jti):
+        self.current_filters()[0].add(jti)
+
+    def might_contain(self, jti):
+        return any(jti in bloom for bloom in self.current_filters())
+
+    def contains(self, jti):
+        """Whether the token id is blacklisted, by this or any process."""
+        if not self.might_contain(jti):
+            return False
+        return BlacklistedToken.objects.filter(jti=jti).exists()
+
+    def add(self, jti, expires_at):
+        """
+        Blacklist a token id. Return False if it was already there, i.e.
+        the token was used concurrently.
+        """
+        try:
+            with transaction.atomic():
+                BlacklistedToken.objects.create(jti=jti,
+                                                expires_at=expires_at)
+        except IntegrityError:
+            return False
+        finally:
+            self.remember(jti)
+        return True
+
+    def clear(self):
+        with self.lock:
+            self.filters = [BloomFilter(self.capacity)]
+            self.rotated_at = time.monotonic()
+
+
+token_blacklist = TokenBlacklist(
+    capacity=getattr(settings, "TOKEN_BLACKLIST_BLOOM_CAPACITY", 100_000),
+    lifetime=api_settings.REFRESH_TOKEN_LIFETIME,
+)
+
+
+class RefreshToken(VersionedRefreshToken):
+    """
+    Refresh token checked against `token_blacklist` when decoded and
+    blacklisted on rotation (the hooks simplejwt's TokenRefreshSerializer
+    calls when BLACKLIST_AFTER_ROTATION is set).
+    """
+
+    def verify(self, *args, **kwargs):
+        super().verify(*args, **kwargs)
+        if token_blacklist.contains(self[api_settings.JTI_CLAIM]):
+            raise TokenError("El token ya ha sido utilizado.")
+
+    def blacklist(self):
+        expires_at = datetime.fromtimestamp(self["exp"], tz=dt_timezone.utc)
+        if not token_blacklist.add(self[api_settings.JTI_CLAIM], expires_at):
+            raise TokenError("El token ya ha sido utilizado.")
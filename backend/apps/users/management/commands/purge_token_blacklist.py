@@ -0,0 +1,39 @@
+import time
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.users.models import BlacklistedToken
+
+
+class Command(BaseCommand):
+    help = "Delete the blacklisted refresh tokens that already expired."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=1000,
+            help="Rows deleted per statement.",
+        )
+        parser.add_argument(
+            "--pause", type=float, default=0,
+            help="Seconds to wait between batches.",
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        deleted = 0
+
+        # Small deletes by primary key keep each lock short
+        while True:
+            ids = list(
+                BlacklistedToken.objects.filter(expires_at__lte=now)
+                .order_by("expires_at")
+                .values_list("pk", flat=True)[:options["batch_size"]]
+            )
+            if not ids:
+                break
+            deleted += BlacklistedToken.objects.filter(pk__in=ids).delete()[0]
+            if options["pause"]:
+                time.sleep(options["pause"])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{deleted} expired tokens purged."
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_alter_user_managers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='auth_version',
+            field=models.PositiveIntegerField(default=0, help_text='Se incrementa para invalidar los tokens emitidos'),
+        ),
+    ]
@@ -25,6 +25,9 @@ class User(AbstractUser):
         upload_to='profiles', blank=True, null=True,
         default="profiles/default_user.webp"
     )
+    # {"source": image name, "thumbnail": file name, ...}, see core.images
+    profile_picture_variants = models.JSONField(default=dict, blank=True,
+                                                editable=False)
     phone_number = models.CharField(max_length=15, blank=True, null=True,
                                     validators=[phone_validator])
 
@@ -45,6 +48,13 @@ class User(AbstractUser):
         help_text="Tiempo total recibido de otros usuarios"
     )
 
+    updated_at = models.DateTimeField(auto_now=True,
+                                      verbose_name="Última modificación")
+    auth_version = models.PositiveIntegerField(
+        default=0,
+        help_text="Se incrementa para invalidar los tokens emitidos"
+    )
+
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
 
@@ -63,6 +73,17 @@ class User(AbstractUser):
         """
         return self.time_received - self.time_sent
 
+    def invalidate_tokens(self):
+        """
+        Reject every token issued so far on the next request, saved with
+        the rest of the instance.
+        """
+        self.auth_version += 1
+
+    def set_password(self, raw_password):
+        super().set_password(raw_password)
+        self.invalidate_tokens()
+
     class Meta:
         db_table = "users"
         verbose_name = "User"
@@ -70,3 +91,18 @@ class User(AbstractUser):
 
     def __str__(self):
         return f"{self.email}"
+
+
+class BlacklistedToken(models.Model):
+    """
+    Refresh token already used (rotated). The row is useless once the
+    token expires, purge_token_blacklist deletes it.
+    """
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        db_table = "blacklisted_tokens"
+
+    def __str__(self):
+        return self.jti
@@ -1,14 +1,23 @@
 from rest_framework import serializers
 from django.contrib.auth.hashers import make_password
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from core.authentication import AUTH_VERSION_CLAIM
+from core.images import variant_urls
+from core.memo import MemoizedSerializerMixin
+from .blacklist import RefreshToken
 from .models import User
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(MemoizedSerializerMixin, serializers.ModelSerializer):
     """
     Serializer genérico para representar al usuario en responses.
     No expone la contraseña.
     """
     balance = serializers.SerializerMethodField()
+    # Resized WebP URLs, the original until they are generated
+    profile_picture_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -18,6 +27,7 @@ class UserSerializer(serializers.ModelSerializer):
             "first_name",
             "last_name",
             "profile_picture",
+            "profile_picture_variants",
             "phone_number",
             "location",
             "description",
@@ -29,6 +39,18 @@ class UserSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["id", "date_joined", "email", "time_sent",
                             "time_received", "full_name", "balance"]
+        # Columns read by properties and method fields, see core.fieldsets
+        source_columns = {
+            "profile_picture_variants": ["profile_picture",
+                                         "profile_picture_variants"],
+            "full_name": ["first_name", "last_name", "email", "is_active"],
+            "balance": ["time_sent", "time_received"],
+        }
+
+    def get_profile_picture_variants(self, obj):
+        return variant_urls(obj.profile_picture,
+                            obj.profile_picture_variants,
+                            self.context.get("request"))
 
     def get_balance(self, obj):
         total_seconds = obj.balance.total_seconds()
@@ -96,3 +118,37 @@ class UserLoginSerializer(serializers.Serializer):
 
         # We don't perform authentication here; it's handled in the view
         return data
+
+
+class UserTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    TokenRefreshSerializer with the blacklisted refresh token. A single
+    query checks the account is still active and, for versioned tokens,
+    that they were issued after the last auth_version bump.
+    """
+    token_class = RefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+
+        users = User.objects.filter(
+            pk=refresh.payload.get(api_settings.USER_ID_CLAIM), is_active=True
+        )
+        version = refresh.payload.get(AUTH_VERSION_CLAIM)
+        if version is not None:
+            users = users.filter(auth_version=version)
+        if not users.exists():
+            raise AuthenticationFailed(
+                self.error_messages["no_active_account"],
+                "no_active_account",
+            )
+
+        data = {"access": str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()  # fails if the token was used already
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data["refresh"] = str(refresh)
+        return data
@@ -0,0 +1,25 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from core.authentication import auth_state, publish_auth_state, user_cache
+from core.images import track_image_field, variants_ready
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, signal, **kwargs):
+    """
+    Drop the authentication cache entry of a changed user, and publish
+    its auth state for the copies cached by other processes.
+    """
+    user_cache.forget(instance.pk)
+    publish_auth_state(instance.pk, None if signal is post_delete
+                       else auth_state(instance))
+
+
+@receiver(variants_ready, sender=User)
+def forget_user_with_new_variants(sender, pk, **kwargs):
+    user_cache.forget(pk)
+
+
+track_image_field(User, "profile_picture", "profile_picture_variants")
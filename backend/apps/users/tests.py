@@ -2,10 +2,20 @@
 
 # Create your tests here.
 import pytest
+from datetime import date, timedelta
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
-from apps.users.models import User
+from io import BytesIO, StringIO
+from PIL import Image
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.utils import timezone
+from apps.users.models import BlacklistedToken, User
+from core.authentication import user_cache
+from apps.transactions.models import DailyBalance
 
 
 @pytest.mark.django_db
@@ -145,6 +155,117 @@ class TestUserEndpoints:
 
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
 
+    def login(self, api_client, user):
+        response = api_client.post(reverse("login"), {
+            "email": user.email, "password": "strongpassword",
+        }, format="json")
+        api_client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {response.data['access']}"
+        )
+
+    def test_token_authentication_uses_user_cache(self, api_client, user):
+        """Only the first request with a token reads the user row"""
+        self.login(api_client, user)
+        url = reverse("user-detail", kwargs={"pk": user.pk})
+
+        counts = []
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as queries:
+                response = api_client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            counts.append(len(queries))
+
+        assert counts[1] == counts[0] - 1
+
+    def test_deactivation_revokes_tokens(self, api_client, user):
+        self.login(api_client, user)
+        url = reverse("user-detail", kwargs={"pk": user.pk})
+        assert api_client.get(url).status_code == status.HTTP_200_OK
+
+        api_client.delete(url)
+
+        assert api_client.get(url).status_code == \
+            status.HTTP_401_UNAUTHORIZED
+
+    def test_deactivation_reaches_other_processes(
+            self, api_client, user, django_capture_on_commit_callbacks
+    ):
+        """A copy cached by another worker is not trusted after it"""
+        self.login(api_client, user)
+        url = reverse("user-detail", kwargs={"pk": user.pk})
+        assert api_client.get(url).status_code == status.HTTP_200_OK
+        stale = user_cache.get(user.pk)
+
+        user.is_active = False
+        user.invalidate_tokens()
+        with django_capture_on_commit_callbacks(execute=True):
+            user.save()
+        # The other worker only forgot its own copy, this one still has it
+        user_cache.set(user.pk, stale)
+
+        assert api_client.get(url).status_code == \
+            status.HTTP_401_UNAUTHORIZED
+
+    def test_password_change_revokes_tokens(self, api_client, user):
+        self.login(api_client, user)
+        url = reverse("user-detail", kwargs={"pk": user.pk})
+        assert api_client.get(url).status_code == status.HTTP_200_OK
+
+        user.set_password("anotherpassword")
+        user.save()
+
+        assert api_client.get(url).status_code == \
+            status.HTTP_401_UNAUTHORIZED
+
+    def refresh(self, api_client, token):
+        return api_client.post(reverse("token_refresh"), {"refresh": token},
+                               format="json")
+
+    def test_refresh_rotation_blacklists_used_token(self, api_client, user):
+        response = api_client.post(reverse("login"), {
+            "email": user.email, "password": "strongpassword",
+        }, format="json")
+        first = response.data["refresh"]
+
+        response = self.refresh(api_client, first)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["refresh"] != first
+        assert BlacklistedToken.objects.count() == 1
+
+        # The rotated token is spent, the new one still works
+        response_replay = self.refresh(api_client, first)
+        assert response_replay.status_code == status.HTTP_401_UNAUTHORIZED
+        assert self.refresh(api_client, response.data["refresh"]) \
+            .status_code == status.HTTP_200_OK
+
+    def test_refresh_rejected_after_deactivation(self, api_client, user):
+        response = api_client.post(reverse("login"), {
+            "email": user.email, "password": "strongpassword",
+        }, format="json")
+        refresh = response.data["refresh"]
+        user.is_active = False
+        user.invalidate_tokens()
+        user.save()
+
+        response = self.refresh(api_client, refresh)
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_purge_token_blacklist(self):
+        now = timezone.now()
+        for n, hours in enumerate((-2, -1, 1)):
+            BlacklistedToken.objects.create(
+                jti=f"jti-{n}", expires_at=now + timedelta(hours=hours)
+            )
+
+        out = StringIO()
+        call_command("purge_token_blacklist", "--batch-size", "1",
+                     stdout=out)
+
+        assert "2 expired tokens purged" in out.getvalue()
+        assert list(BlacklistedToken.objects.values_list("jti", flat=True)) \
+            == ["jti-2"]
+
     # ------------------------
     #  USER UPDATE AND DELETE
     # ------------------------
@@ -166,6 +287,31 @@ class TestUserEndpoints:
         assert user.first_name == "Updated"
         assert user.location == "Madrid"
 
+    def test_profile_picture_variants(
+            self, api_client, user, settings, tmp_path,
+            django_capture_on_commit_callbacks
+    ):
+        settings.MEDIA_ROOT = tmp_path
+        settings.IMAGE_WORKERS = 0
+        url = reverse("user-detail", kwargs={"pk": user.pk})
+        default = api_client.get(url).data
+        assert default["profile_picture_variants"]["thumbnail"] == \
+            default["profile_picture"]
+
+        output = BytesIO()
+        Image.new("RGBA", (1200, 1200), (0, 0, 255, 128)).save(output, "PNG")
+        api_client.force_authenticate(user=user)
+        with django_capture_on_commit_callbacks(execute=True):
+            api_client.patch(url, {"profile_picture": SimpleUploadedFile(
+                "me.png", output.getvalue(), content_type="image/png"
+            )}, format="multipart")
+
+        user.refresh_from_db()
+        with Image.open(tmp_path / user.profile_picture_variants["medium"]) \
+                as medium:
+            assert medium.size == (960, 960)
+            assert medium.mode == "RGBA"
+
     def test_delete_user_soft(self, api_client, user):
         api_client.force_authenticate(user=user)
         url = reverse(
@@ -205,7 +351,8 @@ class TestUserEndpoints:
         response = api_client.get(url)
 
         assert response.status_code == status.HTTP_200_OK
-        assert any(u["email"] == user.email for u in response.data)
+        assert any(u["email"] == user.email
+                   for u in response.data["results"])
 
     def test_list_users_unauthenticated(self, api_client):
         """Unauthenticated user trying to list users"""
@@ -215,6 +362,81 @@ class TestUserEndpoints:
         # Depending on your config this may be 200 or 401
         assert response.status_code == status.HTTP_200_OK
 
+    def test_balance_history(self, api_client, user):
+        """Daily balances in a date range, with the balance before it"""
+        for day, received, balance in ((1, 2, 2), (3, 1, 3), (6, 1, 4)):
+            DailyBalance.objects.create(
+                user=user, day=date(2025, 1, day),
+                received=timedelta(hours=received),
+                balance=timedelta(hours=balance),
+            )
+        url = reverse("user-balance-history", args=[user.id])
+
+        response = api_client.get(url, {"from_date": "2025-01-02",
+                                        "to_date": "2025-01-05"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["opening_balance"] == "02:00:00"
+        assert [d["day"] for d in response.data["days"]] == ["2025-01-03"]
+        assert response.data["days"][0]["balance"] == "03:00:00"
+
+        response = api_client.get(url)
+        assert response.data["opening_balance"] == "00:00:00"
+        assert len(response.data["days"]) == 3
+
+    def test_balance_history_cached_until_transfer(self, api_client, user):
+        """Cached per user, a transfer moves updated_at and the key"""
+        from apps.transactions.ledger import record_transfer
+        from apps.transactions.serializers import TransactionSerializer
+        other = User.objects.create_user(email="other@example.com",
+                                         password="strongpassword")
+        url = reverse("user-balance-history", args=[user.id])
+        assert api_client.get(url).data["days"] == []
+
+        with CaptureQueriesContext(connection) as queries:
+            assert api_client.get(url).data["days"] == []
+        assert not any("daily_balances" in query["sql"]
+                       for query in queries.captured_queries)
+
+        serializer = TransactionSerializer(data={
+            "receiver_id": user.id, "title": "Gracias",
+            "duration": "01:00:00",
+        })
+        serializer.is_valid(raise_exception=True)
+        record_transfer(serializer, other)
+
+        days = api_client.get(url).data["days"]
+        assert [day["balance"] for day in days] == ["01:00:00"]
+
+    def test_conditional_get_user(self, api_client, user):
+        """Balance updates made with update() also change the ETag"""
+        from apps.transactions.ledger import apply_transfer
+        other = User.objects.create_user(email="other@example.com",
+                                         password="strongpassword")
+        url = reverse("user-detail", kwargs={"pk": user.pk})
+        etag = api_client.get(url)["ETag"]
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        apply_transfer(other.pk, user.pk, timedelta(hours=1))
+
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["time_received"] == "01:00:00"
+
+    def test_list_users_sparse_fieldset(self, api_client, user):
+        """Only the selected fields and the columns behind them"""
+        url = reverse("user-list")
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get(url, {"fields": "id,full_name,balance"})
+
+        assert response.data["results"] == [
+            {"id": user.id, "full_name": "Test User", "balance": "0h 0min"}
+        ]
+        rows_query = queries.captured_queries[-1]["sql"]
+        assert "description" not in rows_query
+        assert "password" not in rows_query
+
     # ------------------------
     #  SPECIAL FIELDS
     # ------------------------
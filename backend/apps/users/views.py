@@ -1,4 +1,7 @@
-from rest_framework import status, viewsets
+from datetime import timedelta
+from django.utils.dateparse import parse_date
+from rest_framework import serializers, status, viewsets
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from .models import User
@@ -8,12 +11,22 @@ from .serializers import (
     UserLoginSerializer
 )
 from django.contrib.auth import authenticate
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.permissions import IsAuthenticated
+from core.authentication import VersionedRefreshToken
+from core.cache import get_cache
 from core.permissions import IsOwnerOrReadOnly
+from core.compiled import CompiledListMixin
+from core.conditional import ConditionalGetMixin
+from core.fieldsets import SparseFieldsetMixin
+from core.prefetch import SerializerPrefetchMixin
+from core.streaming import StreamingListMixin
+from apps.transactions.models import DailyBalance
+from apps.transactions.serializers import DailyBalanceSerializer
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(StreamingListMixin, SparseFieldsetMixin, CompiledListMixin,
+                  SerializerPrefetchMixin, ConditionalGetMixin,
+                  viewsets.ModelViewSet):
     """
     API endpoint to manage users.
     Accepts JSON POST requests from React frontend.
@@ -50,10 +63,51 @@ class UserViewSet(viewsets.ModelViewSet):
     def destroy(self, request, *args, **kwargs):
         user = self.get_object()
         user.is_active = False
+        user.invalidate_tokens()
         user.save()
         return Response({"detail": "Usuario desactivado correctamente."},
                         status=status.HTTP_200_OK)
 
+    @action(detail=True, methods=["get"], url_path="balance-history")
+    def balance_history(self, request, pk=None):
+        """
+        Saldo diario del usuario a partir de los resúmenes diarios.
+        Acepta ?from_date=YYYY-MM-DD y ?to_date=YYYY-MM-DD (inclusivos).
+        Los días sin movimientos no aparecen, su saldo es el del día
+        anterior.
+        """
+        user = self.get_object()
+        from_date = parse_date(request.query_params.get("from_date") or "")
+        to_date = parse_date(request.query_params.get("to_date") or "")
+        # The ledger moves updated_at with every daily balance it writes
+        key = f"{user.pk}:{user.updated_at.isoformat()}:{from_date}:{to_date}"
+        return Response(get_cache("balance_history").get_or_set(
+            key, lambda: self.build_balance_history(user, from_date, to_date)
+        ))
+
+    @staticmethod
+    def build_balance_history(user, from_date, to_date):
+        rows = DailyBalance.objects.filter(user=user)
+
+        opening = timedelta(0)
+        if from_date:
+            opening = (
+                rows.filter(day__lt=from_date).order_by("-day")
+                .values_list("balance", flat=True).first()
+            ) or opening
+            rows = rows.filter(day__gte=from_date)
+
+        if to_date:
+            rows = rows.filter(day__lte=to_date)
+
+        return {
+            "opening_balance": serializers.DurationField().to_representation(
+                opening
+            ),
+            "days": DailyBalanceSerializer(rows.order_by("day"),
+                                           many=True).data,
+        }
+
 
 class LoginView(APIView):
     """
@@ -80,7 +134,7 @@ class LoginView(APIView):
             )
 
         # Login exitoso
-        refresh = RefreshToken.for_user(user)
+        refresh = VersionedRefreshToken.for_user(user)
         return Response({
             "refresh": str(refresh),
             "access": str(refresh.access_token),
@@ -0,0 +1,78 @@
+# flake8: noqa
+"""
+Bursts of identical anonymous offer list requests arriving at the same
+time on one process (threads), with the response cache cold before each
+burst, with and without request coalescing.
+
+Usage: python benchmarks/bench_coalescing.py [--threads 16] [--bursts 10]
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from common import bench_user, clear_bench_data
+
+from django.conf import settings
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings
+
+from apps.offers.cache import bump_offer_version
+from apps.offers.models import Offer
+from core.middleware import coalescing_ratio, stats
+
+COALESCING = "core.middleware.RequestCoalescingMiddleware"
+
+
+def get(url):
+    try:
+        return Client().get(url).status_code
+    finally:
+        connections.close_all()
+
+
+def bursts(url, threads, count):
+    """Median milliseconds until every request of a burst is answered."""
+    timings = []
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for _ in range(count):
+            bump_offer_version()
+            start = time.perf_counter()
+            assert set(executor.map(get, [url] * threads)) == {200}
+            timings.append((time.perf_counter() - start) * 1000)
+    return sorted(timings)[len(timings) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--bursts", type=int, default=10)
+    args = parser.parse_args()
+
+    clear_bench_data()
+    users = [bench_user(i) for i in range(20)]
+    Offer.objects.bulk_create(
+        Offer(title=f"Oferta {n}", description="Benchmark " * 20,
+              duration=timedelta(hours=1), is_online=True,
+              user=users[n % 20])
+        for n in range(500)
+    )
+    url = "/api/offers/?is_online=true&page_size=100"
+    without = [name for name in settings.MIDDLEWARE if name != COALESCING]
+    try:
+        with override_settings(ALLOWED_HOSTS=["testserver"]):
+            with override_settings(MIDDLEWARE=without):
+                plain = bursts(url, args.threads, args.bursts)
+            coalesced = bursts(url, args.threads, args.bursts)
+            print(f"burst of {args.threads}   each on its own {plain:7.0f} ms"
+                  f"   coalesced {coalesced:7.0f} ms   "
+                  f"coalescing ratio {coalescing_ratio():.0%} "
+                  f"({stats['coalesced']} of "
+                  f"{stats['coalesced'] + stats['executed']})")
+    finally:
+        clear_bench_data()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# flake8: noqa
+"""
+Rendering 10k-row offer and transaction lists with the DRF serializers
+over instances, and with the compiled serializer over values() rows.
+Both outputs are checked to render to the same JSON bytes.
+
+Usage: python benchmarks/bench_compiled.py [--rows 10000] [--repeat 5]
+"""
+import argparse
+from datetime import timedelta
+
+from common import bench_user, clear_bench_data, timeit
+
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+
+from apps.offers.models import Offer
+from apps.offers.serializers import OfferSerializer
+from apps.transactions.models import Transaction
+from apps.transactions.serializers import TransactionSerializer
+from core.compiled import compile_serializer
+from core.prefetch import prefetch_for_serializer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    clear_bench_data()
+    users = [bench_user(i) for i in range(50)]
+    offers = Offer.objects.bulk_create(
+        Offer(title=f"Oferta {n}", description="Benchmark",
+              duration=timedelta(minutes=30 + n % 180),
+              location="Sevilla", user=users[n % 50])
+        for n in range(args.rows)
+    )
+    Transaction.objects.bulk_create(
+        Transaction(sender=users[n % 50], receiver=users[(n + 1) % 50],
+                    offer=offers[n] if n % 3 else None,
+                    title=f"Intercambio {n}", duration=timedelta(hours=1))
+        for n in range(args.rows)
+    )
+
+    request = RequestFactory().get("/api/")
+    cases = {
+        "offers": (OfferSerializer,
+                   Offer.objects.filter(user__in=users).order_by("-id")),
+        "transactions": (TransactionSerializer,
+                         Transaction.objects.filter(sender__in=users)
+                         .order_by("-id")),
+    }
+    renderer = JSONRenderer()
+    try:
+        with override_settings(ALLOWED_HOSTS=["testserver"]):
+            for name, (serializer_class, queryset) in cases.items():
+                serializer = serializer_class(context={"request": request})
+                compiled = compile_serializer(serializer)
+                instances = prefetch_for_serializer(queryset, serializer)
+                rows = queryset.values(*compiled.columns)
+
+                def drf():
+                    return serializer_class(
+                        list(instances), many=True,
+                        context={"request": request},
+                    ).data
+
+                def fast():
+                    return compiled.render(list(rows))
+
+                assert renderer.render(drf()) == renderer.render(fast())
+                drf_ms = timeit(drf, repeat=args.repeat)
+                fast_ms = timeit(fast, repeat=args.repeat)
+                print(f"{name:<13} serializer {drf_ms:8.0f} ms   "
+                      f"compiled {fast_ms:8.0f} ms   x{drf_ms / fast_ms:.1f}")
+    finally:
+        clear_bench_data()
+
+
+if __name__ == "__main__":
+    main()
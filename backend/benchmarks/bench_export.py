@@ -0,0 +1,73 @@
+# flake8: noqa
+"""
+Peak memory of the ledger export as the table grows, compared with
+rendering the same rows through TransactionSerializer(many=True).
+
+Usage: python benchmarks/bench_export.py [--sizes 10000 100000]
+"""
+import argparse
+import time
+import tracemalloc
+from datetime import timedelta
+
+from common import bench_user, clear_bench_data
+
+from apps.transactions.export import export_lines, ledger_rows
+from apps.transactions.models import Transaction
+from apps.transactions.serializers import TransactionSerializer
+
+
+def measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 2 ** 20, elapsed
+
+
+def stream():
+    for _ in export_lines("csv", ledger_rows()):
+        pass
+
+
+def serialize():
+    TransactionSerializer(Transaction.objects.select_related(
+        "sender", "receiver", "offer__user"
+    ), many=True).data
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[10000, 100000])
+    args = parser.parse_args()
+
+    clear_bench_data()
+    users = [bench_user(i) for i in range(10)]
+    try:
+        created = 0
+        for size in sorted(args.sizes):
+            while created < size:
+                batch = min(5000, size - created)
+                Transaction.objects.bulk_create(
+                    Transaction(sender=users[n % 10],
+                                receiver=users[(n + 1) % 10],
+                                title=f"Transferencia {n}",
+                                duration=timedelta(hours=1))
+                    for n in range(created, created + batch)
+                )
+                created += batch
+
+            for name, func in (("export", stream),
+                               ("serializer", serialize)):
+                peak, elapsed = measure(func)
+                print(f"{size:>10} rows  {name:<12} "
+                      f"peak {peak:8.1f} MiB  {elapsed:6.2f} s")
+    finally:
+        clear_bench_data()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# flake8: noqa
+"""
+Payload size and latency of list pages with the full representation and
+with a sparse fieldset (what the offer cards and the transaction history
+actually show).
+
+Usage: python benchmarks/bench_fieldsets.py [--rows 5000] [--page-size 100]
+"""
+import argparse
+from datetime import timedelta
+
+from common import bench_user, clear_bench_data, timeit
+
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from apps.offers.models import Offer
+from apps.transactions.models import Transaction
+
+CASES = {
+    "offers": (
+        "/api/offers/",
+        "id,title,image_variants,duration_minutes,user.full_name",
+    ),
+    "transactions": (
+        "/api/transactions/",
+        "id,title,datetime,duration,sender.full_name,receiver.full_name",
+    ),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+
+    clear_bench_data()
+    users = [bench_user(i) for i in range(50)]
+    offers = Offer.objects.bulk_create(
+        Offer(title=f"Oferta {n}", description="Descripción larga " * 25,
+              duration=timedelta(hours=1), location="Sevilla",
+              user=users[n % 50])
+        for n in range(args.rows)
+    )
+    Transaction.objects.bulk_create(
+        Transaction(sender=users[n % 50], receiver=users[(n + 1) % 50],
+                    offer=offers[n], title=f"Intercambio {n}",
+                    text="Gracias " * 20, duration=timedelta(hours=1))
+        for n in range(args.rows)
+    )
+
+    client = APIClient()
+    # Authenticated, so the anonymous offer cache is not involved
+    client.force_authenticate(user=users[0])
+    try:
+        with override_settings(ALLOWED_HOSTS=["testserver"]):
+            for name, (url, fields) in CASES.items():
+                params = {"page_size": args.page_size}
+                sparse = {**params, "fields": fields}
+                full_size = len(client.get(url, params).content)
+                sparse_size = len(client.get(url, sparse).content)
+                full_ms = timeit(lambda: client.get(url, params))
+                sparse_ms = timeit(lambda: client.get(url, sparse))
+                print(f"{name:<13} full {full_size / 1024:7.1f} KiB "
+                      f"{full_ms:7.1f} ms   sparse "
+                      f"{sparse_size / 1024:7.1f} KiB {sparse_ms:7.1f} ms   "
+                      f"x{full_size / sparse_size:.1f} smaller, "
+                      f"x{full_ms / sparse_ms:.1f} faster")
+    finally:
+        clear_bench_data()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# flake8: noqa
+"""
+Offer list pages (authenticated, so the whole-response cache is skipped)
+rendered from scratch, assembled from cached per-offer fragments, and
+after one offer of the page changed.
+
+Usage: python benchmarks/bench_fragments.py [--page-size 100]
+"""
+import argparse
+from datetime import timedelta
+
+from common import bench_user, clear_bench_data, timeit
+
+from django.core.cache import cache
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from apps.offers.models import Offer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+
+    clear_bench_data()
+    users = [bench_user(i) for i in range(20)]
+    Offer.objects.bulk_create(
+        Offer(title=f"Oferta {n}", description="Benchmark " * 20,
+              duration=timedelta(hours=1), location="Sevilla",
+              user=users[n % 20])
+        for n in range(args.page_size)
+    )
+    client = APIClient()
+    client.force_authenticate(user=users[0])
+    url = f"/api/offers/?page_size={args.page_size}"
+
+    def cold():
+        cache.clear()
+        client.get(url)
+
+    def one_changed():
+        offer = Offer.objects.filter(user__in=users).first()
+        offer.save()
+        client.get(url)
+
+    try:
+        # Fragments of a whole page have to fit the default LocMemCache
+        with override_settings(ALLOWED_HOSTS=["testserver"], CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "OPTIONS": {"MAX_ENTRIES": 10000},
+            },
+        }):
+            cache.clear()
+            rendered = timeit(cold)
+            client.get(url)
+            assembled = timeit(lambda: client.get(url))
+            changed = timeit(one_changed)
+            print(f"page of {args.page_size}   rendered {rendered:6.1f} ms   "
+                  f"from fragments {assembled:6.1f} ms   "
+                  f"one changed {changed:6.1f} ms")
+    finally:
+        clear_bench_data()
+
+
+if __name__ == "__main__":
+    main()
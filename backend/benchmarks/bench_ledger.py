@@ -0,0 +1,92 @@
+# flake8: noqa
+"""
+Ledger stress test: several processes post transfers concurrently between
+a small set of users, then the user totals are checked against
+SUM(duration) over the transactions table.
+
+Meant to run against MySQL; SQLite serializes writers and will mostly
+measure its own locking.
+
+Usage: python benchmarks/bench_ledger.py [--processes 8] [--transfers 500]
+"""
+import argparse
+import multiprocessing
+import random
+import time
+from datetime import timedelta
+
+from common import bench_user, clear_bench_data
+
+from django.db import connections
+from django.db.models import Sum
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from apps.transactions.models import Transaction
+from apps.users.models import User
+
+
+def worker(user_ids, transfers, seed):
+    connections.close_all()  # never share the parent's connection
+    random.seed(seed)
+    users = {user.pk: user for user in User.objects.filter(pk__in=user_ids)}
+    client = APIClient()
+    failures = 0
+    with override_settings(ALLOWED_HOSTS=["testserver"]):
+        for _ in range(transfers):
+            sender_id, receiver_id = random.sample(user_ids, 2)
+            client.force_authenticate(user=users[sender_id])
+            response = client.post("/api/transactions/", {
+                "receiver_id": receiver_id,
+                "title": "Stress",
+                "duration": f"00:{random.choice([15, 30, 45])}:00",
+            }, format="json")
+            failures += response.status_code != 201
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--transfers", type=int, default=500,
+                        help="Transfers posted by each process.")
+    parser.add_argument("--users", type=int, default=6)
+    args = parser.parse_args()
+
+    clear_bench_data()
+    user_ids = [bench_user(i).pk for i in range(args.users)]
+    connections.close_all()
+
+    context = multiprocessing.get_context("fork")
+    try:
+        start = time.perf_counter()
+        with context.Pool(args.processes) as pool:
+            failures = sum(pool.starmap(worker, [
+                (user_ids, args.transfers, seed)
+                for seed in range(args.processes)
+            ]))
+        elapsed = time.perf_counter() - start
+
+        total = args.processes * args.transfers
+        print(f"{total - failures} transfers in {elapsed:.2f} s "
+              f"({(total - failures) / elapsed:.0f} transfers/s, "
+              f"{failures} failed)")
+
+        mismatches = 0
+        for user in User.objects.filter(pk__in=user_ids):
+            sent = Transaction.objects.filter(sender=user).aggregate(
+                total=Sum("duration"))["total"] or timedelta(0)
+            received = Transaction.objects.filter(receiver=user).aggregate(
+                total=Sum("duration"))["total"] or timedelta(0)
+            if (user.time_sent, user.time_received) != (sent, received):
+                mismatches += 1
+                print(f"MISMATCH {user.email}: {user.time_sent}/{sent} "
+                      f"{user.time_received}/{received}")
+        print("Totals match the ledger." if not mismatches
+              else f"{mismatches} users drifted.")
+    finally:
+        clear_bench_data()
+
+
+if __name__ == "__main__":
+    main()
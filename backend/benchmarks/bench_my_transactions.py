@@ -0,0 +1,71 @@
+# flake8: noqa
+"""
+my-transactions latency for a user with a long history, compared with the
+previous OR query.
+
+Usage: python benchmarks/bench_my_transactions.py [--transactions 100000]
+"""
+import argparse
+from datetime import timedelta
+
+from common import bench_user, clear_bench_data, timeit
+
+from django.db.models import Q
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from apps.transactions.models import Transaction
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transactions", type=int, default=100000)
+    args = parser.parse_args()
+
+    clear_bench_data()
+    user, other, third = bench_user(0), bench_user(1), bench_user(2)
+    for start in range(0, args.transactions, 5000):
+        Transaction.objects.bulk_create(
+            Transaction(
+                sender=user if n % 2 else other,
+                receiver=other if n % 2 else user,
+                title=f"Transferencia {n}",
+                duration=timedelta(hours=1),
+            )
+            for n in range(start, min(start + 5000, args.transactions))
+        )
+    # Other users' traffic the OR query has to skip
+    Transaction.objects.bulk_create(
+        Transaction(sender=other, receiver=third, title="Ruido",
+                    duration=timedelta(hours=1))
+        for _ in range(args.transactions)
+    )
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    url = "/api/transactions/my-transactions/"
+    try:
+        with override_settings(ALLOWED_HOSTS=["testserver"]):
+            deep = url
+            for _ in range(50):
+                deep = client.get(deep).json()["next"]
+
+            def or_query():
+                return list(
+                    Transaction.objects.filter(Q(sender=user) |
+                                               Q(receiver=user))
+                    .select_related("sender", "receiver", "offer__user")
+                    .order_by("-datetime", "-id")[:20]
+                )
+
+            print(f"OR query, first page     {timeit(or_query):8.2f} ms")
+            for label, page_url in [("first page", url), ("page 51", deep),
+                                    ("sent only", url + "?direction=sent")]:
+                ms = timeit(lambda: client.get(page_url))
+                print(f"endpoint, {label:<14} {ms:8.2f} ms")
+    finally:
+        clear_bench_data()
+
+
+if __name__ == "__main__":
+    main()
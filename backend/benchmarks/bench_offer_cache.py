@@ -0,0 +1,72 @@
+# flake8: noqa
+"""
+Anonymous offer list/detail throughput with a warm response cache,
+compared with every request missing it (version bumped before each one).
+
+Usage: python benchmarks/bench_offer_cache.py [--offers 10000] [--seconds 3]
+"""
+import argparse
+import time
+from datetime import timedelta
+
+from common import bench_user, clear_bench_data
+
+from django.test import Client
+from django.test.utils import override_settings
+
+from apps.offers.cache import bump_offer_version, offer_cache
+from apps.offers.models import Offer
+
+
+def requests_per_second(client, url, seconds, before=None):
+    done = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        if before:
+            before()
+        client.get(url)
+        done += 1
+    return done / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--offers", type=int, default=10000)
+    parser.add_argument("--seconds", type=float, default=3)
+    args = parser.parse_args()
+
+    clear_bench_data()
+    users = [bench_user(i) for i in range(50)]
+    for start in range(0, args.offers, 5000):
+        Offer.objects.bulk_create(
+            Offer(title=f"Oferta {n}", description="Benchmark",
+                  duration=timedelta(hours=1), user=users[n % 50])
+            for n in range(start, min(start + 5000, args.offers))
+        )
+    offer = Offer.objects.filter(user__in=users).first()
+
+    client = Client()
+    urls = {
+        "list": "/api/offers/?page_size=20",
+        "detail": f"/api/offers/{offer.pk}/",
+    }
+    try:
+        with override_settings(ALLOWED_HOSTS=["testserver"]):
+            for name, url in urls.items():
+                cold = requests_per_second(client, url, args.seconds,
+                                           before=bump_offer_version)
+                client.get(url)
+                warm = requests_per_second(client, url, args.seconds)
+                print(f"{name:<7} uncached {cold:8.0f} req/s   "
+                      f"warm cache {warm:8.0f} req/s   x{warm / cold:.1f}")
+            stats = offer_cache.stats
+            print(f"local hits {stats['local_hits']}  "
+                  f"shared hits {stats['shared_hits']}  "
+                  f"misses {stats['misses']}  "
+                  f"hit rate {offer_cache.hit_rate():.1%}")
+    finally:
+        clear_bench_data()
+
+
+if __name__ == "__main__":
+    main()
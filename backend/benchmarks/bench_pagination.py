@@ -0,0 +1,55 @@
+# flake8: noqa
+"""
+Offer list latency for the first page and for pages deep into the list.
+
+Usage: python benchmarks/bench_pagination.py [--offers 100000]
+"""
+import argparse
+from datetime import timedelta
+
+from common import bench_user, clear_bench_data, timeit
+
+from django.test import Client
+from django.test.utils import override_settings
+
+from apps.offers.models import Offer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--offers", type=int, default=100000)
+    parser.add_argument("--page-size", type=int, default=20)
+    args = parser.parse_args()
+
+    clear_bench_data()
+    user = bench_user()
+    for start in range(0, args.offers, 5000):
+        Offer.objects.bulk_create(
+            Offer(title=f"Oferta {n}", description="Benchmark",
+                  duration=timedelta(hours=1), user=user)
+            for n in range(start, min(start + 5000, args.offers))
+        )
+
+    client = Client()
+    url = f"/api/offers/?page_size={args.page_size}"
+    try:
+        with override_settings(ALLOWED_HOSTS=["testserver"]):
+            # Collect the cursor of a few pages while walking the list
+            pages = {}
+            page, next_url = 1, url
+            targets = {1, 10, 100, 1000, args.offers // args.page_size}
+            while next_url and page <= max(targets):
+                if page in targets:
+                    pages[page] = next_url
+                next_url = client.get(next_url).json()["next"]
+                page += 1
+
+            for page, page_url in sorted(pages.items()):
+                ms = timeit(lambda: client.get(page_url))
+                print(f"page {page:>6}  {ms:8.2f} ms")
+    finally:
+        clear_bench_data()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# flake8: noqa
+"""
+Rendering a transaction history where the same few users and offers
+appear on every row, with and without the per-request render memo.
+
+Usage: python benchmarks/bench_render_memo.py [--rows 2000] [--users 10]
+"""
+import argparse
+from datetime import timedelta
+
+from common import bench_user, clear_bench_data, timeit
+
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+
+from apps.offers.models import Offer
+from apps.transactions.models import Transaction
+from apps.transactions.serializers import TransactionSerializer
+from core.memo import MEMO_CONTEXT_KEY
+from core.prefetch import prefetch_for_serializer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=10)
+    args = parser.parse_args()
+
+    clear_bench_data()
+    users = [bench_user(i) for i in range(args.users)]
+    offers = Offer.objects.bulk_create(
+        Offer(title=f"Oferta {n}", description="Benchmark",
+              duration=timedelta(hours=1), user=user)
+        for n, user in enumerate(users)
+    )
+    Transaction.objects.bulk_create(
+        Transaction(sender=users[0], receiver=users[1 + n % (args.users - 1)],
+                    offer=offers[n % args.users], title=f"Intercambio {n}",
+                    duration=timedelta(hours=1))
+        for n in range(args.rows)
+    )
+
+    request = RequestFactory().get("/api/")
+    queryset = prefetch_for_serializer(
+        Transaction.objects.filter(sender=users[0]).order_by("-id"),
+        TransactionSerializer(),
+    )
+    rows = list(queryset)
+
+    def render(memo):
+        context = {"request": request}
+        if memo:
+            context[MEMO_CONTEXT_KEY] = {}
+        return TransactionSerializer(rows, many=True, context=context).data
+
+    try:
+        with override_settings(ALLOWED_HOSTS=["testserver"]):
+            renderer = JSONRenderer()
+            assert renderer.render(render(False)) == \
+                renderer.render(render(True))
+            plain = timeit(lambda: render(False), repeat=5)
+            memo = timeit(lambda: render(True), repeat=5)
+            print(f"{args.rows} rows, {args.users} users   "
+                  f"plain {plain:7.0f} ms   memo {memo:7.0f} ms   "
+                  f"x{plain / memo:.1f}")
+    finally:
+        clear_bench_data()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# flake8: noqa
+"""
+Encoding throughput of DRF's JSONRenderer, the orjson renderer and the
+MessagePack renderer over offer and transaction list pages, plus raw
+timedelta/datetime values.
+
+Usage: python benchmarks/bench_renderers.py [--rows 100] [--repeat 200]
+"""
+import argparse
+from datetime import timedelta
+
+from common import bench_user, clear_bench_data, timeit
+
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from apps.offers.models import Offer
+from apps.offers.serializers import OfferSerializer
+from apps.transactions.models import Transaction
+from apps.transactions.serializers import TransactionSerializer
+from core.renderers import FastJSONRenderer, MessagePackRenderer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    clear_bench_data()
+    users = [bench_user(i) for i in range(20)]
+    offers = Offer.objects.bulk_create(
+        Offer(title=f"Oferta {n}", description="Descripción " * 20,
+              duration=timedelta(minutes=30 + n), location="Sevilla",
+              user=users[n % 20])
+        for n in range(args.rows)
+    )
+    Transaction.objects.bulk_create(
+        Transaction(sender=users[n % 20], receiver=users[(n + 1) % 20],
+                    offer=offers[n], title=f"Intercambio {n}",
+                    duration=timedelta(hours=1))
+        for n in range(args.rows)
+    )
+
+    context = {"request": RequestFactory().get("/api/")}
+    renderers = {"drf json": JSONRenderer(), "orjson": FastJSONRenderer(),
+                 "msgpack": MessagePackRenderer()}
+    try:
+        with override_settings(ALLOWED_HOSTS=["testserver"]):
+            payloads = {
+                "offers": {"results": OfferSerializer(
+                    Offer.objects.filter(user__in=users), many=True,
+                    context=context).data},
+                "transactions": {"results": TransactionSerializer(
+                    Transaction.objects.filter(sender__in=users), many=True,
+                    context=context).data},
+                "raw values": [
+                    {"duration": timedelta(minutes=n), "at": timezone.now()}
+                    for n in range(args.rows)
+                ],
+            }
+            for name, data in payloads.items():
+                line = f"{name:<13}"
+                for label, renderer in renderers.items():
+                    size = len(renderer.render(data))
+                    ms = timeit(lambda: renderer.render(data),
+                                repeat=args.repeat)
+                    line += (f"  {label} {ms:6.2f} ms "
+                             f"({size / 2 ** 20 / ms * 1000:6.0f} MiB/s)")
+                print(line)
+    finally:
+        clear_bench_data()
+
+
+if __name__ == "__main__":
+    main()
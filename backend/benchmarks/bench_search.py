@@ -0,0 +1,80 @@
+# flake8: noqa
+"""
+Offer search latency as the offers table grows.
+
+A fixed set of offers uses real words while the filler offers use a large
+synthetic vocabulary, so the number of matches stays constant and the
+timings show how the query cost depends on the table size. "pa" is a
+prefix of every filler term: terms that short only match whole terms
+(MIN_PREFIX_LENGTH), its cost has to stay flat too.
+
+Usage: python benchmarks/bench_search.py [--sizes 1000,10000,100000,1000000]
+"""
+import argparse
+import random
+from datetime import timedelta
+
+from common import bench_user, clear_bench_data, timeit
+
+from apps.offers.models import Offer, OfferSearchTerm
+from apps.offers.search import search_offers, weighted_terms
+
+WORDS = [
+    "clases", "inglés", "diseño", "gráfico", "jardín", "guitarra",
+    "reparación", "bicicletas", "móviles", "cocina", "mudanza", "pintura",
+    "matemáticas", "fotografía", "yoga", "costura", "programación", "huerto",
+]
+FILLER_WORDS = [f"palabra{n}" for n in range(50000)]
+QUERIES = ["diseno", "clases ingles", "guitarra", "reparacion bici", "pa",
+           "yoga pa"]
+
+
+def insert_offers(user, count, words, batch_size=5000):
+    """Bulk insert random offers and their index entries."""
+    for start in range(0, count, batch_size):
+        offers = Offer.objects.bulk_create(
+            Offer(
+                title=" ".join(random.sample(words, 3)),
+                description=" ".join(random.sample(words, 8)),
+                duration=timedelta(hours=1),
+                user=user,
+            )
+            for _ in range(min(batch_size, count - start))
+        )
+        if offers[0].pk is None:  # backend without RETURNING (MySQL)
+            offers = Offer.objects.filter(user=user).order_by("-id")[
+                :len(offers)
+            ]
+        OfferSearchTerm.objects.bulk_create(
+            OfferSearchTerm(offer=offer, term=term, weight=weight)
+            for offer in offers
+            for term, weight in weighted_terms(
+                offer.title, offer.description
+            ).items()
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000")
+    args = parser.parse_args()
+
+    clear_bench_data()
+    user = bench_user()
+    insert_offers(user, 200, WORDS)
+    total = 200
+    try:
+        for size in [int(s) for s in args.sizes.split(",")]:
+            insert_offers(user, size - total, FILLER_WORDS)
+            total = size
+            for query in QUERIES:
+                ms = timeit(lambda: list(
+                    search_offers(Offer.objects.all(), query)[:20]
+                ))
+                print(f"{total:>10} offers  q={query!r:<20} {ms:8.2f} ms")
+    finally:
+        clear_bench_data()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# flake8: noqa
+"""
+Time to first byte, total time and peak Python memory of `?stream=true`
+on the offer list, compared with rendering every offer into one JSON
+document (what a page as large as the table would cost).
+
+Usage: python benchmarks/bench_streaming.py [--offers 20000]
+"""
+import argparse
+import time
+import tracemalloc
+from datetime import timedelta
+
+from common import bench_user, clear_bench_data
+
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from apps.offers.models import Offer
+from apps.offers.serializers import OfferSerializer
+from core.prefetch import prefetch_for_serializer
+
+
+def measure(produce):
+    """(first byte ms, total ms, peak MiB, bytes) of an iterable of bytes."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    first = None
+    size = 0
+    for chunk in produce():
+        if first is None:
+            first = time.perf_counter()
+        size += len(chunk)
+    end = time.perf_counter()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return ((first - start) * 1000, (end - start) * 1000, peak / 2 ** 20,
+            size)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--offers", type=int, default=20000)
+    args = parser.parse_args()
+
+    clear_bench_data()
+    users = [bench_user(i) for i in range(50)]
+    for start in range(0, args.offers, 5000):
+        Offer.objects.bulk_create(
+            Offer(title=f"Oferta {n}", description="Benchmark " * 20,
+                  duration=timedelta(hours=1), user=users[n % 50])
+            for n in range(start, min(start + 5000, args.offers))
+        )
+    staff = users[0]
+    staff.is_staff = True
+    staff.save()
+
+    client = APIClient()
+    client.force_authenticate(user=staff)
+
+    def streamed():
+        response = client.get("/api/offers/", {"stream": "true"})
+        return response.streaming_content
+
+    def in_one_piece():
+        offers = prefetch_for_serializer(
+            Offer.objects.order_by("-publish_date", "-id"), OfferSerializer()
+        )
+        data = OfferSerializer(offers, many=True).data
+        return [JSONRenderer().render(data)]
+
+    try:
+        with override_settings(ALLOWED_HOSTS=["testserver"]):
+            for name, produce in (("one document", in_one_piece),
+                                  ("stream", streamed)):
+                first, total, peak, size = measure(produce)
+                print(f"{name:<13} first byte {first:8.0f} ms   "
+                      f"total {total:8.0f} ms   peak {peak:7.1f} MiB   "
+                      f"{size / 2 ** 20:.1f} MiB sent")
+    finally:
+        clear_bench_data()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# flake8: noqa
+"""
+Lookups of a cached offer page (the data of a 100-offer list response)
+from the shared Django cache alone and through the two-level cache, and
+the builds run when many threads miss the same key at once.
+
+Usage: python benchmarks/bench_tiered_cache.py [--threads 16]
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from common import bench_user, clear_bench_data, timeit
+
+from django.core.cache import cache
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from apps.offers.models import Offer
+from apps.offers.serializers import OfferSerializer
+from core.cache import DEFAULT_POLICY, TieredCache
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=16)
+    args = parser.parse_args()
+
+    clear_bench_data()
+    users = [bench_user(i) for i in range(20)]
+    Offer.objects.bulk_create(
+        Offer(title=f"Oferta {n}", description="Benchmark " * 20,
+              duration=timedelta(hours=1), user=users[n % 20])
+        for n in range(100)
+    )
+    try:
+        with override_settings(ALLOWED_HOSTS=["testserver"]):
+            page = OfferSerializer(
+                Offer.objects.filter(user__in=users), many=True,
+                context={"request": RequestFactory().get("/api/")},
+            ).data
+            tiered = TieredCache("bench", **DEFAULT_POLICY)
+            tiered.set("page", page)
+            cache.set("bench:page", page)
+
+            shared = timeit(lambda: cache.get("bench:page"), repeat=200)
+            two_level = timeit(lambda: tiered.get("page"), repeat=200)
+            print(f"lookup   shared only {shared:6.3f} ms   "
+                  f"two levels {two_level:6.3f} ms   "
+                  f"hit rate {tiered.hit_rate():.1%}")
+
+            def build():
+                time.sleep(0.2)  # an expensive query
+                return page
+
+            builds = tiered.stats["builds"]
+            with ThreadPoolExecutor(max_workers=args.threads) as executor:
+                list(executor.map(lambda _: tiered.get_or_set("cold", build),
+                                  range(args.threads)))
+            print(f"stampede {args.threads} threads   "
+                  f"builds {tiered.stats['builds'] - builds}   "
+                  f"waits {tiered.stats['waits']}")
+    finally:
+        clear_bench_data()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# flake8: noqa
+"""
+Shared helpers for the benchmark scripts.
+
+Benchmarks run against the database configured in .env, create their own
+demo rows (users with the @bench.local domain) and remove them when done.
+Run them from the backend folder, e.g. `python benchmarks/bench_search.py`.
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+
+import django
+
+django.setup()
+
+from apps.users.models import User
+
+BENCH_DOMAIN = "bench.local"
+
+
+def bench_user(index=0):
+    """Create (or reuse) a benchmark user."""
+    user, _ = User.objects.get_or_create(
+        email=f"bench{index}@{BENCH_DOMAIN}",
+        defaults={"first_name": "Bench", "last_name": f"User {index}"},
+    )
+    return user
+
+
+def clear_bench_data():
+    """Delete every row created by the benchmarks."""
+    from apps.offers.models import Offer
+    from apps.transactions.models import Transaction
+
+    users = User.objects.filter(email__endswith=f"@{BENCH_DOMAIN}")
+    Transaction.objects.filter(sender__in=users).delete()
+    Transaction.objects.filter(receiver__in=users).delete()
+    Offer.objects.filter(user__in=users).delete()
+    users.delete()
+
+
+def timeit(func, repeat=20):
+    """Run func `repeat` times and return the median time in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
@@ -0,0 +1,112 @@
+# authentication.py
+import copy
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.cache import LRUCache
+
+AUTH_VERSION_CLAIM = "ver"
+AUTH_STATE_TIMEOUT = 60 * 60 * 24
+
+
+class VersionedRefreshToken(RefreshToken):
+    """
+    Refresh token carrying the user's `auth_version`. Access tokens copy
+    the claim, so bumping the version revokes every token issued before.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[AUTH_VERSION_CLAIM] = user.auth_version
+        return token
+
+
+class UserCache(LRUCache):
+    """
+    LRU of users by id for CachedJWTAuthentication, local to the process:
+    the cached users are only trusted after the token's version check.
+
+    Ids are compared as strings, tokens carry the user id claim as text.
+    """
+
+    def get(self, user_id):
+        return super().get(str(user_id))
+
+    def set(self, user_id, user):
+        super().set(str(user_id), user)
+
+    def forget(self, *user_ids):
+        super().forget(*(str(user_id) for user_id in user_ids))
+
+
+user_cache = UserCache(
+    maxsize=getattr(settings, "AUTH_USER_CACHE_SIZE", 1024),
+    ttl=getattr(settings, "AUTH_USER_CACHE_TTL", 30),
+)
+
+
+def auth_state_key(user_id):
+    return f"auth:state:{user_id}"
+
+
+def auth_state(user):
+    """What decides whether a user's tokens are accepted."""
+    return user.auth_version, user.is_active
+
+
+def publish_auth_state(user_id, state):
+    """
+    Store a user's auth_state in the shared cache once the transaction
+    commits, for every process to compare its cached copy with. A deleted
+    user is published as None, which no copy matches.
+    """
+    transaction.on_commit(lambda: cache.set(
+        auth_state_key(user_id), state, AUTH_STATE_TIMEOUT
+    ))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves the user from `user_cache` instead of
+    querying `users` on every request.
+
+    A cached user is only trusted when its `auth_version` matches the one
+    in the token and its auth_state the one in the shared cache, which
+    user saves publish: a revocation handled by another process reaches
+    this one's copy at the next request. Otherwise (or on a miss) the
+    user is read from the database as usual, which also applies the
+    is_active check. Tokens without the claim always take the database
+    path.
+    """
+
+    def get_user(self, validated_token):
+        version = validated_token.get(AUTH_VERSION_CLAIM)
+        if version is None:
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            return super().get_user(validated_token)
+
+        user = user_cache.get(user_id)
+        state = cache.get(auth_state_key(user_id))
+        if user is None or user.auth_version != version or \
+                state != auth_state(user):
+            user = super().get_user(validated_token)
+            user_cache.set(user_id, user)
+            # add(): never overwrite a newer state published by a save
+            cache.add(auth_state_key(user_id), auth_state(user),
+                      AUTH_STATE_TIMEOUT)
+        if user.auth_version != version:
+            raise AuthenticationFailed("El token ha sido revocado.",
+                                       code="token_revoked")
+        # Views may change request.user, never hand out the shared copy
+        return copy.copy(user)
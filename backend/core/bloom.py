@@ -0,0 +1,32 @@
+# bloom.py
+import math
+from hashlib import blake2b
+
+
+class BloomFilter:
+    """
+    Fixed-size set of strings that answers "maybe present" or "certainly
+    absent". Sized for `capacity` items at the given false positive rate.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.size = max(8, math.ceil(
+            -capacity * math.log(error_rate) / math.log(2) ** 2
+        ))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def positions(self, key):
+        # Double hashing: k positions from the two halves of one digest
+        digest = blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, key):
+        for position in self.positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7))
+                   for position in self.positions(key))
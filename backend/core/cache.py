@@ -0,0 +1,290 @@
+# cache.py
+import time
+import uuid
+import zlib
+from collections import Counter, OrderedDict
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import caches
+
+MISSING = object()
+
+# Policy of a namespace without an entry in settings.CACHE_NAMESPACES
+DEFAULT_POLICY = {
+    "timeout": 300,       # seconds an entry stays in the shared cache
+    "local_size": 256,    # entries kept per process
+    "local_ttl": 5,       # seconds a process trusts its copy of an entry
+    "version_ttl": 1,     # seconds a process trusts its copy of the version
+    "lock_timeout": 10,   # seconds a build may hold the single-flight lock
+    "alias": "default",   # Django cache used as the shared level
+}
+
+
+class LRUCache:
+    """
+    Bounded, thread-safe LRU. Entries expire after `ttl` seconds, which
+    bounds how long a change made by another process can go unnoticed
+    here.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return default
+            value, expires = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return default
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def forget(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class TieredCache:
+    """
+    Cache of one namespace on two levels: an LRU of this process (L1) in
+    front of the shared Django cache (L2, Redis in production).
+
+    Entries are stored under the namespace version, a counter in L2.
+    invalidate() bumps it, so every process stops reading the entries of
+    the namespace, the local copies included: this one at once, the
+    others once their copy of the version expires (`version_ttl`
+    seconds, which saves an L2 round trip per lookup). delete() only
+    reaches the local copies of this process, other processes may serve
+    theirs for `local_ttl` seconds more.
+
+    L1 is filled from L2 reads, never with the caller's object. Values
+    read from it are shared by the threads of the process, callers must
+    not modify them.
+    """
+
+    def __init__(self, namespace, timeout, local_size, local_ttl,
+                 version_ttl, lock_timeout, alias):
+        self.namespace = namespace
+        self.timeout = timeout
+        self.lock_timeout = lock_timeout
+        self.alias = alias
+        self.local = LRUCache(local_size, local_ttl)
+        self.version_key = f"{namespace}:version"
+        self.version_ttl = version_ttl
+        # (version, monotonic expiry) read from L2 by this process
+        self.local_version = None
+        # Builds of the same key in this process wait for each other
+        self.build_locks = [Lock() for _ in range(64)]
+        self.stats = Counter()
+        self.stats_lock = Lock()
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def count(self, event, n=1):
+        with self.stats_lock:
+            self.stats[event] += n
+
+    def hit_rate(self):
+        """Share of lookups answered by either level, None before any."""
+        hits = self.stats["local_hits"] + self.stats["shared_hits"]
+        lookups = hits + self.stats["misses"]
+        return hits / lookups if lookups else None
+
+    def version(self):
+        local_version = self.local_version
+        if local_version is not None and \
+                local_version[1] > time.monotonic():
+            return local_version[0]
+        version = self.shared.get(self.version_key)
+        if version is None:
+            # Start from the clock, not 1, so a counter lost by the cache
+            # never comes back to a version that has stale entries
+            self.shared.add(self.version_key, time.time_ns(), timeout=None)
+            version = self.shared.get(self.version_key, 0)
+        self.local_version = (version, time.monotonic() + self.version_ttl)
+        return version
+
+    def invalidate(self):
+        """Drop every entry of the namespace, in every process."""
+        try:
+            self.shared.incr(self.version_key)
+        except ValueError:
+            self.shared.add(self.version_key, time.time_ns(), timeout=None)
+        self.local_version = None
+
+    def clear_local(self):
+        """Forget the copies of this process, the version included."""
+        self.local.clear()
+        self.local_version = None
+
+    def make_key(self, key, version):
+        return f"{self.namespace}:{version}:{key}"
+
+    def lookup(self, full_key):
+        value = self.local.get(full_key, MISSING)
+        if value is not MISSING:
+            self.count("local_hits")
+            return value
+        value = self.shared.get(full_key, MISSING)
+        if value is MISSING:
+            self.count("misses")
+            return MISSING
+        self.count("shared_hits")
+        self.local.set(full_key, value)
+        return value
+
+    def get(self, key, default=None, version=None):
+        """
+        Pass the `version` read before computing a value to set() it
+        under that version: a bump in between must not make it current.
+        """
+        version = self.version() if version is None else version
+        value = self.lookup(self.make_key(key, version))
+        return default if value is MISSING else value
+
+    def get_many(self, keys):
+        """{key: value} of the keys found, one L2 round trip."""
+        version = self.version()
+        found = {}
+        remote = {}
+        for key in keys:
+            full_key = self.make_key(key, version)
+            value = self.local.get(full_key, MISSING)
+            if value is MISSING:
+                remote[full_key] = key
+            else:
+                found[key] = value
+        self.count("local_hits", len(found))
+        if remote:
+            fetched = self.shared.get_many(list(remote))
+            for full_key, value in fetched.items():
+                self.local.set(full_key, value)
+                found[remote[full_key]] = value
+            self.count("shared_hits", len(fetched))
+            self.count("misses", len(remote) - len(fetched))
+        return found
+
+    def set(self, key, value, timeout=None, version=None):
+        version = self.version() if version is None else version
+        self.shared.set(self.make_key(key, version), value,
+                        timeout or self.timeout)
+
+    def set_many(self, data, timeout=None):
+        version = self.version()
+        self.shared.set_many(
+            {self.make_key(key, version): value
+             for key, value in data.items()},
+            timeout or self.timeout,
+        )
+
+    def delete(self, key):
+        full_key = self.make_key(key, self.version())
+        self.local.forget(full_key)
+        self.shared.delete(full_key)
+
+    def get_or_set(self, key, build, timeout=None):
+        """
+        The cached value of `key`, or `build()` stored for the next ones.
+
+        Only one caller builds a missing key at a time (single flight):
+        threads of this process wait on a lock, other processes on a lock
+        entry in L2 and then read what the builder stored. A builder that
+        takes longer than `lock_timeout` stops being waited for: its
+        waiters build the value themselves, without taking the lock.
+        """
+        full_key = self.make_key(key, self.version())
+        value = self.lookup(full_key)
+        if value is not MISSING:
+            return value
+
+        lock = self.build_locks[zlib.crc32(full_key.encode()) % 64]
+        with lock:
+            # Built by another thread while this one waited
+            value = self.local.get(full_key, MISSING)
+            if value is MISSING:
+                value = self.shared.get(full_key, MISSING)
+            if value is not MISSING:
+                self.count("waits")
+                self.local.set(full_key, value)
+                return value
+
+            lock_key = f"{full_key}:lock"
+            token = uuid.uuid4().hex
+            locked = self.shared.add(lock_key, token, self.lock_timeout)
+            if not locked:
+                value = self.wait_for(full_key)
+                if value is not MISSING:
+                    self.count("waits")
+                    self.local.set(full_key, value)
+                    return value
+            try:
+                self.count("builds")
+                value = build()
+                self.shared.set(full_key, value, timeout or self.timeout)
+            finally:
+                # Only the holder releases the lock, and only while it is
+                # still its own (it expires after lock_timeout)
+                if locked and self.shared.get(lock_key) == token:
+                    self.shared.delete(lock_key)
+            return value
+
+    def wait_for(self, full_key, interval=0.05):
+        """Poll L2 for a key another process is building."""
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(interval)
+            value = self.shared.get(full_key, MISSING)
+            if value is not MISSING:
+                return value
+        return MISSING
+
+
+namespaces = {}
+namespaces_lock = Lock()
+
+
+def get_cache(namespace):
+    """
+    The TieredCache of a namespace, with the policy configured for it in
+    settings.CACHE_NAMESPACES.
+    """
+    with namespaces_lock:
+        if namespace not in namespaces:
+            policy = {**DEFAULT_POLICY,
+                      **getattr(settings, "CACHE_NAMESPACES", {})
+                      .get(namespace, {})}
+            namespaces[namespace] = TieredCache(namespace, **policy)
+        return namespaces[namespace]
+
+
+def cache_stats():
+    """Lookups and hit rate of every namespace used by this process."""
+    with namespaces_lock:
+        return {
+            name: {**tiered.stats, "hit_rate": tiered.hit_rate()}
+            for name, tiered in namespaces.items()
+        }
@@ -0,0 +1,257 @@
+# compiled.py
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework import fields as drf_fields
+from rest_framework import relations, serializers
+
+from core.conditional import stamp_paths
+from core.memo import MemoizedSerializerMixin, fields_signature
+
+# Conversions equal to the DRF field's to_representation, written inline
+INLINE = {
+    drf_fields.IntegerField: "int({})",
+    drf_fields.CharField: "str({})",
+    drf_fields.ReadOnlyField: "{}",
+    relations.PrimaryKeyRelatedField: "{}",
+}
+
+
+class Unsupported(Exception):
+    """The serializer has a field the compiler cannot read from a row."""
+
+
+class RowObject:
+    """
+    Stand-in for a model instance, with only the attributes listed in
+    `Meta.source_columns`, given to method fields and properties.
+    """
+
+
+@lru_cache(maxsize=256)
+def compile_source(source):
+    return compile(source, "<compiled serializer>", "exec")
+
+
+@lru_cache(maxsize=None)
+def row_class(model):
+    """RowObject subclass with the properties of the model."""
+    properties = {}
+    for klass in reversed(model.__mro__):
+        if klass is models.Model or not issubclass(klass, models.Model):
+            continue
+        properties.update({name: value for name, value in vars(klass).items()
+                           if isinstance(value, property)})
+    return type(f"{model.__name__}Row", (RowObject,), properties)
+
+
+class SerializerCompiler:
+    """
+    Generate the source of a function rendering a values() row exactly as
+    `serializer.to_representation(instance)` would, field by field, with
+    the row lookups and conversions resolved up front.
+    """
+
+    def __init__(self):
+        self.namespace = {}
+        self.lines = []
+        self.columns = []
+        self.count = 0
+        self.memos = {}
+
+    def name(self, prefix, value):
+        self.count += 1
+        name = f"{prefix}{self.count}"
+        self.namespace[name] = value
+        return name
+
+    def column(self, lookup):
+        if lookup not in self.columns:
+            self.columns.append(lookup)
+        return f"row[{lookup!r}]"
+
+    def function(self, serializer, prefix=""):
+        """Write the render function of a serializer, return its name."""
+        meta = getattr(serializer, "Meta", None)
+        model = getattr(meta, "model", None)
+        if model is None:
+            raise Unsupported(type(serializer).__name__)
+        source_columns = getattr(meta, "source_columns", {})
+
+        body, needs_obj = [], False
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.SerializerMethodField):
+                if name not in source_columns:
+                    raise Unsupported(name)
+                method = self.name("method_", getattr(
+                    serializer, field.method_name
+                ))
+                needs_obj = True
+                body.append((name, f"{method}(obj)"))
+            elif name in source_columns:
+                # Property of the model
+                needs_obj = True
+                body.append((name, self.convert(
+                    field, f"obj.{field.source}"
+                )))
+            else:
+                body.append((name, self.field(model, field, prefix)))
+
+        self.count += 1
+        function = f"render_{self.count}"
+        lines = [f"def {function}(row):"]
+        if needs_obj:
+            lines += self.row_object(model, source_columns, prefix)
+        lines.append("    return {")
+        lines += [f"        {name!r}: {expression}," for name, expression
+                  in body]
+        lines += ["    }", ""]
+        self.lines += lines
+        return function
+
+    def memoized(self, serializer, function, key):
+        """
+        Wrap a nested render function so each related object is rendered
+        once, rows pointing to the same one share its dict.
+        """
+        signature = fields_signature(serializer)
+        if signature not in self.memos:
+            self.memos[signature] = self.name("memo_", {})
+        memo = self.memos[signature]
+        self.count += 1
+        wrapper = f"memoized_{self.count}"
+        self.lines += [
+            f"def {wrapper}(row):",
+            f"    data = {memo}.get({key})",
+            "    if data is None:",
+            f"        data = {memo}[{key}] = {function}(row)",
+            "    return data",
+            "",
+        ]
+        return wrapper
+
+    def row_object(self, model, source_columns, prefix):
+        cls = self.name("Row_", row_class(model))
+        lines = [f"    obj = {cls}()"]
+        attributes = {column for columns in source_columns.values()
+                      for column in columns}
+        for attribute in sorted(attributes):
+            value = self.column(f"{prefix}{attribute}")
+            model_field = model._meta.get_field(attribute)
+            if isinstance(model_field, models.FileField):
+                value = self.field_file(model_field, value)
+            lines.append(f"    obj.{attribute} = {value}")
+        return lines
+
+    def field_file(self, model_field, value):
+        attr_class = self.name("File_", model_field.attr_class)
+        model_field = self.name("field_", model_field)
+        return f"{attr_class}(None, {model_field}, {value})"
+
+    def field(self, model, field, prefix):
+        if field.source == "*" or "." in field.source:
+            raise Unsupported(field.field_name)
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            raise Unsupported(field.field_name)
+        if model_field.many_to_many or model_field.one_to_many \
+                or isinstance(field, (serializers.ListSerializer,
+                                      relations.ManyRelatedField)):
+            raise Unsupported(field.field_name)
+
+        value = self.column(f"{prefix}{field.source}")
+        if isinstance(field, serializers.Serializer):
+            function = self.function(field, f"{prefix}{field.source}__")
+            if isinstance(field, MemoizedSerializerMixin):
+                function = self.memoized(field, function, value)
+            return f"None if {value} is None else {function}(row)"
+        if isinstance(model_field, models.FileField):
+            # Never None, the DRF field checks the file name itself
+            method = self.name("field_", field.to_representation)
+            return f"{method}({self.field_file(model_field, value)})"
+        return self.convert(field, value)
+
+    def convert(self, field, value):
+        template = INLINE.get(type(field))
+        if template is None:
+            method = self.name("field_", field.to_representation)
+            template = method + "({})"
+        if template == "{}":
+            return value
+        return f"(None if (value := {value}) is None else " \
+               f"{template.format('value')})"
+
+
+class CompiledSerializer:
+    """
+    Read path of a serializer over values() rows. `columns` are the
+    lookups to select, `render(rows)` returns the same data as
+    `serializer.to_representation` over the matching instances.
+    """
+
+    def __init__(self, serializer):
+        compiler = SerializerCompiler()
+        self.function = compiler.function(serializer)
+        self.columns = compiler.columns
+        self.source = "\n".join(compiler.lines)
+        self.namespace = compiler.namespace
+        exec(compile_source(self.source), self.namespace)
+        self.render_row = self.namespace[self.function]
+        self.memos = [self.namespace[name]
+                      for name in compiler.memos.values()]
+
+    def render(self, rows):
+        # Nested objects are shared within one call only
+        for memo in self.memos:
+            memo.clear()
+        render_row = self.render_row
+        return [render_row(row) for row in rows]
+
+
+def compile_serializer(serializer):
+    """CompiledSerializer of a serializer, None if it is not supported."""
+    try:
+        return CompiledSerializer(serializer)
+    except Unsupported:
+        return None
+
+
+class CompiledListMixin:
+    """
+    ViewSet mixin rendering list responses from values() rows with the
+    compiled serializer instead of instances and DRF fields. Serializers
+    with a field the compiler does not support keep the usual path.
+    """
+    # Lookups every row carries besides the rendered ones
+    row_columns = ()
+
+    def get_list_serializer(self):
+        if not hasattr(self, "_compiled"):
+            self._compiled = compile_serializer(self.get_serializer())
+        return self._compiled
+
+    def list_queryset(self):
+        return self.compiled_rows(super().list_queryset())
+
+    def compiled_rows(self, queryset):
+        """values() rows for render_rows(), the queryset if unsupported."""
+        compiled = self.get_list_serializer()
+        if compiled is None:
+            return queryset
+        ordering = [field.lstrip("-") for field in queryset.query.order_by
+                    if isinstance(field, str)]
+        lookups = [*compiled.columns, *stamp_paths(self.get_serializer()),
+                   *self.row_columns]
+        return queryset.values(
+            *dict.fromkeys(["pk", *lookups, *ordering])
+        )
+
+    def render_rows(self, rows):
+        compiled = self.get_list_serializer()
+        if compiled is None:
+            return super().render_rows(rows)
+        return compiled.render(rows)
@@ -0,0 +1,109 @@
+# conditional.py
+import hashlib
+from functools import reduce
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from core.prefetch import related_lookups
+
+STAMP_FIELD = "updated_at"
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.sha1(repr(parts).encode()).hexdigest())
+
+
+def get_path(obj, path):
+    """
+    Follow a `__` lookup on an instance, None if a link is missing. On a
+    values() row it is a key.
+    """
+    if isinstance(obj, dict):
+        return obj.get(path)
+    return reduce(lambda value, name: getattr(value, name, None),
+                  path.split("__"), obj)
+
+
+def stamp_paths(serializer):
+    """
+    `updated_at` lookups of the rows a serializer renders: the instance and
+    every related object joined for a nested serializer.
+    """
+    model = serializer.Meta.model
+    paths = [STAMP_FIELD] if hasattr(model, STAMP_FIELD) else []
+    select, _ = related_lookups(serializer)
+    for lookup in select:
+        related = model
+        for name in lookup.split("__"):
+            related = related._meta.get_field(name).related_model
+        if hasattr(related, STAMP_FIELD):
+            paths.append(f"{lookup}__{STAMP_FIELD}")
+    return paths
+
+
+class ConditionalGetMixin:
+    """
+    ViewSet mixin answering list/retrieve with an ETag validator and a 304
+    when the client's copy is still current, without serializing.
+
+    The validator is built from the rows about to be rendered: their ids
+    and the `updated_at` of them and of every nested object, plus the
+    page links and the negotiated format. Writes must keep `updated_at`
+    current, update() calls set it explicitly.
+    """
+
+    def get_etag(self, instances, *extra):
+        paths = stamp_paths(self.get_serializer())
+        return make_etag(
+            self.request.accepted_renderer.format,
+            [(get_path(obj, "pk"), *(get_path(obj, path) for path in paths))
+             for obj in instances],
+            *extra,
+        )
+
+    def conditional_response(self, etag, render, last_modified=None):
+        """Return a 304 for a matching validator, else `render()`."""
+        response = get_conditional_response(
+            self.request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = render()
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def list_queryset(self):
+        return self.filter_queryset(self.get_queryset())
+
+    def render_rows(self, rows):
+        return self.get_serializer(rows, many=True).data
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.list_queryset()
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            rows = list(queryset)
+            return self.conditional_response(
+                self.get_etag(rows),
+                lambda: Response(self.render_rows(rows)),
+            )
+
+        return self.conditional_response(
+            self.get_etag(page, self.paginator.get_next_link(),
+                          self.paginator.get_previous_link()),
+            lambda: self.get_paginated_response(self.render_rows(page)),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        stamps = [get_path(instance, path)
+                  for path in stamp_paths(self.get_serializer())]
+        stamps = [stamp for stamp in stamps if stamp is not None]
+        return self.conditional_response(
+            self.get_etag([instance]),
+            lambda: Response(self.get_serializer(instance).data),
+            last_modified=max(stamps).timestamp() if stamps else None,
+        )
@@ -0,0 +1,126 @@
+# fieldsets.py
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+from core.conditional import STAMP_FIELD
+
+
+def parse_fieldset(params):
+    """
+    Selection tree of the `fields` and `expand` query parameters, or None
+    without `fields`:
+
+        ?fields=id,title,user.first_name&expand=offer
+        → {"id": {}, "title": {}, "user": {"first_name": {}}, "offer": {}},
+          ["offer"]
+
+    Nested objects are rendered as their id unless subfields are selected
+    or they are listed in `expand`.
+    """
+    fields = params.get("fields")
+    if fields is None:
+        return None
+    expand = sorted({path.strip()
+                     for path in params.get("expand", "").split(",")
+                     if path.strip()})
+
+    selection = {}
+    for path in [*fields.split(","), *expand]:
+        node = selection
+        for name in path.strip().split("."):
+            if name:
+                node = node.setdefault(name, {})
+    return selection, expand
+
+
+def prune_fields(serializer, selection, expand=(), prefix=""):
+    """Drop the fields of a serializer left out of a selection tree."""
+    fields = serializer.fields
+    for name in list(fields):
+        field = fields[name]
+        if name not in selection:
+            if not field.write_only:
+                fields.pop(name)
+            continue
+
+        many = isinstance(field, serializers.ListSerializer)
+        nested = field.child if many else field
+        if not isinstance(nested, serializers.Serializer):
+            continue
+        path = f"{prefix}{name}"
+        if selection[name]:
+            prune_fields(nested, selection[name], expand, f"{path}.")
+        elif path not in expand:
+            source = {} if field.source == name else {"source": field.source}
+            fields[name] = serializers.PrimaryKeyRelatedField(
+                read_only=True, many=many, **source
+            )
+
+
+def selected_columns(serializer, prefix=""):
+    """
+    `only()` lookups of the columns a serializer reads, or None when some
+    field reads something else (a property or a method). Serializers list
+    the columns behind those in `Meta.source_columns`.
+    """
+    model = serializer.Meta.model
+    source_columns = getattr(serializer.Meta, "source_columns", {})
+    # Read by ConditionalGetMixin for the ETag of every rendered object
+    columns = [f"{prefix}{STAMP_FIELD}"] if hasattr(model, STAMP_FIELD) \
+        else []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if name in source_columns:
+            columns += [f"{prefix}{column}"
+                        for column in source_columns[name]]
+            continue
+        if field.source == "*" or "." in field.source:
+            return None
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            return None
+        if model_field.many_to_many or model_field.one_to_many:
+            continue  # prefetched with its own query
+
+        lookup = f"{prefix}{field.source}"
+        columns.append(lookup)
+        if isinstance(field, serializers.Serializer):
+            # Without a restriction the joined row is read in full
+            columns += selected_columns(field, f"{lookup}__") or []
+    return columns
+
+
+class SparseFieldsetMixin:
+    """
+    ViewSet mixin for `?fields=` and `?expand=` on GET requests: the
+    serializer renders only the selected fields and the queryset loads
+    only the columns they need.
+    """
+
+    def get_fieldset(self):
+        request = getattr(self, "request", None)
+        if request is None or request.method not in SAFE_METHODS:
+            return None
+        return parse_fieldset(request.query_params)
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        fieldset = self.get_fieldset()
+        if fieldset is not None:
+            prune_fields(getattr(serializer, "child", serializer), *fieldset)
+        return serializer
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.get_fieldset() is not None:
+            columns = selected_columns(self.get_serializer())
+            if columns is not None:
+                queryset = queryset.only(*columns)
+        return queryset
+
+    def get_etag(self, instances, *extra):
+        # Same rows, different representation
+        return super().get_etag(instances, *extra, self.get_fieldset())
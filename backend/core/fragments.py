@@ -0,0 +1,63 @@
+# fragments.py
+import hashlib
+
+from core.cache import get_cache
+from core.conditional import get_path, stamp_paths
+from core.memo import fields_signature
+from core.renderers import FastJSONRenderer, JSONFragments
+
+
+class FragmentCacheMixin:
+    """
+    ViewSet mixin keeping the rendered JSON of every listed object in the
+    cache and assembling list responses from those bytes, serializing
+    only the objects without a current fragment.
+
+    A fragment is stored under the object's id and the `updated_at` of it
+    and of every nested object (e.g. the owner of an offer), the same
+    stamps as the ETag: a write moving them stores the next fragment under
+    another key, the old one is never read again and expires. The fields
+    rendered (sparse fieldsets) and the host of the absolute URLs are part
+    of the key too. `fragment_namespace` is the core.cache namespace, its
+    policy sets how long fragments are kept.
+    """
+    fragment_namespace = None
+
+    def uses_fragments(self):
+        renderer = getattr(self.request, "accepted_renderer", None)
+        return isinstance(renderer, FastJSONRenderer) and \
+            renderer.uses_orjson(self.request.accepted_media_type)
+
+    def fragment_keys(self, rows):
+        serializer = self.get_serializer()
+        paths = stamp_paths(serializer)
+        scope = hashlib.sha1(repr((
+            fields_signature(serializer), self.request.scheme,
+            self.request.get_host(),
+        )).encode()).hexdigest()
+        return [
+            f"{scope}:{get_path(row, 'pk')}:"
+            + hashlib.sha1(repr([get_path(row, path)
+                                 for path in paths]).encode()).hexdigest()
+            for row in rows
+        ]
+
+    def render_rows(self, rows):
+        if not self.uses_fragments():
+            return super().render_rows(rows)
+        rows = list(rows)
+        keys = self.fragment_keys(rows)
+        fragments = get_cache(self.fragment_namespace)
+        encoded = fragments.get_many(keys)
+        data = {}
+        missing = [(key, row) for key, row in zip(keys, rows)
+                   if key not in encoded]
+        if missing:
+            renderer = FastJSONRenderer()
+            rendered = super().render_rows([row for _, row in missing])
+            for (key, _), item in zip(missing, rendered):
+                data[key] = item
+                encoded[key] = renderer.render(item)
+            fragments.set_many({key: encoded[key] for key in data})
+        return JSONFragments([encoded[key] for key in keys],
+                             [data.get(key) for key in keys])
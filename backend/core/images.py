@@ -0,0 +1,241 @@
+# images.py
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from threading import Lock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import Signal
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+WEBP_QUALITY = 80
+
+executor = None
+executor_lock = Lock()
+
+# Sent with the model class and `pk` once new variants are saved. They
+# are written with update(), which sends no post_save.
+variants_ready = Signal()
+
+# (model, image field, variants field) registered with track_image_field
+image_fields = []
+
+
+def render_variant(image, max_size):
+    """
+    WebP rendition of an opened image that fits in max_size × max_size.
+    EXIF and other metadata are not copied, the orientation is applied to
+    the pixels first.
+    """
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "RGBA"):
+        has_alpha = image.mode in ("LA", "PA") or (
+            image.mode == "P" and "transparency" in image.info
+        )
+        image = image.convert("RGBA" if has_alpha else "RGB")
+    image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+
+    output = BytesIO()
+    image.save(output, format="WEBP", quality=WEBP_QUALITY, method=4)
+    return ContentFile(output.getvalue())
+
+
+def strip_original(upload):
+    """
+    Bytes of an uploaded image as it is stored and served: same format,
+    the orientation applied to the pixels, no EXIF (GPS position, camera)
+    or other metadata but the color profile, and at most
+    IMAGE_ORIGINAL_MAX_SIZE px per side. None for files Pillow cannot
+    re-encode as they are (animations), which are kept unchanged.
+    """
+    upload.seek(0)
+    with Image.open(upload) as image:
+        image_format = image.format
+        if getattr(image, "is_animated", False):
+            return None
+        icc_profile = image.info.get("icc_profile")
+        image = ImageOps.exif_transpose(image)
+        max_size = settings.IMAGE_ORIGINAL_MAX_SIZE
+        image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+
+        options = {"icc_profile": icc_profile} if icc_profile else {}
+        if image_format == "JPEG":
+            options["quality"] = 90
+        output = BytesIO()
+        image.save(output, format=image_format, **options)
+    upload.seek(0)
+    return output.getvalue()
+
+
+def strip_upload(instance, field_name):
+    """pre_save helper: replace a new upload with its stripped bytes."""
+    field_file = getattr(instance, field_name)
+    if not field_file or field_file._committed:
+        return
+    try:
+        content = strip_original(field_file.file)
+    except (OSError, ValueError):
+        # Not an image Pillow can write, the field validation decides
+        logger.warning("Could not strip %s, stored unchanged",
+                       field_file.name)
+        return
+    if content is not None:
+        setattr(instance, field_name,
+                ContentFile(content, name=field_file.name))
+
+
+def is_default(field_file):
+    """Whether the file is the field default (shared, not processed)."""
+    default = field_file.field.default
+    return not field_file or field_file.name == default
+
+
+def generate_variants(field_file):
+    """
+    Write every variant of an image file next to it and return the map
+    stored on the model: {"source": original name, variant: file name}.
+    """
+    storage = field_file.storage
+    directory, filename = os.path.split(field_file.name)
+    stem = os.path.splitext(filename)[0]
+
+    variants = {"source": field_file.name}
+    with storage.open(field_file.name, "rb") as source:
+        with Image.open(source) as image:
+            image.load()
+            for name, max_size in settings.IMAGE_VARIANTS.items():
+                target = os.path.join(directory, "variants",
+                                      f"{stem}-{name}.webp")
+                # Keep the name returned, storages may rename the file
+                variants[name] = storage.save(
+                    target, render_variant(image, max_size)
+                )
+    return variants
+
+
+def variants_are_current(field_file, variants):
+    return bool(variants) and variants.get("source") == field_file.name
+
+
+def variant_urls(field_file, variants, request=None):
+    """
+    {variant: URL} of an image, with the original URL for every variant
+    until the current file has been processed. None without a file.
+    """
+    if not field_file:
+        return None
+    current = variants_are_current(field_file, variants)
+    urls = {}
+    for name in settings.IMAGE_VARIANTS:
+        if current and variants.get(name):
+            url = field_file.storage.url(variants[name])
+        else:
+            url = field_file.url
+        urls[name] = request.build_absolute_uri(url) if request else url
+    return urls
+
+
+def process_image(model, pk, field_name, variants_field):
+    """
+    Generate the variants of an instance's image and store their map,
+    unless the image changed meanwhile (a newer task handles that one).
+    """
+    instance = (model._default_manager.filter(pk=pk)
+                .only(field_name, variants_field).first())
+    if instance is None:
+        return
+    field_file = getattr(instance, field_name)
+    if is_default(field_file) or variants_are_current(
+        field_file, getattr(instance, variants_field)
+    ):
+        return
+
+    variants = generate_variants(field_file)
+    updated = model._default_manager.filter(
+        pk=pk, **{field_name: field_file.name}
+    ).update(**{variants_field: variants, "updated_at": timezone.now()})
+    if updated:
+        variants_ready.send(sender=model, pk=pk)
+
+
+def schedule_variants(instance, field_name, variants_field,
+                      update_fields=None):
+    """post_save helper: queue the variants of a new or replaced image."""
+    if update_fields and field_name not in update_fields:
+        return
+    field_file = getattr(instance, field_name)
+    if is_default(field_file) or variants_are_current(
+        field_file, getattr(instance, variants_field)
+    ):
+        return
+    schedule(process_image, type(instance), instance.pk, field_name,
+             variants_field)
+
+
+def track_image_field(model, field_name, variants_field):
+    """
+    Strip every new upload of `model.field_name` (see strip_original),
+    generate its variants whenever it changes and store their map in
+    `variants_field`.
+    """
+    image_fields.append((model, field_name, variants_field))
+
+    def on_pre_save(sender, instance, **kwargs):
+        strip_upload(instance, field_name)
+
+    pre_save.connect(on_pre_save, sender=model, weak=False,
+                     dispatch_uid=f"strip:{model._meta.label}.{field_name}")
+
+    def on_save(sender, instance, update_fields=None, **kwargs):
+        schedule_variants(instance, field_name, variants_field,
+                          update_fields)
+
+    post_save.connect(on_save, sender=model, weak=False,
+                      dispatch_uid=f"images:{model._meta.label}.{field_name}")
+
+
+def get_executor():
+    global executor
+    with executor_lock:
+        if executor is None:
+            executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_WORKERS,
+                thread_name_prefix="images",
+            )
+        return executor
+
+
+def run_task(func, *args):
+    try:
+        func(*args)
+    except Exception:
+        logger.exception("Image task %s%r failed", func.__name__, args)
+
+
+def run_in_worker(func, *args):
+    try:
+        run_task(func, *args)
+    finally:
+        # Worker threads open their own connections, do not leak them
+        connections.close_all()
+
+
+def schedule(func, *args):
+    """
+    Run `func(*args)` in the image worker pool once the current database
+    transaction commits. With IMAGE_WORKERS = 0 it runs inline on commit.
+    """
+    def submit():
+        if settings.IMAGE_WORKERS:
+            get_executor().submit(run_in_worker, func, *args)
+        else:
+            run_task(func, *args)
+
+    transaction.on_commit(submit)
@@ -0,0 +1,151 @@
+# media.py
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    StreamingHttpResponse,
+)
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+
+# Content-addressed names (core.storage) never change content
+HASHED_NAME = re.compile(r"^[0-9a-f]{64}(\.[A-Za-z0-9]+)?$")
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "public, max-age=0, must-revalidate"
+
+# Header carrying the internal location for each MEDIA_ACCEL value
+ACCEL_HEADERS = {
+    "x-accel-redirect": "X-Accel-Redirect",   # nginx
+    "x-sendfile": "X-Sendfile",               # Apache mod_xsendfile
+}
+
+CHUNK_SIZE = 64 * 1024
+
+
+def is_hashed(name):
+    return bool(HASHED_NAME.match(posixpath.basename(name)))
+
+
+def media_etag(name, stat):
+    if is_hashed(name):
+        return quote_etag(posixpath.basename(name).split(".")[0])
+    return quote_etag(f"{int(stat.st_mtime)}-{stat.st_size}")
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive of a single `bytes=` range, None to send the
+    whole file, False if it cannot be satisfied.
+    """
+    match = RANGE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def read_range(path, start, length):
+    with open(path, "rb") as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def accel_response(name):
+    """Empty response telling the front proxy which file to send."""
+    header = ACCEL_HEADERS[settings.MEDIA_ACCEL]
+    response = HttpResponse()
+    if settings.MEDIA_ACCEL == "x-sendfile":
+        response[header] = safe_join(settings.MEDIA_ROOT, name)
+    else:
+        response[header] = quote(
+            settings.MEDIA_ACCEL_LOCATION.rstrip("/") + "/" + name
+        )
+    return response
+
+
+def file_response(request, path, size, etag):
+    """The file from Django, honouring a single byte range."""
+    byte_range = None
+    if_range = request.headers.get("If-Range")
+    if "Range" in request.headers and if_range in (None, etag):
+        byte_range = parse_range(request.headers["Range"], size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+    if byte_range is None:
+        return FileResponse(open(path, "rb"))
+
+    start, end = byte_range
+    response = StreamingHttpResponse(
+        read_range(path, start, end - start + 1), status=206
+    )
+    response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response["Content-Length"] = str(end - start + 1)
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serve an uploaded file. With MEDIA_ACCEL set the bytes are sent by
+    the front proxy, otherwise by Django (for local use). Hashed names
+    are cached for a year, other names are revalidated with their ETag.
+    """
+    name = posixpath.normpath(path).lstrip("/")
+    # Hidden files are the storage's temporary uploads
+    if any(part.startswith(".") for part in name.split("/")):
+        raise Http404
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, name)
+        stat = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    etag = media_etag(name, stat)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime)
+    )
+    if response is None:
+        if settings.MEDIA_ACCEL:
+            response = accel_response(name)
+        else:
+            response = file_response(request, full_path, stat.st_size, etag)
+            response["Accept-Ranges"] = "bytes"
+        if response.status_code != 416:
+            content_type, _ = mimetypes.guess_type(full_path)
+            response["Content-Type"] = (content_type
+                                        or "application/octet-stream")
+
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    response["Cache-Control"] = IMMUTABLE if is_hashed(name) else REVALIDATE
+    return response
@@ -0,0 +1,63 @@
+# memo.py
+from django.utils.functional import cached_property
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+MEMO_CONTEXT_KEY = "render_memo"
+
+
+def fields_signature(serializer):
+    """
+    Hashable description of the fields a serializer renders, nested ones
+    included, so two positions pruned differently never share a result.
+    """
+    return (type(serializer), tuple(
+        (name, fields_signature(field)
+         if isinstance(field, serializers.Serializer) else type(field))
+        for name, field in serializer.fields.items()
+        if not field.write_only
+    ))
+
+
+class MemoizedSerializerMixin:
+    """
+    Serializer mixin rendering each object once per request: with a memo
+    in the context (see RenderMemoMixin) the representation of an object
+    already rendered with the same fields is reused.
+    """
+
+    @cached_property
+    def memo_signature(self):
+        return fields_signature(self)
+
+    def to_representation(self, instance):
+        memo = self.context.get(MEMO_CONTEXT_KEY)
+        if memo is None or instance.pk is None:
+            return super().to_representation(instance)
+        key = (self.memo_signature, instance.pk)
+        data = memo.get(key)
+        if data is None:
+            data = memo[key] = super().to_representation(instance)
+        return data
+
+
+class RenderMemoMixin:
+    """
+    ViewSet mixin giving the serializers of a GET request a memo that
+    lives as long as the request. Writes render without it, the objects
+    they return may have changed in between.
+    """
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.request is not None and \
+                self.request.method in SAFE_METHODS:
+            if not hasattr(self, "_render_memo"):
+                self._render_memo = {}
+            context[MEMO_CONTEXT_KEY] = self._render_memo
+        return context
+
+    def clear_render_memo(self):
+        """Forget what was rendered, e.g. between chunks of a stream."""
+        if hasattr(self, "_render_memo"):
+            self._render_memo.clear()
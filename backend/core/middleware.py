@@ -0,0 +1,119 @@
+# middleware.py
+import hashlib
+from collections import Counter
+from threading import Event, Lock
+
+from django.conf import settings
+from django.http import HttpResponse
+
+SAFE_METHODS = ("GET", "HEAD")
+
+# Request headers the response may depend on, besides the auth scope
+VARY_HEADERS = ("HTTP_ACCEPT", "HTTP_ACCEPT_LANGUAGE", "HTTP_ORIGIN",
+                "HTTP_IF_NONE_MATCH", "HTTP_IF_MODIFIED_SINCE",
+                "HTTP_RANGE")
+
+# Requests of this process, e.g. for the benchmarks
+stats = Counter()
+stats_lock = Lock()
+
+# {coalescing key: Flight} of the requests being executed by this process,
+# shared by every instance of the middleware (one per handler)
+in_flight = {}
+in_flight_lock = Lock()
+
+
+def count(event):
+    with stats_lock:
+        stats[event] += 1
+
+
+def coalescing_ratio():
+    """Share of safe requests answered with another one's response."""
+    total = stats["executed"] + stats["coalesced"]
+    return stats["coalesced"] / total if total else None
+
+
+def coalescing_key(request):
+    """
+    Requests with the same key get the same response: method, host, path
+    and query parameters in a canonical order, the headers the response
+    may vary on, and the auth scope (Authorization header and session
+    cookie, so a response never reaches another user).
+    """
+    params = sorted((name, sorted(values))
+                    for name, values in request.GET.lists())
+    canonical = repr((
+        request.method, request.scheme, request.get_host(), request.path,
+        params, [request.META.get(name) for name in VARY_HEADERS],
+        request.META.get("HTTP_AUTHORIZATION"),
+        request.COOKIES.get(settings.SESSION_COOKIE_NAME),
+    ))
+    return hashlib.sha1(canonical.encode()).hexdigest()
+
+
+class Flight:
+    """A request being executed and the snapshot of its response."""
+
+    def __init__(self):
+        self.done = Event()
+        self.snapshot = None
+
+
+def snapshot(response):
+    """
+    (status, headers, content) of a response other requests can receive,
+    None for streamed responses and responses setting cookies.
+    """
+    if response.streaming or response.cookies:
+        return None
+    return response.status_code, list(response.items()), response.content
+
+
+class RequestCoalescingMiddleware:
+    """
+    Execute identical safe requests arriving while one of them is in
+    flight only once: the first runs the view, the others wait for it and
+    receive a copy of its response.
+
+    Only requests handled by the threads of one process are coalesced.
+    Waiting is bounded by settings.REQUEST_COALESCING_TIMEOUT seconds,
+    after that (or if the response cannot be shared) a request runs the
+    view itself. Place it last, so the middleware above still processes
+    every response on its own.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.timeout = getattr(settings, "REQUEST_COALESCING_TIMEOUT", 5)
+
+    def __call__(self, request):
+        if request.method not in SAFE_METHODS:
+            return self.get_response(request)
+
+        key = coalescing_key(request)
+        with in_flight_lock:
+            flight = in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = in_flight[key] = Flight()
+
+        if leader:
+            count("executed")
+            try:
+                response = self.get_response(request)
+                flight.snapshot = snapshot(response)
+            finally:
+                with in_flight_lock:
+                    del in_flight[key]
+                flight.done.set()
+            return response
+
+        if not flight.done.wait(self.timeout):
+            count("timeouts")
+        elif flight.snapshot is not None:
+            count("coalesced")
+            status, headers, content = flight.snapshot
+            return HttpResponse(content, status=status, headers=headers)
+        count("executed")
+        return self.get_response(request)
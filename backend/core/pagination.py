@@ -0,0 +1,212 @@
+# pagination.py
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from contextlib import contextmanager
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def encode_key(value):
+    """
+    JSON fallback for ordering values. Dates keep their full precision,
+    truncating microseconds would make the seek skip or repeat rows.
+    """
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def keyset_chunks(queryset, chunk_size):
+    """
+    Yield every row of a queryset in lists of `chunk_size`, in its order
+    (plus the primary key), seeking past the last row of each chunk.
+    """
+    paginator = KeysetPagination()
+    paginator.keys = paginator.get_ordering(queryset)
+    paginator.position, paginator.reverse = None, False
+    while True:
+        rows = list(paginator.seek(queryset)[:chunk_size])
+        if rows:
+            yield rows
+        if len(rows) < chunk_size:
+            return
+        paginator.position = paginator.get_position(rows[-1])
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination that seeks on the queryset ordering instead of using
+    OFFSET, so any page costs the same as the first one.
+
+    The ordering is taken from the queryset (falling back to `ordering`)
+    and the primary key is appended as tie-breaker. Cursors are opaque
+    tokens holding the ordering values of the row where the page starts.
+    """
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = "page_size"
+    cursor_query_param = "cursor"
+    ordering = ("-pk",)
+    invalid_cursor_message = "Cursor inválido."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.start(request, self.get_ordering(queryset))
+        with self.cursor_errors():
+            rows = list(self.seek(queryset)[:self.page_size + 1])
+        return self.finish(rows)
+
+    def start(self, request, keys):
+        """Read the page size and cursor of the request."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.keys = keys
+        self.position, self.reverse = self.decode_cursor(request)
+
+    @contextmanager
+    def cursor_errors(self):
+        """
+        Turn cursor values that cannot be compared with the ordering
+        fields into a 404, like a malformed cursor.
+        """
+        try:
+            yield
+        except (ValidationError, ValueError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_ordering(self, queryset):
+        """Return the queryset ordering as (field, descending) pairs."""
+        return self.keys_for([
+            field for field in queryset.query.order_by
+            if isinstance(field, str)
+        ] or self.ordering)
+
+    @staticmethod
+    def keys_for(ordering):
+        keys = [(field.lstrip("-"), field.startswith("-"))
+                for field in ordering]
+        if keys[-1][0] not in ("pk", "id"):
+            keys.append(("pk", keys[-1][1]))
+        return keys
+
+    def seek(self, queryset):
+        """
+        Filter the queryset to the rows after the cursor position and order
+        it in the direction being read.
+        """
+        if self.position is not None:
+            queryset = queryset.filter(self.after(self.position))
+        return queryset.order_by(*self.get_order_by())
+
+    def get_order_by(self):
+        """Ordering in the direction being read."""
+        return [
+            field if descending == self.reverse else f"-{field}"
+            for field, descending in self.keys
+        ]
+
+    def after(self, position):
+        """
+        Expand `(a, b, ...) > (x, y, ...)` in the reading direction into
+        `a > x OR (a = x AND b > y) OR ...`.
+        """
+        conditions = []
+        for index, (field, descending) in enumerate(self.keys):
+            lookup = "lt" if descending != self.reverse else "gt"
+            equal = {
+                key: value
+                for (key, _), value in zip(self.keys[:index], position)
+            }
+            conditions.append(
+                Q(**equal, **{f"{field}__{lookup}": position[index]})
+            )
+        return reduce(or_, conditions)
+
+    def finish(self, rows):
+        """Trim the lookahead row and remember the neighbour positions."""
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+
+        has_next = has_more if not self.reverse else True
+        has_previous = has_more if self.reverse else self.position is not None
+        self.next_position = (
+            self.get_position(rows[-1]) if rows and has_next else None
+        )
+        self.previous_position = (
+            self.get_position(rows[0]) if rows and has_previous else None
+        )
+        return rows
+
+    def get_position(self, row):
+        if isinstance(row, dict):  # values() row
+            return [row[field] for field, _ in self.keys]
+        return [getattr(row, field) for field, _ in self.keys]
+
+    def encode_cursor(self, position, reverse):
+        payload = json.dumps({"p": position, "r": int(reverse)},
+                             default=encode_key)
+        return urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            padding = "=" * (-len(encoded) % 4)
+            payload = json.loads(urlsafe_b64decode(encoded + padding))
+            position, reverse = payload["p"], bool(payload["r"])
+        except (BinasciiError, ValueError, TypeError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.keys):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def get_link(self, position, reverse):
+        if position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(position, reverse)
+        )
+
+    def get_next_link(self):
+        return self.get_link(self.next_position, False)
+
+    def get_previous_link(self):
+        return self.get_link(self.previous_position, True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True,
+                         "format": "uri"},
+                "previous": {"type": "string", "nullable": True,
+                             "format": "uri"},
+                "results": schema,
+            },
+        }
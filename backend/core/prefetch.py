@@ -0,0 +1,70 @@
+# prefetch.py
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+
+def related_lookups(serializer, prefix="", prefetching=False):
+    """
+    Walk the fields of a serializer and return the `select_related` and
+    `prefetch_related` lookups needed to render it without extra queries.
+
+    Nested serializers over a forward relation are joined, nested lists
+    over a many relation are prefetched (and everything below them too).
+    """
+    select, prefetch = [], []
+    model = getattr(getattr(serializer, "Meta", None), "model", None)
+    if model is None:
+        return select, prefetch
+
+    for field in serializer.fields.values():
+        if field.write_only or not isinstance(
+            field, serializers.BaseSerializer
+        ):
+            continue
+        if field.source == "*" or "." in field.source:
+            continue
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            continue  # property or method returning objects
+        if not model_field.is_relation:
+            continue
+
+        lookup = f"{prefix}{field.source}"
+        many = isinstance(field, serializers.ListSerializer)
+        child = field.child if many else field
+        many = many or model_field.many_to_many or model_field.one_to_many
+        if many or prefetching:
+            prefetch.append(lookup)
+        else:
+            select.append(lookup)
+
+        child_select, child_prefetch = related_lookups(
+            child, prefix=f"{lookup}__", prefetching=prefetching or many
+        )
+        select += child_select
+        prefetch += child_prefetch
+
+    return select, prefetch
+
+
+def prefetch_for_serializer(queryset, serializer):
+    """Apply the joins required by `serializer` to the queryset."""
+    select, prefetch = related_lookups(serializer)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+class SerializerPrefetchMixin:
+    """
+    ViewSet mixin that derives `select_related`/`prefetch_related` from the
+    serializer tree, so adding a nested field never brings back N+1
+    queries.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return prefetch_for_serializer(queryset, self.get_serializer())
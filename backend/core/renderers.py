@@ -0,0 +1,151 @@
+# renderers.py
+from collections.abc import Sequence
+
+import msgpack
+import orjson
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# Same output as DRF's JSONRenderer: compact, UTF-8, "Z" for UTC
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+
+# Types the encoders do not know (timedelta, Decimal, lazy strings,
+# querysets, and dates for MessagePack) are converted like DRF does
+encoder = JSONEncoder()
+
+
+class JSONFragments(Sequence):
+    """
+    List of values already encoded by FastJSONRenderer, which writes the
+    bytes as they are. For any other renderer, or code reading the data,
+    it is a sequence of the decoded values; `data` are the decoded values
+    on hand, None where only the bytes are.
+    """
+
+    def __init__(self, encoded, data=None):
+        self.encoded = list(encoded)
+        self.data = list(data) if data is not None \
+            else [None] * len(self.encoded)
+
+    def __len__(self):
+        return len(self.encoded)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(len(self))[index]]
+        if self.data[index] is None:
+            self.data[index] = orjson.loads(self.encoded[index])
+        return self.data[index]
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def render(self):
+        return b"[" + b",".join(self.encoded) + b"]"
+
+
+def fragment_marker(index):
+    """A string user data cannot contain, and its encoded form."""
+    marker = f"\x00fragments:{index}\x00"
+    return marker, orjson.dumps(marker)
+
+
+def embed_fragments(data, encode):
+    """
+    Encode `data` with `encode`, writing the JSONFragments found at the top
+    level or as values of a top level dict (a page) from their bytes.
+    """
+    if isinstance(data, JSONFragments):
+        return data.render()
+    if not isinstance(data, dict) or not any(
+            isinstance(value, JSONFragments) for value in data.values()):
+        return encode(data)
+    fragments = []
+    replaced = {}
+    for name, value in data.items():
+        if isinstance(value, JSONFragments):
+            marker, encoded = fragment_marker(len(fragments))
+            fragments.append((encoded, value))
+            value = marker
+        replaced[name] = value
+    # In order: what follows a marker is only searched past it
+    parts = []
+    rest = encode(replaced)
+    for encoded, value in fragments:
+        head, rest = rest.split(encoded, 1)
+        parts += [head, value.render()]
+    parts.append(rest)
+    return b"".join(parts)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer encoding with orjson, byte for byte the same output.
+    Indented output (browsable API, `; indent=`) and anything orjson
+    rejects go through the stdlib encoder.
+    """
+
+    def uses_orjson(self, accepted_media_type=None, renderer_context=None):
+        """False when the output is left to the stdlib encoder."""
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        return indent is None and self.compact and not self.ensure_ascii
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if not self.uses_orjson(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        try:
+            ret = embed_fragments(data, lambda value: orjson.dumps(
+                value, default=encoder.default, option=ORJSON_OPTIONS
+            ))
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        # Escaped like DRF so the output stays a JavaScript subset
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028") \
+                .replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if encoding.lower().replace("-", "") != "utf8":
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=encoder.default,
+                             use_bin_type=True)
+
+
+class MessagePackParser(BaseParser):
+    media_type = "application/msgpack"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.ExtraData,
+                msgpack.FormatError, msgpack.StackError) as exc:
+            raise ParseError(f"MessagePack parse error - {exc}")
@@ -57,8 +57,14 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Last, the middleware above handles every response on its own
+    'core.middleware.RequestCoalescingMiddleware',
 ]
 
+# Seconds an identical safe request waits for the one in flight
+# (core.middleware) before running the view itself
+REQUEST_COALESCING_TIMEOUT = 5
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",   # Vite frontend
 ]
@@ -85,6 +91,33 @@ TEMPLATES = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads are named by content hash and stored once (core.storage),
+# collect_media_garbage deletes the ones no longer referenced
+STORAGES = {
+    'default': {
+        'BACKEND': 'core.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# Media is served by core.media.serve_media. In production set MEDIA_ACCEL
+# to "x-accel-redirect" (nginx, with an internal location aliasing
+# MEDIA_ROOT at MEDIA_ACCEL_LOCATION) or "x-sendfile" (Apache) so the proxy
+# sends the bytes. Empty: Django streams the file itself.
+MEDIA_ACCEL = config("MEDIA_ACCEL", default='')
+MEDIA_ACCEL_LOCATION = config("MEDIA_ACCEL_LOCATION",
+                              default='/protected-media/')
+
+# Resized WebP renditions of uploaded images (core.images), generated
+# after the upload commits by a pool of IMAGE_WORKERS threads (0: inline)
+IMAGE_VARIANTS = {'thumbnail': 320, 'medium': 960}   # longest side in px
+# Uploaded originals are stored without metadata (EXIF, GPS) and at most
+# this size, longest side in px
+IMAGE_ORIGINAL_MAX_SIZE = 2560
+IMAGE_WORKERS = 2
+
 
 WSGI_APPLICATION = 'core.wsgi.application'
 
@@ -106,6 +139,38 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Local memory by default, point it to a file-based cache (several local
+# workers) or Redis/Memcached (production) so every worker shares the
+# cached responses and their version counters.
+
+CACHES = {
+    'default': {
+        'BACKEND': config(
+            "CACHE_BACKEND",
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': config("CACHE_LOCATION", default='comparte-tu-tiempo'),
+    }
+}
+
+# Two-level caches (core.cache): a per-process LRU in front of the cache
+# above. Per namespace: seconds an entry is kept in the shared cache, and
+# how many entries each process keeps, for how many seconds.
+CACHE_NAMESPACES = {
+    # Anonymous offer list/detail responses and facet counts
+    # (apps.offers.cache), invalidation does not depend on the timeout
+    "offers": {"timeout": 300, "local_size": 256, "local_ttl": 5},
+    # Rendered offers (core.fragments), their keys change with the data
+    # so the timeouts only bound unused ones
+    "offer_fragments": {"timeout": 60 * 60 * 24, "local_size": 4096,
+                        "local_ttl": 60},
+    # Daily balance history of a user, keyed by the user's updated_at
+    "balance_history": {"timeout": 60 * 60, "local_size": 512,
+                        "local_ttl": 60},
+}
+
 
 AUTH_USER_MODEL = "users.User"
 
@@ -144,8 +209,22 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.CachedJWTAuthentication',
     ),
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.KeysetPagination',
+    # orjson encoding, same output as DRF's JSON renderer and parser, and
+    # MessagePack (Accept/Content-Type: application/msgpack)
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        'core.renderers.MessagePackRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+        'core.renderers.MessagePackParser',
+    ],
 }
 
 SIMPLE_JWT = {
@@ -155,8 +234,19 @@ SIMPLE_JWT = {
                                                     # token each time
     'BLACKLIST_AFTER_ROTATION': True,    # invalidate old refresh token
     'AUTH_HEADER_TYPES': ('Bearer',),
+    # checks and fills the apps.users blacklist on rotation
+    'TOKEN_REFRESH_SERIALIZER':
+        'apps.users.serializers.UserTokenRefreshSerializer',
 }
 
+# Refresh tokens each process remembers in its bloom filter
+# (apps.users.blacklist) before false positives exceed 0.1%
+TOKEN_BLACKLIST_BLOOM_CAPACITY = 100_000
+
+# In-process cache of authenticated users (core.authentication)
+AUTH_USER_CACHE_SIZE = 1024   # users kept per process
+AUTH_USER_CACHE_TTL = 30      # seconds before a cached user is reloaded
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
@@ -0,0 +1,91 @@
+# storage.py
+import hashlib
+import os
+import tempfile
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+# Read once, at import: os.umask() can only be read by setting it, which
+# would briefly change it for the threads creating files meanwhile
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage that names files by the SHA-256 of their bytes,
+    keeping the upload directory and the extension:
+    `offers/photo.jpg` → `offers/3f/3fa9….jpg`.
+
+    Saving bytes that are already stored writes nothing and returns the
+    existing name, so identical uploads share one file, and a name never
+    changes content, so its URL can be cached forever. Files are not
+    deleted when a row stops using them, `collect_media_garbage` removes
+    the ones no row references and not modified in its grace period: a
+    save reusing a stored file touches it, so a row about to reference it
+    keeps it alive.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = self.content_name(name, content)
+        try:
+            os.utime(self.path(name))
+            return name
+        except FileNotFoundError:
+            return super().save(name, content, max_length=max_length)
+
+    def content_name(self, name, content):
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        digest = content_hash(content)
+        return os.path.join(directory, digest[:2], digest + extension) \
+            .replace("\\", "/")
+
+    def get_available_name(self, name, max_length=None):
+        # Same name means same bytes, never look for an alternative
+        if max_length is not None and len(name) > max_length:
+            raise SuspiciousFileOperation(
+                f'"{name}" does not fit in {max_length} characters.'
+            )
+        return name
+
+    def _save(self, name, content):
+        """
+        Write to a temporary file and rename it into place, so readers
+        never see a partial file and concurrent saves of the same bytes
+        just replace each other.
+        """
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as temp:
+                for chunk in content.chunks():
+                    temp.write(chunk)
+            mode = self.file_permissions_mode
+            if mode is None:
+                mode = 0o666 & ~UMASK
+            os.chmod(temp_path, mode)
+            os.replace(temp_path, full_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return name
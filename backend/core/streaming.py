@@ -0,0 +1,67 @@
+# streaming.py
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import PermissionDenied
+
+from core.pagination import keyset_chunks
+from core.renderers import FastJSONRenderer
+
+STREAM_PARAM = "stream"
+STREAM_CHUNK_SIZE = 500
+
+
+def wants_stream(request):
+    return request.query_params.get(STREAM_PARAM, "").lower() == "true"
+
+
+def json_array(chunks, render):
+    """
+    Yield a JSON array as bytes, one fragment per chunk of rows, so only
+    one chunk is held in memory at a time.
+    """
+    renderer = FastJSONRenderer()
+    yield b"["
+    first = True
+    for rows in chunks:
+        encoded = renderer.render(render(rows))
+        if encoded == b"[]":
+            continue
+        if not first:
+            yield b","
+        yield encoded[1:-1]
+        first = False
+    yield b"]"
+
+
+class StreamingListMixin:
+    """
+    ViewSet mixin adding `?stream=true` to the list: every row, unpaginated,
+    as a JSON array written while the queryset is read in keyset chunks.
+    Time to first byte and memory do not grow with the number of rows.
+    Only staff can stream the shared lists, they may be very large.
+    """
+    stream_chunk_size = STREAM_CHUNK_SIZE
+
+    def list(self, request, *args, **kwargs):
+        if not wants_stream(request):
+            return super().list(request, *args, **kwargs)
+        if not request.user.is_staff:
+            raise PermissionDenied(
+                "Solo los administradores pueden descargar el listado "
+                "completo."
+            )
+        return self.streaming_response(self.list_queryset())
+
+    def render_chunk(self, rows):
+        data = self.render_rows(rows)
+        if hasattr(self, "clear_render_memo"):
+            self.clear_render_memo()
+        return data
+
+    def streaming_response(self, queryset):
+        response = StreamingHttpResponse(
+            json_array(keyset_chunks(queryset, self.stream_chunk_size),
+                       self.render_chunk),
+            content_type="application/json",
+        )
+        response["Cache-Control"] = "no-store"
+        return response
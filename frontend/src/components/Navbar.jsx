@@ -113,7 +113,7 @@ export default function Navbar() {
                   sx={{ display: "flex", alignItems: "center", gap: 0.5 }}
                 >
                   <Avatar
-                    src={currentUser.profile_picture}
+                    src={currentUser.profile_picture_variants?.thumbnail || currentUser.profile_picture}
                     sx={{ width: 52, height: 52 }}
                   />
                   {menuOpen ? <ArrowDropUp /> : <ArrowDropDown />}
@@ -98,7 +98,7 @@ export default function OfferCard({ offer, onClick, isOwner = false, onDelete =
             >
                 <Box
                     component="img"
-                    src={offer.image || "https://placehold.co/295x257?text=Sin+Imagen"}
+                    src={offer.image_variants?.thumbnail || offer.image || "https://placehold.co/295x257?text=Sin+Imagen"}
                     alt={offer.title}
                     loading="lazy"
                     sx={{
@@ -120,7 +120,7 @@ export default function OfferCard({ offer, onClick, isOwner = false, onDelete =
                     }}
                 >
                     <Avatar
-                        src={offer.user?.profile_picture || "https://placehold.co/28x28"}
+                        src={offer.user?.profile_picture_variants?.thumbnail || offer.user?.profile_picture || "https://placehold.co/28x28"}
                         sx={{ width: 28, height: 28, cursor: "pointer" }}
                         onClick={(e) => {
                             e.stopPropagation();
@@ -50,7 +50,7 @@ export default function UserCard({ user }) {
 
             <Box sx={{ display: "flex", flexDirection: "column", alignItems: "center", gap: 2, width: "200px" }}>
                 <Avatar
-                    src={user.profile_picture}
+                    src={user.profile_picture_variants?.thumbnail || user.profile_picture}
                     sx={{ width: 80, height: 80, cursor: "pointer" }}
                     onClick={goToProfile}
                 />
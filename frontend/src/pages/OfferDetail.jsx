@@ -51,7 +51,7 @@ export default function OfferDetail() {
                 {/* Offer image */}
                 <Box>
                     <img
-                        src={offer.image || "https://placehold.co/610x532"}
+                        src={offer.image_variants?.medium || offer.image || "https://placehold.co/610x532"}
                         alt={offer.title}
                         style={{
                             width: 610,
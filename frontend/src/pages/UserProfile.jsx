@@ -115,7 +115,7 @@ export default function UserProfile() {
             >
                 {/* Avatar */}
                 <Avatar
-                    src={user.profile_picture}
+                    src={user.profile_picture_variants?.medium || user.profile_picture}
                     sx={{ width: 200, height: 200 }}
                 />
 
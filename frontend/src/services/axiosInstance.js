@@ -55,4 +55,17 @@ instance.interceptors.response.use(
   }
 );
 
+// List endpoints are paginated with cursors: follow `next` until the last
+// page and return every result
+export const getAllPages = async (url, headers = {}) => {
+  const results = [];
+  let next = url;
+  while (next) {
+    const response = await instance.get(next, { headers: { ...headers } });
+    results.push(...response.data.results);
+    next = response.data.next;
+  }
+  return results;
+};
+
 export default instance;
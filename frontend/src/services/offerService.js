@@ -1,6 +1,6 @@
 
 const API_URL = "http://localhost:8000/api/offers/";
-import axiosInstance from "./axiosInstance";
+import axiosInstance, { getAllPages } from "./axiosInstance";
 
 // Get access token from localStorage
 export const getAccessToken = () => localStorage.getItem("access_token");
@@ -8,13 +8,11 @@ export const getAccessToken = () => localStorage.getItem("access_token");
 
 // Public routes 
 
+// List endpoints are paginated, every page is fetched
 export const getAllOffers = async (query = "") => {
-  const response = await axiosInstance.get(`${API_URL}${query}`, {
-    headers: {
-      "Accept": "application/json",
-    },
+  return getAllPages(`${API_URL}${query}`, {
+    "Accept": "application/json",
   });
-  return response.data;
 };
 
 
@@ -28,12 +26,9 @@ export const getOfferById = async (id) => {
 };
 
 export const getOffersByUser = async (userId) => {
-  const response = await axiosInstance.get(`${API_URL}?user=${userId}`, {
-    headers: {
-      "Accept": "application/json",
-    },
+  return getAllPages(`${API_URL}?user=${userId}`, {
+    "Accept": "application/json",
   });
-  return response.data;
 };
 
 // Private routes - requires Auth header
@@ -1,4 +1,4 @@
-import axiosInstance from "./axiosInstance";
+import axiosInstance, { getAllPages } from "./axiosInstance";
 
 const API_URL = "http://localhost:8000/api/transactions/";
 
@@ -10,10 +10,10 @@ export const createTransaction = async (data) => {
   return response.data;
 };
 
+// Paginated, every page is fetched (most recent first)
 export const getMyTransactions = async () => {
-    const response = await axiosInstance.get(`${API_URL}my-transactions/`, {
-      headers: { "Auth": true, "Accept": "application/json" },
-    });
-    return response.data;
+  return getAllPages(`${API_URL}my-transactions/`, {
+    "Auth": true, "Accept": "application/json",
+  });
 };
 
@@ -1,5 +1,5 @@
 // src/services/userService.js
-import axiosInstance from "./axiosInstance";
+import axiosInstance, { getAllPages } from "./axiosInstance";
 
 const API_URL = "http://localhost:8000/api/users/";
 
@@ -21,13 +21,11 @@ export const getUserById = async (id) => {
   }
 };
 
+// Paginated, every page is fetched
 export const getAllUsers = async () => {
-    const response = await axiosInstance.get(`${API_URL}`, {
-      headers: {
-        Accept: "application/json",
-      },
-    });
-    return response.data;
+  return getAllPages(`${API_URL}?page_size=100`, {
+    Accept: "application/json",
+  });
 };
 
 // Private routes - requires Auth header